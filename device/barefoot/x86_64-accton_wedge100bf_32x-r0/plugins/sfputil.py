@@ -5,11 +5,14 @@ try:
     import sys
     import importlib
     import time
+    import socket
+    import threading
 
     sys.path.append(os.path.dirname(__file__))
     import pltfm_mgr_rpc
     from pltfm_mgr_rpc.ttypes import *
 
+    from thrift.Thrift import TApplicationException
     from thrift.transport import TSocket
     from thrift.transport import TTransport
     from thrift.protocol import TBinaryProtocol
@@ -20,11 +23,196 @@ except ImportError as e:
     raise ImportError (str(e) + "- required module not found")
 
 thrift_server = 'localhost'
-transport = None
+thrift_port = 9090
 pltfm_mgr = None
 
 SFP_EEPROM_CACHE = "/var/run/platform/sfp/cache"
 
+
+class ThriftClientPool(object):
+    """
+    Pool of persistent thrift connections to pltfm_mgr, shared by the
+    callers of the process. A connection is kept open between calls, and
+    re-opened when a call fails because the connection is broken.
+    """
+
+    # Errors after which the connection can't be used anymore
+    TRANSPORT_ERRORS = (TTransport.TTransportException, socket.error)
+
+    # Errors returned by the server, the reply has been fully read and the
+    # connection can be reused
+    SERVER_ERRORS = (TApplicationException, InvalidPltfmMgrOperation)
+
+    # Max number of requests sent before their replies are read, which
+    # bounds the amount of replies buffered in the socket
+    PIPELINE_DEPTH = 16
+
+    def __init__(self, server, port, retries, timeout):
+        self.server = server
+        self.port = port
+        self.retries = retries
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.idle = []
+
+    def _connect(self):
+        transport = TSocket.TSocket(self.server, self.port)
+
+        transport = TTransport.TBufferedTransport(transport)
+        bprotocol = TBinaryProtocol.TBinaryProtocol(transport)
+
+        pltfm_mgr_client_module = importlib.import_module(".".join(["pltfm_mgr_rpc", "pltfm_mgr_rpc"]))
+        pltfm_mgr_protocol = TMultiplexedProtocol.TMultiplexedProtocol(bprotocol, "pltfm_mgr_rpc")
+        client = pltfm_mgr_client_module.Client(pltfm_mgr_protocol)
+
+        for i in range(self.retries):
+            try:
+                transport.open()
+                if i:
+                    # The main thrift server is starded without platform api
+                    # Platform api is added later during syncd initialization
+                    # So we need to wait a little bit before do any platform api call
+                    # Just in case when can't connect from the first try (warm-reboot case)
+                    time.sleep(self.timeout)
+                break
+            except TTransport.TTransportException as e:
+                if e.type != TTransport.TTransportException.NOT_OPEN or i >= self.retries - 1:
+                    raise e
+                time.sleep(self.timeout)
+
+        return transport, client
+
+    def _acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        return self._connect()
+
+    def _release(self, conn):
+        with self.lock:
+            self.idle.append(conn)
+
+    def _discard(self, conn):
+        try:
+            conn[0].close()
+        except Exception:
+            pass
+
+    def _run(self, func):
+        """
+        Runs func(client) on a pooled connection. If the connection turns
+        out to be broken, e.g. pltfm_mgr was restarted, func is run once
+        more on a new connection.
+        """
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                result = func(conn[1])
+            except self.TRANSPORT_ERRORS:
+                # The other idle connections most likely broke as well
+                self._discard(conn)
+                self.close()
+                if attempt:
+                    raise
+                continue
+            except self.SERVER_ERRORS:
+                self._release(conn)
+                raise
+            except Exception:
+                # The reply may not have been fully read
+                self._discard(conn)
+                raise
+            self._release(conn)
+            return result
+
+    def check(self):
+        """
+        Makes sure a connection to the server can be opened
+        """
+        self._release(self._acquire())
+
+    def call(self, method, *args):
+        """
+        Calls an RPC of pltfm_mgr
+        """
+        return self._run(lambda client: getattr(client, method)(*args))
+
+    def _pipeline(self, client, method, args_list, pending, results):
+        """
+        Sends the requests of args_list whose index is in pending and reads
+        their replies. The index of a request is removed from pending once
+        its reply is read, so a transport error leaves the unanswered ones.
+        """
+        send = getattr(client, 'send_' + method)
+        recv = getattr(client, 'recv_' + method)
+        while pending:
+            batch = pending[:self.PIPELINE_DEPTH]
+            for index in batch:
+                send(*args_list[index])
+            for index in batch:
+                try:
+                    results[index] = recv()
+                except self.SERVER_ERRORS as e:
+                    results[index] = e
+                pending.remove(index)
+
+    def call_many(self, method, args_list):
+        """
+        Calls a read-only RPC of pltfm_mgr for each tuple of arguments of
+        args_list on a single connection. The requests are pipelined, sent
+        before their replies are read, so a batch costs one round trip per
+        PIPELINE_DEPTH calls instead of one per call.
+
+        If the connection breaks, only the requests whose reply wasn't read
+        are sent again, once, on a new connection.
+
+        Returns:
+            The list of the results, in the order of args_list. A call which
+            failed holds the exception, raised by the server or the transport
+            error if it couldn't be answered.
+
+        Raises:
+            The transport error if none of the calls could be answered, e.g.
+            pltfm_mgr is not running
+        """
+        results = [None] * len(args_list)
+        pending = list(range(len(args_list)))
+        error = None
+
+        for attempt in range(2):
+            try:
+                conn = self._acquire()
+            except self.TRANSPORT_ERRORS as e:
+                error = e
+                break
+            try:
+                self._pipeline(conn[1], method, args_list, pending, results)
+            except self.TRANSPORT_ERRORS as e:
+                # The other idle connections most likely broke as well
+                error = e
+                self._discard(conn)
+                self.close()
+                continue
+            except Exception:
+                # The reply may not have been fully read
+                self._discard(conn)
+                raise
+            self._release(conn)
+            return results
+
+        if len(pending) == len(args_list):
+            raise error
+        for index in pending:
+            results[index] = error
+        return results
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            self._discard(conn)
+
+
 class SfpUtil(SfpUtilBase):
     """Platform-specific SfpUtil class"""
 
@@ -59,6 +247,11 @@ class SfpUtil(SfpUtilBase):
         raise Exception() 
 
     def __init__(self):
+        global pltfm_mgr
+
+        if pltfm_mgr is None:
+            pltfm_mgr = ThriftClientPool(thrift_server, thrift_port, self.THRIFT_RETRIES, self.THRIFT_TIMEOUT)
+
         self.ready = False
         self.phy_port_dict = {'-1': 'system_not_ready'}
         self.phy_port_cur_state = {}
@@ -79,41 +272,9 @@ class SfpUtil(SfpUtilBase):
         global pltfm_mgr
 
         if self.QSFP_PORT_END == 0:
-            self.thrift_setup()
-            self.QSFP_PORT_END = pltfm_mgr.pltfm_mgr_qsfp_get_max_port();
+            self.QSFP_PORT_END = pltfm_mgr.call('pltfm_mgr_qsfp_get_max_port')
             self.PORT_END = self.QSFP_PORT_END
             self.PORTS_IN_BLOCK = self.QSFP_PORT_END
-            self.thrift_teardown()
-
-    def thrift_setup(self):
-        global thrift_server, transport, pltfm_mgr
-        transport = TSocket.TSocket(thrift_server, 9090)
-
-        transport = TTransport.TBufferedTransport(transport)
-        bprotocol = TBinaryProtocol.TBinaryProtocol(transport)
-
-        pltfm_mgr_client_module = importlib.import_module(".".join(["pltfm_mgr_rpc", "pltfm_mgr_rpc"]))
-        pltfm_mgr_protocol = TMultiplexedProtocol.TMultiplexedProtocol(bprotocol, "pltfm_mgr_rpc")
-        pltfm_mgr = pltfm_mgr_client_module.Client(pltfm_mgr_protocol)
-
-        for i in range(self.THRIFT_RETRIES):
-            try:
-                transport.open()
-                if i:
-                    # The main thrift server is starded without platform api
-                    # Platform api is added later during syncd initialization
-                    # So we need to wait a little bit before do any platform api call
-                    # Just in case when can't connect from the first try (warm-reboot case)
-                    time.sleep(self.THRIFT_TIMEOUT)
-                break
-            except TTransport.TTransportException as e:
-                if e.type != TTransport.TTransportException.NOT_OPEN or i >= self.THRIFT_RETRIES - 1:
-                    raise e
-                time.sleep(self.THRIFT_TIMEOUT)
-
-    def thrift_teardown(self):
-        global transport
-        transport.close()
 
     def get_presence(self, port_num):
         # Check for invalid port_num
@@ -123,33 +284,49 @@ class SfpUtil(SfpUtilBase):
         presence = False
 
         try:
-            self.thrift_setup()
-            presence = pltfm_mgr.pltfm_mgr_qsfp_presence_get(port_num)
-            self.thrift_teardown()
+            presence = pltfm_mgr.call('pltfm_mgr_qsfp_presence_get', port_num)
         except Exception as e:
             print e.__doc__
             print e.message
 
         return presence
 
+    def get_presence_all(self):
+        """
+        Retrieves the presence of all the ports in a single pipelined batch
+
+        Returns:
+            A dict of port number to presence, False for a port whose
+            presence can't be retrieved
+
+        Raises:
+            The transport error if pltfm_mgr can't be reached
+        """
+        ports = range(self.port_start, self.port_end + 1)
+        results = pltfm_mgr.call_many('pltfm_mgr_qsfp_presence_get', [(port,) for port in ports])
+
+        presence = {}
+        for port, result in zip(ports, results):
+            if isinstance(result, Exception):
+                # As absent, the port is reported again once it answers
+                presence[port] = False
+            else:
+                presence[port] = bool(result)
+        return presence
+
     def get_low_power_mode(self, port_num):
         # Check for invalid port_num
         if port_num < self.port_start or port_num > self.port_end:
             return False
 
-        self.thrift_setup()
-        lpmode = pltfm_mgr.pltfm_mgr_qsfp_lpmode_get(port_num)
-        self.thrift_teardown()
-        return lpmode
+        return pltfm_mgr.call('pltfm_mgr_qsfp_lpmode_get', port_num)
 
     def set_low_power_mode(self, port_num, lpmode):
         # Check for invalid port_num
         if port_num < self.port_start or port_num > self.port_end:
             return False
 
-        self.thrift_setup()
-        status = pltfm_mgr.pltfm_mgr_qsfp_lpmode_set(port_num, lpmode)
-        self.thrift_teardown()
+        status = pltfm_mgr.call('pltfm_mgr_qsfp_lpmode_set', port_num, lpmode)
         return (status == 0)
 
     def reset(self, port_num):
@@ -157,10 +334,8 @@ class SfpUtil(SfpUtilBase):
         if port_num < self.port_start or port_num > self.port_end:
             return False
 
-        self.thrift_setup()
-        status = pltfm_mgr.pltfm_mgr_qsfp_reset(port_num, True)
-        status = pltfm_mgr.pltfm_mgr_qsfp_reset(port_num, False)
-        self.thrift_teardown()
+        status = pltfm_mgr.call('pltfm_mgr_qsfp_reset', port_num, True)
+        status = pltfm_mgr.call('pltfm_mgr_qsfp_reset', port_num, False)
         return status
 
     def check_transceiver_change(self):
@@ -169,18 +344,15 @@ class SfpUtil(SfpUtilBase):
 
         self.phy_port_dict = {}
 
+        # Get presence of each SFP, a port which fails to answer is absent.
+        # Nothing is reported if pltfm_mgr can't be reached at all.
         try:
-            self.thrift_setup()
-        except:
+            presence = self.get_presence_all()
+        except ThriftClientPool.TRANSPORT_ERRORS:
             return
 
-        # Get presence of each SFP
         for port in range(self.port_start, self.port_end + 1):
-            try:
-                sfp_resent = pltfm_mgr.pltfm_mgr_qsfp_presence_get(port)
-            except:
-                sfp_resent = False
-            sfp_state = '1' if sfp_resent else '0'
+            sfp_state = '1' if presence[port] else '0'
 
             if port in self.phy_port_cur_state:
                 if self.phy_port_cur_state[port] != sfp_state:
@@ -191,8 +363,6 @@ class SfpUtil(SfpUtilBase):
             # Update port current state
             self.phy_port_cur_state[port] = sfp_state
 
-        self.thrift_teardown()
-
     def get_transceiver_change_event(self, timeout=0):
         forever = False
         if timeout == 0:
@@ -206,8 +376,7 @@ class SfpUtil(SfpUtilBase):
         while forever or timeout > 0:
             if not self.ready:
                 try:
-                    self.thrift_setup()
-                    self.thrift_teardown()
+                    pltfm_mgr.check()
                 except:
                     pass
                 else:
@@ -237,16 +406,14 @@ class SfpUtil(SfpUtilBase):
     def _get_port_eeprom_path(self, port_num, devid):
         eeprom_path = None
 
-        self.thrift_setup()
-        presence = pltfm_mgr.pltfm_mgr_qsfp_presence_get(port_num)
+        presence = pltfm_mgr.call('pltfm_mgr_qsfp_presence_get', port_num)
         if presence == True:
             eeprom_cache = open(SFP_EEPROM_CACHE, 'wb')
-            eeprom_hex = pltfm_mgr.pltfm_mgr_qsfp_info_get(port_num)
+            eeprom_hex = pltfm_mgr.call('pltfm_mgr_qsfp_info_get', port_num)
             eeprom_raw = bytearray.fromhex(eeprom_hex)
             eeprom_cache.write(eeprom_raw)
             eeprom_cache.close()
             eeprom_path = SFP_EEPROM_CACHE
-        self.thrift_teardown()
 
         return eeprom_path
 
@@ -0,0 +1,192 @@
+import collections
+import imp
+import os
+import socket
+import sys
+import threading
+
+import mock
+import pytest
+
+pytest.importorskip('thrift')
+
+from thrift.protocol import TBinaryProtocol
+from thrift.TMultiplexedProcessor import TMultiplexedProcessor
+from thrift.transport import TSocket
+from thrift.transport import TTransport
+
+
+class SfpUtilBase(object):
+    pass
+
+
+sys.modules.setdefault('sonic_sfp', mock.MagicMock())
+sys.modules.setdefault('sonic_sfp.sfputilbase', mock.MagicMock()).SfpUtilBase = SfpUtilBase
+
+SFPUTIL = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'sfputil.py')
+sfputil = imp.load_source('sfputil', SFPUTIL)
+
+from pltfm_mgr_rpc import pltfm_mgr_rpc
+from pltfm_mgr_rpc.ttypes import InvalidPltfmMgrOperation
+
+NUM_PORTS = 32
+
+
+class PltfmMgrHandler(object):
+    """ The QSFP RPCs of pltfm_mgr, recording the ports they were called for """
+    def __init__(self):
+        self.present = set(range(1, NUM_PORTS + 1, 2))
+        self.failing = set()
+        self.calls = collections.Counter()
+
+    def pltfm_mgr_qsfp_get_max_port(self):
+        return NUM_PORTS
+
+    def pltfm_mgr_qsfp_presence_get(self, port_num):
+        self.calls[port_num] += 1
+        if port_num in self.failing:
+            raise InvalidPltfmMgrOperation(code=-1)
+        return port_num in self.present
+
+
+class StubPltfmMgr(object):
+    """
+    A pltfm_mgr thrift server on a local port. After drop_after requests
+    it answers them, stops writing and closes the connection once the
+    client is done, leaving the requests it received meanwhile unanswered.
+    """
+    def __init__(self):
+        self.handler = PltfmMgrHandler()
+        self.processor = TMultiplexedProcessor()
+        self.processor.registerProcessor('pltfm_mgr_rpc', pltfm_mgr_rpc.Processor(self.handler))
+        self.drop_after = None
+        self.connections = 0
+        self.clients = []
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(5)
+        self.port = self.sock.getsockname()[1]
+        thread = threading.Thread(target=self.accept)
+        thread.daemon = True
+        thread.start()
+
+    def accept(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except socket.error:
+                return
+            self.connections += 1
+            self.clients.append(client)
+            thread = threading.Thread(target=self.serve, args=(client,))
+            thread.daemon = True
+            thread.start()
+
+    def serve(self, client):
+        transport = TSocket.TSocket()
+        transport.setHandle(client)
+        transport = TTransport.TBufferedTransport(transport)
+        protocol = TBinaryProtocol.TBinaryProtocol(transport)
+        try:
+            while True:
+                self.processor.process(protocol, protocol)
+                if self.drop_after is not None:
+                    self.drop_after -= 1
+                    if self.drop_after == 0:
+                        self.drop_after = None
+                        client.shutdown(socket.SHUT_WR)
+                        while client.recv(4096):
+                            pass
+                        break
+        except (TTransport.TTransportException, socket.error):
+            pass
+        client.close()
+
+    def disconnect_all(self):
+        for client in self.clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+    def stop(self):
+        self.sock.close()
+        self.disconnect_all()
+
+
+@pytest.fixture
+def server(tmpdir):
+    server = StubPltfmMgr()
+    pool = sfputil.ThriftClientPool('127.0.0.1', server.port, 1, 0)
+    with mock.patch.object(sfputil, 'pltfm_mgr', pool), \
+            mock.patch.object(sfputil, 'SFP_EEPROM_CACHE', str(tmpdir.join('cache'))):
+        yield server
+    pool.close()
+    server.stop()
+
+
+@pytest.fixture
+def sfp_util(server):
+    sfp_util = sfputil.SfpUtil()
+    sfp_util.ready = True
+    return sfp_util
+
+
+def expected_presence(handler):
+    return dict((port, port in handler.present and port not in handler.failing)
+                for port in range(1, NUM_PORTS + 1))
+
+
+def test_presence_all_on_one_connection(server, sfp_util):
+    assert sfp_util.get_presence_all() == expected_presence(server.handler)
+    assert sfp_util.get_presence(1) is True
+    assert server.connections == 1
+
+
+def test_transceiver_change(server, sfp_util):
+    sfp_util.check_transceiver_change()
+    assert sfp_util.phy_port_dict == dict((port, '1' if present else '0')
+                                          for port, present in expected_presence(server.handler).items())
+
+    server.handler.present.add(2)
+    sfp_util.check_transceiver_change()
+    assert sfp_util.phy_port_dict == {2: '1'}
+
+
+def test_failing_port_is_absent(server, sfp_util):
+    sfp_util.check_transceiver_change()
+    server.handler.failing.add(3)
+    sfp_util.check_transceiver_change()
+    assert sfp_util.phy_port_dict == {3: '0'}
+
+    server.handler.failing.clear()
+    sfp_util.check_transceiver_change()
+    assert sfp_util.phy_port_dict == {3: '1'}
+    assert server.connections == 1
+
+
+def test_broken_connection_resends_unanswered_only(server, sfp_util):
+    sfp_util.update_port_info()
+    server.drop_after = sfputil.ThriftClientPool.PIPELINE_DEPTH + 4
+    assert sfp_util.get_presence_all() == expected_presence(server.handler)
+    assert server.connections == 2
+    # Each request reached pltfm_mgr exactly once
+    assert server.handler.calls == collections.Counter(range(1, NUM_PORTS + 1))
+
+
+def test_restarted_pltfm_mgr(server, sfp_util):
+    sfp_util.get_presence_all()
+    server.disconnect_all()
+    assert sfp_util.get_presence_all() == expected_presence(server.handler)
+    assert server.connections == 2
+
+
+def test_unreachable_pltfm_mgr_reports_nothing(server, sfp_util):
+    sfp_util.check_transceiver_change()
+    state = dict(sfp_util.phy_port_cur_state)
+
+    server.stop()
+    sfp_util.check_transceiver_change()
+    assert sfp_util.phy_port_dict == {}
+    assert sfp_util.phy_port_cur_state == state
+
@@ -0,0 +1,122 @@
+import imp
+import os
+import sys
+
+import mock
+
+# lldpmgrd only runs in the lldp container, stand in for the SONiC modules it imports
+swsscommon = mock.MagicMock()
+swsscommon.swsscommon.CFG_PORT_TABLE_NAME = 'PORT'
+swsscommon.swsscommon.APP_PORT_TABLE_NAME = 'PORT_TABLE'
+sys.modules.setdefault('swsscommon', swsscommon)
+
+
+class DaemonBase(object):
+    def __init__(self, log_identifier):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith('log_'):
+            return lambda *args: None
+        raise AttributeError(name)
+
+
+daemon_base = mock.MagicMock()
+daemon_base.DaemonBase = DaemonBase
+sys.modules.setdefault('sonic_py_common', mock.MagicMock(daemon_base=daemon_base))
+sys.modules.setdefault('sonic_py_common.daemon_base', daemon_base)
+
+LLDPMGRD = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'lldpmgrd')
+lldpmgrd = imp.load_source('lldpmgrd', LLDPMGRD)
+
+
+class FakeLldpcli(object):
+    """ Records the lldpcli sessions, failing the ones running a bad command """
+    def __init__(self, bad_cmds=()):
+        self.bad_cmds = set(bad_cmds)
+        self.sessions = []
+
+    def __call__(self, cmds):
+        cmds = list(cmds)
+        self.sessions.append(cmds)
+        return not self.bad_cmds.intersection(cmds)
+
+
+def make_manager():
+    manager = lldpmgrd.LldpManager('lldpmgrd-test')
+    manager.port_init_done = True
+    return manager
+
+
+class TestPortConfig(object):
+    def test_removed_description(self):
+        manager = make_manager()
+        manager.handle_app_port_event('Ethernet0', 'SET', {'oper_status': 'up'})
+        manager.handle_config_port_event('Ethernet0', 'SET', {'alias': 'etp1', 'description': 'to T1'})
+        assert manager.pending_cmds['Ethernet0'] == "configure ports Ethernet0 lldp portidsubtype local etp1 description 'to T1'"
+
+        # The description was removed from the hash
+        manager.handle_config_port_event('Ethernet0', 'SET', {'alias': 'etp1'})
+        assert manager.port_config['Ethernet0'] == {'alias': 'etp1'}
+        assert manager.pending_cmds['Ethernet0'] == 'configure ports Ethernet0 lldp portidsubtype local etp1'
+
+    def test_port_down(self):
+        manager = make_manager()
+        manager.handle_config_port_event('Ethernet0', 'SET', {'alias': 'etp1'})
+        manager.handle_app_port_event('Ethernet0', 'SET', {'oper_status': 'down'})
+        assert manager.pending_cmds == {}
+
+        manager.handle_app_port_event('Ethernet0', 'SET', {'oper_status': 'up'})
+        assert manager.pending_cmds['Ethernet0'] == 'configure ports Ethernet0 lldp portidsubtype local etp1'
+
+        manager.handle_app_port_event('Ethernet0', 'DEL', {})
+        assert manager.pending_cmds == {}
+
+
+class TestPendingCmds(object):
+    def queue(self, manager, num_ports):
+        for i in range(num_ports):
+            port_name = 'Ethernet{}'.format(i * 4)
+            manager.handle_config_port_event(port_name, 'SET', {'alias': 'etp{}'.format(i + 1)})
+            manager.handle_app_port_event(port_name, 'SET', {'oper_status': 'up'})
+
+    def test_single_session(self):
+        manager = make_manager()
+        self.queue(manager, 16)
+        manager.run_lldpcli = FakeLldpcli()
+        manager.process_pending_cmds()
+        assert len(manager.run_lldpcli.sessions) == 1
+        assert len(manager.run_lldpcli.sessions[0]) == 16
+        assert manager.pending_cmds == {}
+
+    def test_only_failed_cmds_rerun(self):
+        manager = make_manager()
+        self.queue(manager, 16)
+        bad_cmd = manager.pending_cmds['Ethernet20']
+        manager.run_lldpcli = FakeLldpcli([bad_cmd])
+        manager.process_pending_cmds()
+
+        # The failed command is kept for the next retry
+        assert manager.pending_cmds == {'Ethernet20': bad_cmd}
+        # The failed batch was bisected: each half was run once, and only
+        # the halves with the failed command were split further
+        assert len(manager.run_lldpcli.sessions) == 1 + 2 * 4
+        runs = {}
+        for session in manager.run_lldpcli.sessions[1:]:
+            for cmd in session:
+                runs[cmd] = runs.get(cmd, 0) + 1
+        assert runs[bad_cmd] == 4
+        assert sorted(runs.values()) == [1] * 8 + [2] * 4 + [3] * 2 + [4] * 2
+
+    def test_retry(self):
+        manager = make_manager()
+        self.queue(manager, 4)
+        bad_cmd = manager.pending_cmds['Ethernet0']
+        manager.run_lldpcli = FakeLldpcli([bad_cmd])
+        manager.process_pending_cmds()
+        assert list(manager.pending_cmds.keys()) == ['Ethernet0']
+
+        manager.run_lldpcli = FakeLldpcli()
+        manager.process_pending_cmds()
+        assert manager.run_lldpcli.sessions == [[bad_cmd]]
+        assert manager.pending_cmds == {}
@@ -18,10 +18,22 @@ import logging
 import logging.handlers
 import re
 import os
+import tempfile
+import time
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
 
 WARM_BOOT_FILE_DIR = '/var/warmboot/nat/'
 NAT_WARM_BOOT_FILE = 'nat_entries.dump'
 IP_PROTO_TCP       = '6'
+CONNTRACK_TIMEOUT  = '432000'
+
+# Number of conntrack processes run in parallel when entries are restored one by one
+CONNTRACK_WORKERS  = 8
+# A progress message is logged every PROGRESS_INTERVAL restored entries
+PROGRESS_INTERVAL  = 5000
+# Number of entries added by each 'conntrack --load-file' of a batch restore
+BATCH_CHUNK_SIZE   = PROGRESS_INTERVAL
 
 MATCH_CONNTRACK_ENTRY = '^(\w+)\s+(\d+).*src=([\d.]+)\s+dst=([\d.]+)\s+sport=(\d+)\s+dport=(\d+).*src=([\d.]+)\s+dst=([\d.]+)\s+sport=(\d+)\s+dport=(\d+)'
 
@@ -30,16 +42,123 @@ logger.setLevel(logging.INFO)
 handler = logging.handlers.SysLogHandler(address = '/dev/log')
 logger.addHandler(handler)
 
-def add_nat_conntrack_entry_in_kernel(ipproto, srcip, dstip, srcport, dstport, natsrcip, natdstip, natsrcport, natdstport):
-    # pyroute2 doesn't have support for adding conntrack entries via netlink yet. So, invoking the conntrack utility to add the entries.
-    state = ''
-    if (ipproto == IP_PROTO_TCP):
-        state = ' --state ESTABLISHED '
-    ctcmd = 'conntrack -I -n ' + natdstip + ':' + natdstport + ' -g ' + natsrcip + ':' + natsrcport + \
-                       ' --protonum ' + ipproto + state + ' --timeout 432000 --src ' + srcip + ' --sport ' + srcport + \
-                       ' --dst ' + dstip + ' --dport ' + dstport + ' -u ASSURED'
-    subprocess.call(ctcmd, shell=True)
-    logger.info("Restored NAT entry: {}".format(ctcmd))
+NatEntry = namedtuple('NatEntry', ['ipproto', 'srcip', 'dstip', 'srcport', 'dstport',
+                                   'natsrcip', 'natdstip', 'natsrcport', 'natdstport'])
+
+def conntrack_args(entry):
+    # pyroute2 doesn't have support for adding conntrack entries via netlink yet. So, the entries
+    # are added with the conntrack utility.
+    args = ['-I', '-n', entry.natdstip + ':' + entry.natdstport, '-g', entry.natsrcip + ':' + entry.natsrcport,
+            '--protonum', entry.ipproto]
+    if (entry.ipproto == IP_PROTO_TCP):
+        args += ['--state', 'ESTABLISHED']
+    args += ['--timeout', CONNTRACK_TIMEOUT, '--src', entry.srcip, '--sport', entry.srcport,
+             '--dst', entry.dstip, '--dport', entry.dstport, '-u', 'ASSURED']
+    return args
+
+class ConntrackCommandInjector(object):
+    """
+    Adds the entries with one 'conntrack -I' per entry, CONNTRACK_WORKERS at a time
+    """
+    def __init__(self, workers=CONNTRACK_WORKERS):
+        self.workers = workers
+
+    def inject_one(self, entry):
+        """
+        Returns None on success, the error message otherwise
+        """
+        proc = subprocess.Popen(['conntrack'] + conntrack_args(entry), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True)
+        _, err = proc.communicate()
+        if proc.returncode != 0 and 'File exists' not in err:
+            return err.strip() or 'conntrack exited with {}'.format(proc.returncode)
+        return None
+
+    def inject(self, entries, progress=None):
+        """
+        Returns the list of (entry, error) of the entries which failed
+        """
+        failures = []
+        pool = ThreadPool(self.workers)
+        try:
+            for i, (entry, error) in enumerate(pool.imap(lambda entry: (entry, self.inject_one(entry)), entries)):
+                if error is not None:
+                    failures.append((entry, error))
+                if progress:
+                    progress(i + 1)
+        finally:
+            pool.close()
+            pool.join()
+        return failures
+
+class ConntrackBatchInjector(object):
+    """
+    Adds the entries with one 'conntrack --load-file' per chunk of
+    BATCH_CHUNK_SIZE entries, each chunk being a batch file holding the
+    arguments of each entry on a line. If a chunk fails, its entries are
+    added one by one to find out which ones fail.
+    """
+    def __init__(self, fallback=None, chunk_size=BATCH_CHUNK_SIZE):
+        self.fallback = fallback or ConntrackCommandInjector()
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def is_supported():
+        try:
+            proc = subprocess.Popen(['conntrack', '--help'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    universal_newlines=True)
+            out, _ = proc.communicate()
+        except OSError:
+            return False
+        return '--load-file' in out
+
+    def inject_chunk(self, entries):
+        """
+        Returns None on success, the error message otherwise
+        """
+        with tempfile.NamedTemporaryFile(mode='w', prefix='nat_entries', suffix='.batch') as batch:
+            for entry in entries:
+                batch.write(' '.join(conntrack_args(entry)) + '\n')
+            batch.flush()
+
+            proc = subprocess.Popen(['conntrack', '--load-file', batch.name], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    universal_newlines=True)
+            _, err = proc.communicate()
+
+        if proc.returncode != 0:
+            return err.strip() or 'conntrack exited with {}'.format(proc.returncode)
+        return None
+
+    def inject(self, entries, progress=None):
+        entries = list(entries)
+        failures = []
+        for offset in range(0, len(entries), self.chunk_size):
+            chunk = entries[offset:offset + self.chunk_size]
+            error = self.inject_chunk(chunk)
+            if error is not None:
+                logger.warning("conntrack batch restore failed ({}), restoring {} NAT entries one by one".format(
+                    error, len(chunk)))
+                chunk_progress = (lambda count, offset=offset: progress(offset + count)) if progress else None
+                failures += self.fallback.inject(chunk, chunk_progress)
+            elif progress:
+                progress(offset + len(chunk))
+        return failures
+
+def parse_nat_entries(filename):
+    """
+    Yield the NAT entries of a conntrack dump
+    """
+    conntrack_match_pattern = re.compile(r'{}'.format(MATCH_CONNTRACK_ENTRY))
+    with open(filename, 'r') as fp:
+        for line in fp:
+            ctline = conntrack_match_pattern.findall(line)
+            if not ctline:
+                continue
+            cmdargs = list(ctline.pop(0))
+            proto = cmdargs.pop(0)
+            if proto not in ('tcp', 'udp'):
+               continue
+            yield NatEntry(*cmdargs)
 
 # Set the statedb "NAT_RESTORE_TABLE|Flags", so natsyncd can start reconciliation
 def set_statedb_nat_restore_done():
@@ -50,19 +169,36 @@ def set_statedb_nat_restore_done():
     return
 
 # This function is to restore the kernel nat entries based on the saved nat entries.
-def restore_update_kernel_nat_entries(filename):
+def restore_update_kernel_nat_entries(filename, injector=None):
+    """
+    Restore the entries of the dump with the injector, by default a batch
+    injector if conntrack supports it. Returns the list of (entry, error)
+    of the entries which failed.
+    """
+    if injector is None:
+        injector = ConntrackBatchInjector() if ConntrackBatchInjector.is_supported() else ConntrackCommandInjector()
+
     # Read the entries from nat_entries.dump file and add them to kernel
-    conntrack_match_pattern = re.compile(r'{}'.format(MATCH_CONNTRACK_ENTRY))
-    with open(filename, 'r') as fp:
-        for line in fp:
-            ctline = conntrack_match_pattern.findall(line)
-            if not ctline:
-                continue
-            cmdargs = list(ctline.pop(0))
-            proto = cmdargs.pop(0)
-            if proto not in ('tcp', 'udp'):
-               continue
-            add_nat_conntrack_entry_in_kernel(*cmdargs)
+    entries = list(parse_nat_entries(filename))
+    start = time.time()
+    # Count of restored entries when progress was last logged
+    logged = [0]
+
+    def progress(count):
+        # The injectors report progress per entry or per chunk of entries
+        if count // PROGRESS_INTERVAL > logged[0] // PROGRESS_INTERVAL:
+            logged[0] = count
+            logger.info("Restored {}/{} NAT entries in {:.1f}s".format(count, len(entries), time.time() - start))
+
+    failures = injector.inject(entries, progress)
+    for entry, error in failures:
+        logger.error("Failed to restore NAT entry {}: {}".format(' '.join(conntrack_args(entry)), error))
+
+    elapsed = time.time() - start
+    logger.info("Restored {} NAT entries, {} failed, in {:.1f}s ({:.0f} entries/s) with {}".format(
+        len(entries) - len(failures), len(failures), elapsed, len(entries) / elapsed if elapsed else 0,
+        injector.__class__.__name__))
+    return failures
 
 def main():
     logger.info("restore_nat_entries service is started")
@@ -0,0 +1,148 @@
+import imp
+import json
+import os
+import stat
+import sys
+
+import mock
+import pytest
+
+# swsscommon only exists in the SONiC containers
+sys.modules.setdefault('swsscommon', mock.MagicMock())
+
+RESTORE_NAT_ENTRIES = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'restore_nat_entries.py')
+restore_nat_entries = imp.load_source('restore_nat_entries', RESTORE_NAT_ENTRIES)
+
+# Stand-in for the conntrack utility: logs each run, rejects the entries
+# whose source IP is in $CONNTRACK_BAD_SRCS and reports the ones in
+# $CONNTRACK_EXISTING_SRCS as already present
+FAKE_CONNTRACK = '''#!{python}
+import json, os, sys
+
+def run(args):
+    src = args[args.index('--src') + 1]
+    if src in os.environ.get('CONNTRACK_BAD_SRCS', '').split():
+        return 'conntrack v1.4.5 (conntrack-tools): Invalid argument'
+    if src in os.environ.get('CONNTRACK_EXISTING_SRCS', '').split():
+        return 'conntrack v1.4.5 (conntrack-tools): Operation failed: File exists'
+    return None
+
+args = sys.argv[1:]
+if args == ['--help']:
+    print('  -R, --load-file  Load entries from a file')
+    sys.exit(0)
+if args[0] == '--load-file':
+    with open(args[1]) as f:
+        lines = [line.split() for line in f]
+    errors = [run(line) for line in lines]
+else:
+    lines = [args]
+    errors = [run(args)]
+with open(os.environ['CONNTRACK_LOG'], 'a') as log:
+    log.write(json.dumps({{'mode': args[0], 'srcs': [line[line.index('--src') + 1] for line in lines]}}) + '\\n')
+errors = [error for error in errors if error]
+if errors:
+    sys.stderr.write(errors[0] + '\\n')
+    sys.exit(1)
+'''
+
+DUMP_LINE = ('tcp      6 431999 ESTABLISHED src={src} dst=67.66.65.1 sport={port} dport=80 src=67.66.65.1 '
+             'dst=65.55.42.1 sport=80 dport={port} [ASSURED] mark=0 use=1\n')
+
+
+class Conntrack(object):
+    def __init__(self, tmpdir, monkeypatch):
+        bin_dir = tmpdir.mkdir('bin')
+        script = bin_dir.join('conntrack')
+        script.write(FAKE_CONNTRACK.format(python=sys.executable))
+        script.chmod(stat.S_IRWXU)
+        self.log = tmpdir.join('conntrack.log')
+        self.log.write('')
+        monkeypatch.setenv('PATH', str(bin_dir) + os.pathsep + os.environ['PATH'])
+        monkeypatch.setenv('CONNTRACK_LOG', str(self.log))
+        self.monkeypatch = monkeypatch
+
+    def set_bad(self, *srcs):
+        self.monkeypatch.setenv('CONNTRACK_BAD_SRCS', ' '.join(srcs))
+
+    def set_existing(self, *srcs):
+        self.monkeypatch.setenv('CONNTRACK_EXISTING_SRCS', ' '.join(srcs))
+
+    def runs(self):
+        return [json.loads(line) for line in self.log.readlines()]
+
+
+@pytest.fixture
+def conntrack(tmpdir, monkeypatch):
+    return Conntrack(tmpdir, monkeypatch)
+
+
+def src(i):
+    return '10.0.{}.{}'.format(i // 256, i % 256)
+
+
+def write_dump(tmpdir, count):
+    dump = tmpdir.join('nat_entries.dump')
+    dump.write(''.join(DUMP_LINE.format(src=src(i), port=1024 + i) for i in range(count)))
+    return str(dump)
+
+
+class TestInjectors(object):
+    def test_batch_is_supported(self, conntrack):
+        assert restore_nat_entries.ConntrackBatchInjector.is_supported()
+
+    def test_command_injector(self, tmpdir, conntrack):
+        entries = list(restore_nat_entries.parse_nat_entries(write_dump(tmpdir, 20)))
+        conntrack.set_bad(src(3))
+        conntrack.set_existing(src(5))
+
+        progress = mock.Mock()
+        failures = restore_nat_entries.ConntrackCommandInjector(workers=4).inject(entries, progress)
+
+        # An entry which already exists is not a failure
+        assert [(entry.srcip, 'Invalid argument' in error) for (entry, error) in failures] == [(src(3), True)]
+        assert sorted(run['srcs'][0] for run in conntrack.runs()) == sorted(src(i) for i in range(20))
+        assert progress.call_args_list == [mock.call(i) for i in range(1, 21)]
+
+    def test_batch_injector_chunks(self, tmpdir, conntrack):
+        entries = list(restore_nat_entries.parse_nat_entries(write_dump(tmpdir, 25)))
+        progress = mock.Mock()
+        failures = restore_nat_entries.ConntrackBatchInjector(chunk_size=10).inject(entries, progress)
+
+        assert failures == []
+        assert [(run['mode'], len(run['srcs'])) for run in conntrack.runs()] == [('--load-file', 10),
+                                                                                  ('--load-file', 10),
+                                                                                  ('--load-file', 5)]
+        # Progress is reported after each chunk
+        assert progress.call_args_list == [mock.call(10), mock.call(20), mock.call(25)]
+
+    def test_batch_injector_fallback(self, tmpdir, conntrack):
+        entries = list(restore_nat_entries.parse_nat_entries(write_dump(tmpdir, 25)))
+        conntrack.set_bad(src(13))
+        progress = mock.Mock()
+        injector = restore_nat_entries.ConntrackBatchInjector(
+            fallback=restore_nat_entries.ConntrackCommandInjector(workers=1), chunk_size=10)
+        failures = injector.inject(entries, progress)
+
+        assert [entry.srcip for (entry, _) in failures] == [src(13)]
+        runs = conntrack.runs()
+        # Only the failed chunk is restored one by one
+        assert [run['mode'] for run in runs] == ['--load-file'] * 2 + ['-I'] * 10 + ['--load-file']
+        assert [run['srcs'][0] for run in runs[2:12]] == [src(i) for i in range(10, 20)]
+        assert progress.call_args_list == [mock.call(10)] + [mock.call(i) for i in range(11, 21)] + [mock.call(25)]
+
+
+class TestRestore(object):
+    def test_progress_logged_per_chunk(self, tmpdir, conntrack, monkeypatch):
+        monkeypatch.setattr(restore_nat_entries, 'PROGRESS_INTERVAL', 10)
+        dump = write_dump(tmpdir, 35)
+        with mock.patch.object(restore_nat_entries, 'logger') as logger:
+            failures = restore_nat_entries.restore_update_kernel_nat_entries(
+                dump, restore_nat_entries.ConntrackBatchInjector(chunk_size=10))
+
+        assert failures == []
+        messages = [call[0][0] for call in logger.info.call_args_list]
+        assert [message.split(' in ')[0] for message in messages[:3]] == ['Restored 10/35 NAT entries',
+                                                                          'Restored 20/35 NAT entries',
+                                                                          'Restored 30/35 NAT entries']
+        assert messages[3].startswith('Restored 35 NAT entries, 0 failed')
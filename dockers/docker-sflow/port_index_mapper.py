@@ -5,87 +5,148 @@
     to construct a PORT_INDEX_TABLE in state DB which includes the
     interface name, the interface index and the ifindex.
 
+    Only the link multicast group is subscribed to, and the changes carried
+    by each batch of netlink messages are written to state DB in a single
+    redis pipeline.
+
     Note : Currently supports only interfaces supported by port_util.
 """
 
+import errno
 import os
 import sys
 import syslog
 import signal
 import traceback
-from pyroute2 import IPDB
+from pyroute2 import IPRoute
+from pyroute2.netlink.rtnl import RTMGRP_LINK
 from pyroute2.iproute import RTM_NEWLINK, RTM_DELLINK
 from swsssdk import SonicV2Connector, port_util
 
 PORT_INDEX_TABLE_NAME = 'PORT_INDEX_TABLE'
 SYSLOG_IDENTIFIER = 'port_index_mapper'
 
-ipdb = None
-state_db = None
-
-def set_port_index_table_entry(key, index, ifindex):
-    state_db.set(state_db.STATE_DB, key, 'index', index)
-    state_db.set(state_db.STATE_DB, key, 'ifindex', ifindex)
+# Value of ifi_change in the NEWLINK/DELLINK sent when a link is created or removed
+IFI_CHANGE_ALL = 0xFFFFFFFF
 
-def interface_callback(ipdb, nlmsg, action):
-    global state_db
+ipr = None
+state_db = None
 
-    try:
-        msgtype = nlmsg['header']['type']
-        if (msgtype != RTM_NEWLINK and msgtype != RTM_DELLINK):
-            return
-
-        # filter out unwanted messages
-        change = nlmsg['change']
-        if (change != 0xFFFFFFFF):
-            return
-    
-        attrs = nlmsg['attrs']
-        for list in attrs:
-            if list[0] == 'IFLA_IFNAME':
-                ifname = list[1]
-                break
-            else:
-                return
-    
-        # Extract the port index from the interface name
+def get_port_index_table_key(ifname):
+    return '{}|{}'.format(PORT_INDEX_TABLE_NAME, ifname)
+
+def parse_link_message(nlmsg):
+    """
+    Returns (msgtype, ifname, index, ifindex) for a link creation or removal
+    of an interface supported by port_util, None otherwise
+    """
+    msgtype = nlmsg['header']['type']
+    if msgtype != RTM_NEWLINK and msgtype != RTM_DELLINK:
+        return None
+
+    # filter out unwanted messages
+    if nlmsg['change'] != IFI_CHANGE_ALL:
+        return None
+
+    ifname = nlmsg.get_attr('IFLA_IFNAME')
+    if ifname is None:
+        return None
+
+    # Extract the port index from the interface name
+    index = port_util.get_index_from_str(ifname)
+    if index is None:
+        return None
+
+    return msgtype, ifname, index, nlmsg['index']
+
+def write_link_messages(redis_client, nlmsgs):
+    """
+    Apply the link creations and removals of a batch of netlink messages to
+    PORT_INDEX_TABLE in a single pipeline
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    count = 0
+    for nlmsg in nlmsgs:
+        try:
+            link = parse_link_message(nlmsg)
+        except Exception as e:
+            syslog.syslog(syslog.LOG_WARNING, "Skipping malformed netlink message: {}".format(e))
+            continue
+        if link is None:
+            continue
+        msgtype, ifname, index, ifindex = link
+        key = get_port_index_table_key(ifname)
+        if msgtype == RTM_NEWLINK:
+            pipe.hmset(key, {'index': str(index), 'ifindex': str(ifindex)})
+        else:
+            pipe.delete(key)
+        count += 1
+
+    if count:
+        pipe.execute()
+    return count
+
+def reconcile_port_index_table(redis_client, links):
+    """
+    Sync PORT_INDEX_TABLE with the dump of the current links at startup,
+    removing the entries of links which disappeared while the mapper was down
+    """
+    entries = {}
+    for link in links:
+        ifname = link.get_attr('IFLA_IFNAME')
+        if ifname is None:
+            continue
         index = port_util.get_index_from_str(ifname)
         if index is None:
-            return
-    
-        _hash = '{}|{}'.format(PORT_INDEX_TABLE_NAME, ifname)
-    
-        if msgtype == RTM_NEWLINK:
-            set_port_index_table_entry(_hash, str(index), nlmsg['index'])
-        elif msgtype == RTM_DELLINK:
-            state_db.delete(state_db.STATE_DB, _hash)
+            continue
+        entries[get_port_index_table_key(ifname)] = {'index': str(index), 'ifindex': str(link['index'])}
+
+    stale_keys = [key for key in redis_client.keys('{}|*'.format(PORT_INDEX_TABLE_NAME))
+                  if key not in entries]
+
+    pipe = redis_client.pipeline(transaction=False)
+    for key in stale_keys:
+        pipe.delete(key)
+    for key, fvs in entries.items():
+        pipe.hmset(key, fvs)
+    pipe.execute()
+
+    return len(entries), len(stale_keys)
+
+def process_link_events(redis_client, ipr):
+    """
+    Apply the next batch of netlink messages to PORT_INDEX_TABLE. If the
+    socket buffer overran, link events were dropped, so the whole table is
+    resynced from a dump of the links instead.
+    """
+    try:
+        nlmsgs = ipr.get()
+    except (IOError, OSError) as e:
+        if e.errno != errno.ENOBUFS:
+            raise
+        count, stale = reconcile_port_index_table(redis_client, ipr.get_links())
+        syslog.syslog(syslog.LOG_WARNING, "Netlink socket overrun, resynced {} entries, removed {} stale entries"
+                      .format(count, stale))
+        return
 
-    except Exception, e:
-        t = sys.exc_info()[2]
-        traceback.print_tb(t)
-        syslog.syslog(syslog.LOG_CRIT, "%s" % str(e))
-        os.kill(os.getpid(), signal.SIGTERM)
+    write_link_messages(redis_client, nlmsgs)
 
 def main():
-    global state_db, ipdb
+    global state_db, ipr
     state_db = SonicV2Connector(host='127.0.0.1')
     state_db.connect(state_db.STATE_DB, False)
+    redis_client = state_db.get_redis_client(state_db.STATE_DB)
 
-    ipdb = IPDB()
+    ipr = IPRoute()
+    # Subscribe before the dump so no link change is missed
+    ipr.bind(groups=RTMGRP_LINK)
 
     # Initialize the table at startup.
-    ifnames = ipdb.by_name.keys()
-    for ifname in ifnames:
-        index = port_util.get_index_from_str(ifname)
-        if index is None:
-            continue
-        ifindex = ipdb.interfaces[ifname]['index']
-        _hash = '{}|{}'.format(PORT_INDEX_TABLE_NAME, ifname)
-        set_port_index_table_entry(_hash, str(index), str(ifindex))
+    count, stale = reconcile_port_index_table(redis_client, ipr.get_links())
+    syslog.syslog(syslog.LOG_INFO, "Initialized {} entries, removed {} stale entries".format(count, stale))
 
-    ipdb.register_callback(interface_callback)
-
-    signal.pause()
+    while True:
+        process_link_events(redis_client, ipr)
 
 def signal_handler(signum, frame):
     syslog.syslog(syslog.LOG_NOTICE, "got signal %d" % signum)
@@ -98,17 +159,16 @@ if __name__ == '__main__':
         signal.signal(signal.SIGTERM, signal_handler)
         signal.signal(signal.SIGINT, signal_handler)
         main()
-    except Exception, e:
+    except Exception as e:
         t = sys.exc_info()[2]
         traceback.print_tb(t)
         syslog.syslog(syslog.LOG_CRIT, "%s" % str(e))
         rc = -1
     finally:
-        if ipdb is not None:
-            ipdb.release()
+        if ipr is not None:
+            ipr.close()
         else:
-            syslog.syslog(syslog.LOG_ERR, "ipdb undefined in signal_handler")
+            syslog.syslog(syslog.LOG_ERR, "ipr undefined in signal_handler")
 
         syslog.closelog()
         sys.exit(rc)
-
@@ -0,0 +1,160 @@
+import errno
+import fnmatch
+import imp
+import os
+import re
+import sys
+
+import mock
+import pytest
+
+pytest.importorskip('pyroute2')
+from pyroute2.netlink.rtnl import RTM_NEWLINK, RTM_DELLINK
+from pyroute2.netlink.rtnl.ifinfmsg import ifinfmsg
+from pyroute2.netlink.rtnl.marshal import MarshalRtnl
+
+
+def get_index_from_str(ifname):
+    match = re.match(r'^Ethernet(\d+)$', ifname)
+    return int(match.group(1)) // 4 + 1 if match else None
+
+
+# swsssdk only exists in the SONiC containers, port_util is all the mapper needs from it
+sys.modules.setdefault('swsssdk', mock.MagicMock(port_util=mock.Mock(get_index_from_str=get_index_from_str)))
+
+PORT_INDEX_MAPPER = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'port_index_mapper.py')
+port_index_mapper = imp.load_source('port_index_mapper', PORT_INDEX_MAPPER)
+
+CREATED = 0xFFFFFFFF
+
+
+def link_message(msgtype, index, ifname, change=CREATED):
+    """ Returns the wire format of an RTM_NEWLINK/RTM_DELLINK message """
+    msg = ifinfmsg()
+    msg['header']['type'] = msgtype
+    msg['index'] = index
+    msg['change'] = change
+    msg['attrs'] = [('IFLA_IFNAME', ifname)]
+    msg.encode()
+    return bytes(msg.data[:msg['header']['length']])
+
+
+class EndOfStream(Exception):
+    pass
+
+
+class RecordedIPRoute(object):
+    """
+    Replays a recorded netlink stream: each item of the recording is either
+    the raw data of one read of the socket, or an errno raised by the read.
+    get_links() returns a dump of the links at the time of the call.
+    """
+    def __init__(self, recording, links):
+        self.recording = list(recording)
+        self.links = links
+        self.marshal = MarshalRtnl()
+        self.dumps = 0
+
+    def get(self):
+        if not self.recording:
+            raise EndOfStream()
+        item = self.recording.pop(0)
+        if isinstance(item, int):
+            raise OSError(item, os.strerror(item))
+        return list(self.marshal.parse(item))
+
+    def get_links(self):
+        self.dumps += 1
+        data = b''.join(link_message(RTM_NEWLINK, index, ifname, 0) for (ifname, index) in sorted(self.links.items()))
+        return list(self.marshal.parse(data))
+
+
+class FakeRedis(object):
+    def __init__(self, data=None):
+        self.data = dict(data or {})
+        self.executes = 0
+
+    def keys(self, pattern):
+        return [key for key in self.data if fnmatch.fnmatchcase(key, pattern)]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline(object):
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def hmset(self, key, fvs):
+        self.commands.append(lambda: self.client.data.setdefault(key, {}).update(fvs))
+
+    def delete(self, key):
+        self.commands.append(lambda: self.client.data.pop(key, None))
+
+    def execute(self):
+        self.client.executes += 1
+        for command in self.commands:
+            command()
+
+
+def run(redis_client, ipr):
+    with pytest.raises(EndOfStream):
+        while True:
+            port_index_mapper.process_link_events(redis_client, ipr)
+
+
+def entry(index, ifindex):
+    return {'index': str(index), 'ifindex': str(ifindex)}
+
+
+class TestLinkEvents(object):
+    def test_recorded_stream(self):
+        recording = [
+            # Ports created in a burst, read at once
+            b''.join(link_message(RTM_NEWLINK, 10 + i, 'Ethernet{}'.format(i * 4)) for i in range(4)),
+            # Operational changes and interfaces unknown to port_util are ignored
+            link_message(RTM_NEWLINK, 10, 'Ethernet0', change=1) + link_message(RTM_NEWLINK, 2, 'eth0'),
+            link_message(RTM_DELLINK, 11, 'Ethernet4'),
+        ]
+        redis_client = FakeRedis()
+        run(redis_client, RecordedIPRoute(recording, {}))
+
+        assert redis_client.data == {
+            'PORT_INDEX_TABLE|Ethernet0': entry(1, 10),
+            'PORT_INDEX_TABLE|Ethernet8': entry(3, 12),
+            'PORT_INDEX_TABLE|Ethernet12': entry(4, 13),
+        }
+        # One pipeline per batch with changes
+        assert redis_client.executes == 2
+
+    def test_overrun_resyncs(self):
+        redis_client = FakeRedis({'PORT_INDEX_TABLE|Ethernet0': entry(1, 10),
+                                  'PORT_INDEX_TABLE|Ethernet4': entry(2, 11)})
+        # Ethernet4 was removed and Ethernet8 created while the events were dropped
+        links = {'Ethernet0': 10, 'Ethernet8': 12, 'eth0': 2}
+        recording = [errno.ENOBUFS, link_message(RTM_NEWLINK, 13, 'Ethernet12')]
+        ipr = RecordedIPRoute(recording, links)
+        run(redis_client, ipr)
+
+        assert ipr.dumps == 1
+        assert redis_client.data == {
+            'PORT_INDEX_TABLE|Ethernet0': entry(1, 10),
+            'PORT_INDEX_TABLE|Ethernet8': entry(3, 12),
+            'PORT_INDEX_TABLE|Ethernet12': entry(4, 13),
+        }
+
+    def test_other_socket_errors_are_raised(self):
+        ipr = RecordedIPRoute([errno.EBADF], {})
+        with pytest.raises(OSError):
+            port_index_mapper.process_link_events(FakeRedis(), ipr)
+
+    def test_malformed_message_is_skipped(self):
+        messages = list(MarshalRtnl().parse(link_message(RTM_NEWLINK, 11, 'Ethernet4')))
+        # A message without the header the mapper expects
+        messages.insert(0, {'header': {}})
+        redis_client = FakeRedis()
+        with mock.patch.object(port_index_mapper.syslog, 'syslog') as mock_syslog:
+            assert port_index_mapper.write_link_messages(redis_client, messages) == 1
+        assert mock_syslog.called
+        assert redis_client.data == {'PORT_INDEX_TABLE|Ethernet4': entry(2, 11)}
@@ -1,5 +1,9 @@
 #!/usr/bin/env python
 
+import collections
+import fcntl
+import hashlib
+import io
 import os
 import time
 import tarfile
@@ -7,6 +11,8 @@ import socket
 import yaml
 import json
 import syslog
+import zlib
+from multiprocessing.pool import ThreadPool
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from azure.storage.file import FileService
@@ -42,6 +48,23 @@ POLL_SLEEP = (60 * 60)
 MAX_RETRIES = 5
 UPLOAD_PREFIX = "UPLOADED_"
 
+# Poll interval while a core file is still being written
+CORE_POLL_INTERVAL = 10
+# The core file is compressed in blocks of this size, one gzip member each
+COMPRESS_BLOCK_SIZE = (4 * 1024 * 1024)
+# Max size of a range written by a single Azure file update_range call
+UPLOAD_CHUNK_SIZE = (4 * 1024 * 1024)
+# Delay before the first retry of a failed upload, doubled on each retry up
+# to PAUSE_ON_FAIL. Each retry resumes after the ranges already uploaded.
+RETRY_DELAY = 5
+# Remote file metadata holding the digest of the uploaded archive
+ARCHIVE_DIGEST_KEY = "sha256"
+
+# Defaults of the "upload_limits" section of RC_FILE
+DEFAULT_COMPRESS_THREADS = 2
+DEFAULT_COMPRESS_LEVEL = 6
+DEFAULT_MAX_UPLOAD_RATE = 0     # bytes per second, 0 for unlimited
+
 log_level = syslog.LOG_DEBUG
 
 def log_msg(lvl, fname, m):
@@ -68,6 +91,67 @@ def make_new_dir(p):
     os.system("rm -rf " + p)
     os.system("mkdir -p " + p)
 
+def compress_block(data, level):
+    # Compress a block as a standalone gzip member. A concatenation of gzip
+    # members is a valid gzip stream, so the blocks can be compressed in
+    # parallel. The gzip header has no timestamp, which makes the archive of
+    # a given core reproducible.
+    c = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return c.compress(data) + c.flush()
+
+def read_core_blocks(path, wait_for_write):
+    """
+    Yield the content of a core file in COMPRESS_BLOCK_SIZE blocks. With
+    wait_for_write the file may still be being written: keep reading as it
+    grows, until it hasn't changed for WAIT_FILE_WRITE2 seconds and at least
+    WAIT_FILE_WRITE1 seconds have passed.
+    """
+    start = time.time()
+    last_change = start
+    last_stat = None
+    offset = 0
+    buf = b""
+
+    with open(path, 'rb') as f:
+        while True:
+            # Seek explicitly, as a read past EOF may stick on some python versions
+            f.seek(offset)
+            data = f.read(COMPRESS_BLOCK_SIZE - len(buf))
+            if data:
+                offset += len(data)
+                buf += data
+                if len(buf) == COMPRESS_BLOCK_SIZE:
+                    yield buf
+                    buf = b""
+                continue
+
+            if not wait_for_write:
+                break
+
+            st = os.stat(path)
+            now = time.time()
+            if (st.st_size, st.st_mtime) != last_stat:
+                last_stat = (st.st_size, st.st_mtime)
+                last_change = now
+            elif now - last_change >= WAIT_FILE_WRITE2 and now - start >= WAIT_FILE_WRITE1:
+                break
+            time.sleep(CORE_POLL_INTERVAL)
+
+    # The file is complete once it hasn't changed for WAIT_FILE_WRITE2 seconds,
+    # anything written after that means the dump is still going on
+    if wait_for_write and os.stat(path).st_size != offset:
+        raise Exception("Dump file creation is too slow: " + path)
+
+    if buf:
+        yield buf
+
+def throttle(start, sent, rate):
+    # Sleep as needed to keep the average rate since start under rate bytes per second
+    if rate > 0:
+        delay = sent / float(rate) - (time.time() - start)
+        if delay > 0:
+            time.sleep(delay)
+
 def parse_a_json(data, prefix, val):
     for i in data:
         if type(data[i]) == dict:
@@ -95,6 +179,10 @@ class config:
     def get_dict(self):
         return self.parsed_data
 
+    def get_int(self, k, default):
+        v = self.get_data(k)
+        return int(v) if v != "" else default
+
     def get_core_info(self, corepath, devicename):
         info = {}
         info["corefname"] = os.path.basename(corepath)
@@ -183,33 +271,102 @@ class Handler(FileSystemEventHandler):
         elif event.event_type == 'created':
             # Take any action here when a file is first created.
             log_debug("Received create event - " +  event.src_path)
-            Handler.wait_for_file_write_complete(event.src_path)
-            Handler.handle_file(event.src_path)
+            # The core is compressed while it is being written
+            Handler.handle_file(event.src_path, wait_for_write=True)
 
 
     @staticmethod
-    def wait_for_file_write_complete(path):
-        mtime = 0
-
-        # Sleep for ample time enough for file dump to complete.
-        time.sleep(WAIT_FILE_WRITE1)
+    def build_archive(path, tarf_name, metafiles, wait_for_write):
+        """
+        Build tarf_name, a tar.gz of the metadata files and the core file.
+        The core is read and compressed block by block while it is being
+        written, with the blocks compressed in parallel threads. Returns the
+        sha256 digest of the archive.
+        """
+        threads = max(1, cfg.get_int(("upload_limits", "compress_threads"), DEFAULT_COMPRESS_THREADS))
+        level = cfg.get_int(("upload_limits", "compress_level"), DEFAULT_COMPRESS_LEVEL)
+
+        # The tar header of the core needs its final size, so the compressed
+        # blocks of the core go to a side file and are put after the header
+        # once the core is complete.
+        body_name = tarf_name + ".body"
+        core_size = 0
+        pending = collections.deque()
+        pool = ThreadPool(threads)
+        try:
+            with open(body_name, "wb") as body:
+                for block in read_core_blocks(path, wait_for_write):
+                    core_size += len(block)
+                    pending.append(pool.apply_async(compress_block, (block, level)))
+                    # Bound the number of blocks held in memory
+                    if len(pending) >= 2 * threads:
+                        body.write(pending.popleft().get())
+                while pending:
+                    body.write(pending.popleft().get())
+        finally:
+            pool.terminate()
+            pool.join()
+        log_debug("Core compressed: {} ({} bytes)".format(path, core_size))
 
-        # Give another chance & poll until mtime stabilizes
-        while mtime != os.stat(path).st_mtime:
-            mtime = os.stat(path).st_mtime
-            time.sleep(10)
+        cfg.get_core_info(path, hostname)
 
-        # A safety pause for double confirmation
-        time.sleep(WAIT_FILE_WRITE2)
-        if mtime != os.stat(path).st_mtime:
-            raise Exception("Dump file creation is too slow: " + path)
-            # Give up as something is terribly wrong with this file.
+        head = io.BytesIO()
+        tar = tarfile.open(fileobj=head, mode="w")
+        info = tar.gettarinfo(path)
+        info.size = core_size
+        for e in metafiles:
+            # Stamp the metadata files, which are regenerated for every archive,
+            # with the core mtime so the archive of a given core is reproducible
+            # and an interrupted upload can be resumed after a restart
+            meta_info = tar.gettarinfo(metafiles[e])
+            meta_info.mtime = info.mtime
+            with open(metafiles[e], "rb") as f:
+                tar.addfile(meta_info, f)
+        head_data = head.getvalue() + info.tobuf(tar.format, tar.encoding, tar.errors)
+
+        # Pad the core to a tar block, then the end of archive marker padded to a tar record
+        tail_size = (-core_size % tarfile.BLOCKSIZE) + 2 * tarfile.BLOCKSIZE
+        tail_size += -(len(head_data) + core_size + tail_size) % tarfile.RECORDSIZE
+        tail_data = b"\0" * tail_size
+
+        digest = hashlib.sha256()
+        with open(tarf_name, "wb") as out:
+            data = compress_block(head_data, level)
+            out.write(data)
+            digest.update(data)
+            with open(body_name, "rb") as body:
+                while True:
+                    data = body.read(COMPRESS_BLOCK_SIZE)
+                    if not data:
+                        break
+                    out.write(data)
+                    digest.update(data)
+            data = compress_block(tail_data, level)
+            out.write(data)
+            digest.update(data)
+        os.remove(body_name)
+
+        return digest.hexdigest()
 
-        log_debug("File write complete - " +  path)
 
+    @staticmethod
+    def handle_file(path, wait_for_write=False):
+        # Hold a shared lock on the core while it is archived and uploaded,
+        # core_cleanup.py doesn't delete a locked core
+        try:
+            core_lock = open(path, "rb")
+        except (IOError, OSError) as e:
+            # The core was deleted or renamed since it was listed
+            log_warn("Skipping {}: {}".format(path, str(e)))
+            return
+        fcntl.flock(core_lock, fcntl.LOCK_SH)
+        try:
+            Handler.archive_and_upload(path, wait_for_write)
+        finally:
+            core_lock.close()
 
     @staticmethod
-    def handle_file(path):
+    def archive_and_upload(path, wait_for_write):
         lpath = "/".join(cwd)
         make_new_dir(lpath)
         os.chdir(lpath)
@@ -220,22 +377,68 @@ class Handler(FileSystemEventHandler):
         fname = os.path.basename(path)
         tarf_name = fname + ".tar.gz"
 
-        cfg.get_core_info(path, hostname)
-        
-        tar = tarfile.open(tarf_name, "w:gz")
-        for e in metafiles:
-            tar.add(metafiles[e])
-        tar.add(path)
-        tar.close()
+        digest = Handler.build_archive(path, tarf_name, metafiles, wait_for_write)
         log_debug("Tar file for upload created: " + tarf_name)
 
-        Handler.upload_file(tarf_name, tarf_name, path)
+        Handler.upload_file(tarf_name, tarf_name, path, digest)
 
         log_debug("File uploaded - " +  path)
         os.chdir(INIT_CWD)
 
     @staticmethod
-    def upload_file(fname, fpath, coref):
+    def get_uploaded_chunks(svc, rdir, fname, size, digest):
+        """
+        Returns the offsets of the chunks of the archive already present in
+        the remote file, or None if there is no remote file of this archive
+        """
+        if not svc.exists(sharename, rdir, fname):
+            return None
+
+        props = svc.get_file_properties(sharename, rdir, fname)
+        if props.properties.content_length != size or props.metadata.get(ARCHIVE_DIGEST_KEY) != digest:
+            return None
+
+        done = set()
+        for r in svc.list_ranges(sharename, rdir, fname):
+            start = -(-r.start // UPLOAD_CHUNK_SIZE) * UPLOAD_CHUNK_SIZE
+            while start < size and start + min(UPLOAD_CHUNK_SIZE, size - start) - 1 <= r.end:
+                done.add(start)
+                start += UPLOAD_CHUNK_SIZE
+        return done
+
+    @staticmethod
+    def upload_chunks(svc, rdir, fname, fpath, digest):
+        """
+        Upload the archive in UPLOAD_CHUNK_SIZE ranges, skipping the ranges
+        uploaded by a previous attempt, under the configured bandwidth limit
+        """
+        rate = cfg.get_int(("upload_limits", "max_upload_rate"), DEFAULT_MAX_UPLOAD_RATE)
+        size = os.path.getsize(fpath)
+
+        done = Handler.get_uploaded_chunks(svc, rdir, fname, size, digest)
+        if done is None:
+            svc.create_file(sharename, rdir, fname, size, metadata={ARCHIVE_DIGEST_KEY: digest})
+            done = set()
+        elif done:
+            log_info("Resuming upload of {}, {} of {} bytes already uploaded".format(
+                fname, min(len(done) * UPLOAD_CHUNK_SIZE, size), size))
+
+        start_time = time.time()
+        sent = 0
+        with open(fpath, "rb") as f:
+            for start in range(0, size, UPLOAD_CHUNK_SIZE):
+                if start in done:
+                    continue
+                f.seek(start)
+                data = f.read(UPLOAD_CHUNK_SIZE)
+                # validate_content sends the MD5 of the chunk, which the service checks
+                svc.update_range(sharename, rdir, fname, data, start, start + len(data) - 1,
+                                 validate_content=True)
+                sent += len(data)
+                throttle(start_time, sent, rate)
+
+    @staticmethod
+    def upload_file(fname, fpath, coref, digest):
         daemonname = fname.split(".")[0]
         i = 0
         fail_msg = ""
@@ -252,7 +455,7 @@ class Handler(FileSystemEventHandler):
 
                 log_debug("Remote dir created: " + "/".join(e))
 
-                svc.create_file_from_path(sharename, "/".join(l), fname, fpath)
+                Handler.upload_chunks(svc, "/".join(l), fname, fpath, digest)
                 log_debug("Remote file created: name{} path{}".format(fname, fpath))
                 newcoref = os.path.dirname(coref) + "/" + UPLOAD_PREFIX + os.path.basename(coref)
                 os.rename(coref, newcoref)
@@ -262,8 +465,8 @@ class Handler(FileSystemEventHandler):
                 log_err("core uploader failed: Failed during upload (" + coref + ") err: ("+ str(ex) +") retry:" + str(i))
                 if not os.path.exists(fpath):
                     break
+                time.sleep(min(RETRY_DELAY * (2 ** i), PAUSE_ON_FAIL))
                 i += 1
-                time.sleep(PAUSE_ON_FAIL)
 
 
     @staticmethod
@@ -0,0 +1,196 @@
+import gzip
+import imp
+import json
+import os
+import sys
+import tarfile
+
+import mock
+import pytest
+
+# Stand in for the modules which are only installed on the switch
+sys.modules.setdefault('watchdog', mock.MagicMock())
+sys.modules.setdefault('watchdog.observers', mock.MagicMock())
+sys.modules.setdefault('watchdog.events', mock.MagicMock(FileSystemEventHandler=object))
+sys.modules.setdefault('azure', mock.MagicMock())
+sys.modules.setdefault('azure.storage', mock.MagicMock())
+sys.modules.setdefault('azure.storage.file', mock.MagicMock())
+
+CORE_UPLOADER = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'core_uploader.py')
+core_uploader = imp.load_source('core_uploader', CORE_UPLOADER)
+
+CHUNK_SIZE = 1024
+
+
+class FakeFileService(object):
+    """
+    In-memory stand-in for the Azure file service, keeping the written ranges
+    of each file. update_range fails on the calls listed in fail_calls.
+    """
+    def __init__(self, fail_calls=()):
+        self.files = {}
+        self.fail_calls = set(fail_calls)
+        self.update_calls = []
+
+    def __call__(self, account_name, account_key):
+        return self
+
+    def create_directory(self, share, rdir):
+        pass
+
+    def exists(self, share, rdir, fname):
+        return (rdir, fname) in self.files
+
+    def create_file(self, share, rdir, fname, size, metadata=None):
+        self.files[(rdir, fname)] = {'data': bytearray(size), 'ranges': [], 'metadata': dict(metadata or {})}
+
+    def get_file_properties(self, share, rdir, fname):
+        f = self.files[(rdir, fname)]
+        return mock.Mock(properties=mock.Mock(content_length=len(f['data'])), metadata=f['metadata'])
+
+    def list_ranges(self, share, rdir, fname):
+        return [mock.Mock(start=start, end=end) for (start, end) in sorted(self.files[(rdir, fname)]['ranges'])]
+
+    def update_range(self, share, rdir, fname, data, start, end, validate_content=False):
+        assert validate_content
+        self.update_calls.append(start)
+        if len(self.update_calls) in self.fail_calls:
+            raise IOError('Connection reset by peer')
+        f = self.files[(rdir, fname)]
+        f['data'][start:end + 1] = data
+        f['ranges'].append((start, end))
+
+    def content(self, rdir, fname):
+        return bytes(self.files[(rdir, fname)]['data'])
+
+
+def make_config(tmpdir, **upload_limits):
+    version = tmpdir.join('sonic_version.yml')
+    version.write('build_version: test\n')
+    rc_file = tmpdir.join('core_analyzer.rc.json')
+    rc_file.write(json.dumps({
+        'upload_limits': upload_limits,
+        'metadata_files_in_archive': {
+            'version': str(version),
+            'core_info': str(tmpdir.join('core_info.json')),
+        },
+    }))
+    with mock.patch.object(core_uploader, 'RC_FILE', str(rc_file)):
+        cfg = core_uploader.config()
+    # config keeps the parsed values in a class attribute
+    cfg.cfg_data = {}
+    core_uploader.parse_a_json(cfg.parsed_data, (), cfg.cfg_data)
+    return cfg
+
+
+@pytest.fixture
+def uploader(tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    monkeypatch.setattr(core_uploader, 'cfg', make_config(tmpdir))
+    monkeypatch.setattr(core_uploader, 'UPLOAD_CHUNK_SIZE', CHUNK_SIZE)
+    monkeypatch.setattr(core_uploader, 'sharename', 'corefiles-root')
+    monkeypatch.setattr(core_uploader, 'sonicversion', 'test')
+    monkeypatch.setattr(core_uploader, 'asicname', 'vs')
+    monkeypatch.setattr(core_uploader, 'hostname', 'switch1')
+    monkeypatch.setattr(core_uploader, 'log_level', 0)
+    return tmpdir
+
+
+def write_core(tmpdir, name, size):
+    core = tmpdir.mkdir('core').join(name)
+    core.write_binary(os.urandom(size))
+    return core
+
+
+class TestBuildArchive(object):
+    def test_archive_content(self, uploader):
+        core = write_core(uploader, 'orchagent.1600000000.42.core', 3 * CHUNK_SIZE + 100)
+        metafiles = core_uploader.cfg.get_dict()['metadata_files_in_archive']
+        digest = core_uploader.Handler.build_archive(str(core), 'orchagent.tar.gz', metafiles, False)
+
+        with tarfile.open('orchagent.tar.gz') as tar:
+            names = tar.getnames()
+            assert names[-1].endswith('orchagent.1600000000.42.core')
+            assert tar.extractfile(names[-1]).read() == core.read_binary()
+            assert json.loads(tar.extractfile(names[1]).read().decode())['corefname'] == core.basename
+
+        # The archive of a given core is reproducible, so an upload can be resumed
+        assert core_uploader.Handler.build_archive(str(core), 'again.tar.gz', metafiles, False) == digest
+
+    @pytest.mark.parametrize('threads', [0, -1, 1, 4])
+    def test_compress_threads(self, uploader, threads):
+        core_uploader.cfg = make_config(uploader, compress_threads=threads)
+        core = write_core(uploader, 'syncd.1600000000.7.core', 100)
+        metafiles = core_uploader.cfg.get_dict()['metadata_files_in_archive']
+        core_uploader.Handler.build_archive(str(core), 'syncd.tar.gz', metafiles, False)
+        with gzip.open('syncd.tar.gz') as f:
+            assert f.read()
+
+
+class TestUpload(object):
+    def upload(self, uploader, svc, size):
+        core = write_core(uploader, 'orchagent.1600000000.42.core', 100)
+        archive = uploader.join('orchagent.tar.gz')
+        archive.write_binary(os.urandom(size))
+        with mock.patch.object(core_uploader, 'FileService', svc), \
+                mock.patch.object(core_uploader.time, 'sleep') as sleep:
+            core_uploader.Handler.upload_file(archive.basename, str(archive), str(core), 'digest')
+        return core, archive, sleep
+
+    def test_upload_in_chunks(self, uploader):
+        svc = FakeFileService()
+        core, archive, sleep = self.upload(uploader, svc, 3 * CHUNK_SIZE + 100)
+
+        assert svc.update_calls == [0, CHUNK_SIZE, 2 * CHUNK_SIZE, 3 * CHUNK_SIZE]
+        assert svc.content('test/vs/orchagent/switch1', 'orchagent.tar.gz') == archive.read_binary()
+        assert not core.exists()
+        assert core.dirpath().join('UPLOADED_' + core.basename).exists()
+        assert not sleep.called
+
+    def test_retry_resumes_upload(self, uploader):
+        # The 2nd and the 4th range writes fail
+        svc = FakeFileService(fail_calls=[2, 4])
+        core, archive, sleep = self.upload(uploader, svc, 3 * CHUNK_SIZE + 100)
+
+        # Each retry resumes after the ranges already uploaded, with one retry
+        # budget for the whole archive and an increasing delay
+        assert svc.update_calls == [0, CHUNK_SIZE, CHUNK_SIZE, 2 * CHUNK_SIZE, 2 * CHUNK_SIZE, 3 * CHUNK_SIZE]
+        assert sleep.call_args_list == [mock.call(core_uploader.RETRY_DELAY), mock.call(2 * core_uploader.RETRY_DELAY)]
+        assert svc.content('test/vs/orchagent/switch1', 'orchagent.tar.gz') == archive.read_binary()
+        assert core.dirpath().join('UPLOADED_' + core.basename).exists()
+
+    def test_retry_delay_is_bounded(self, uploader):
+        svc = FakeFileService(fail_calls=range(1, 21))
+        _, _, sleep = self.upload(uploader, svc, 100)
+        assert len(sleep.call_args_list) == 20
+        assert max(call[0][0] for call in sleep.call_args_list) == core_uploader.PAUSE_ON_FAIL
+
+    def test_stale_remote_file(self, uploader):
+        svc = FakeFileService()
+        # A remote file of another archive with the same name is rewritten from scratch
+        svc.create_file('corefiles-root', 'test/vs/orchagent/switch1', 'orchagent.tar.gz', 2 * CHUNK_SIZE,
+                        metadata={core_uploader.ARCHIVE_DIGEST_KEY: 'other'})
+        svc.files[('test/vs/orchagent/switch1', 'orchagent.tar.gz')]['ranges'] = [(0, 2 * CHUNK_SIZE - 1)]
+        _, archive, _ = self.upload(uploader, svc, 2 * CHUNK_SIZE)
+        assert svc.update_calls == [0, CHUNK_SIZE]
+        assert svc.content('test/vs/orchagent/switch1', 'orchagent.tar.gz') == archive.read_binary()
+
+
+class TestHandleFile(object):
+    def test_missing_core(self, uploader):
+        with mock.patch.object(core_uploader.Handler, 'archive_and_upload') as archive_and_upload:
+            core_uploader.Handler.handle_file(str(uploader.join('gone.1600000000.1.core')))
+        assert not archive_and_upload.called
+
+    def test_core_locked_while_uploaded(self, uploader):
+        core = write_core(uploader, 'orchagent.1600000000.42.core', 100)
+
+        def archive_and_upload(path, wait_for_write):
+            # core_cleanup.py can't take the core while it is being uploaded
+            with open(path, 'rb') as f:
+                with pytest.raises(IOError):
+                    core_uploader.fcntl.flock(f, core_uploader.fcntl.LOCK_EX | core_uploader.fcntl.LOCK_NB)
+
+        with mock.patch.object(core_uploader.Handler, 'archive_and_upload', side_effect=archive_and_upload) as mock_upload:
+            core_uploader.Handler.handle_file(str(core))
+        assert mock_upload.called
@@ -0,0 +1,202 @@
+import imp
+import os
+import sys
+import threading
+import time
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+# hostcfgd only runs on the switch, stand in for the SONiC modules it imports
+sys.modules.setdefault('swsssdk', mock.MagicMock())
+sys.modules.setdefault('sonic_py_common', mock.MagicMock())
+
+HOSTCFGD = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'hostcfgd')
+hostcfgd = imp.load_source('hostcfgd', HOSTCFGD)
+
+
+def make_daemon(config=None):
+    """ HostConfigDaemon with its CONFIG_DB mirror set, without connecting """
+    daemon = hostcfgd.HostConfigDaemon.__new__(hostcfgd.HostConfigDaemon)
+    daemon.handlers = {}
+    daemon.config_cache = {'FEATURE': {}}
+    daemon.config_cache.update(config or {})
+    daemon.is_multi_npu = False
+    daemon.num_npus = 1
+    return daemon
+
+
+class TestFeatureState(object):
+    def test_enable_batches_units(self):
+        daemon = make_daemon()
+        feature_table = {'telemetry': {'state': 'enabled', 'has_timer': 'True'}}
+        with mock.patch.object(hostcfgd.subprocess, 'check_call') as check_call:
+            daemon.update_feature_state('telemetry', 'enabled', feature_table)
+        assert [c[0][0] for c in check_call.call_args_list] == [
+            'sudo systemctl unmask telemetry.service telemetry.timer',
+            'sudo systemctl enable telemetry.timer',
+            'sudo systemctl start telemetry.timer',
+        ]
+
+    def test_disable_batches_units(self):
+        daemon = make_daemon()
+        feature_table = {'telemetry': {'state': 'disabled', 'has_timer': 'True'}}
+        with mock.patch.object(hostcfgd.subprocess, 'check_call') as check_call:
+            daemon.update_feature_state('telemetry', 'disabled', feature_table)
+        assert [c[0][0] for c in check_call.call_args_list] == [
+            'sudo systemctl stop telemetry.timer telemetry.service',
+            'sudo systemctl disable telemetry.timer telemetry.service',
+            'sudo systemctl mask telemetry.timer telemetry.service',
+        ]
+
+    def test_multi_asic_units(self):
+        daemon = make_daemon()
+        daemon.is_multi_npu = True
+        daemon.num_npus = 2
+        feature_table = {'bgp': {'state': 'enabled', 'has_global_scope': 'False', 'has_per_asic_scope': 'True'}}
+        with mock.patch.object(hostcfgd.subprocess, 'check_call') as check_call:
+            daemon.update_feature_state('bgp', 'enabled', feature_table)
+        assert check_call.call_args_list[-1][0][0] == 'sudo systemctl start bgp@0.service bgp@1.service'
+
+    def test_stop_on_failure(self):
+        daemon = make_daemon()
+        feature_table = {'snmp': {'state': 'enabled'}}
+        error = hostcfgd.subprocess.CalledProcessError(1, 'systemctl')
+        with mock.patch.object(hostcfgd.subprocess, 'check_call', side_effect=error) as check_call:
+            daemon.update_feature_state('snmp', 'enabled', feature_table)
+        assert check_call.call_count == 1
+
+    def test_update_all_feature_states_bounded(self):
+        features = dict(('feature{}'.format(i), {'state': 'enabled'}) for i in range(10))
+        features['disabled_feature'] = {'state': ''}
+        daemon = make_daemon({'FEATURE': features})
+
+        lock = threading.Lock()
+        running = [0]
+        max_running = [0]
+        updated = []
+
+        def update_feature_state(feature_name, state, feature_table):
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+                updated.append(feature_name)
+
+        daemon.update_feature_state = update_feature_state
+        daemon.update_all_feature_states()
+
+        assert sorted(updated) == sorted('feature{}'.format(i) for i in range(10))
+        assert 1 < max_running[0] <= hostcfgd.FEATURE_UPDATE_WORKERS
+
+
+class EndOfMessages(Exception):
+    pass
+
+
+class FakeConfigDBConnector(object):
+    TABLE_NAME_SEPARATOR = '|'
+
+    @staticmethod
+    def deserialize_key(key):
+        tokens = key.split('|')
+        return tuple(tokens) if len(tokens) > 1 else key
+
+
+class FakeRedis(object):
+    """ CONFIG_DB client replaying keyspace notifications """
+    def __init__(self, db, notifications):
+        self.db = db
+        self.messages = [{'type': 'psubscribe', 'channel': '__keyspace@4__:*', 'data': 1}]
+        for redis_key, operation in notifications:
+            self.messages.append({'type': 'pmessage', 'channel': '__keyspace@4__:' + redis_key, 'data': operation})
+
+    def pubsub(self):
+        return self
+
+    def psubscribe(self, pattern):
+        pass
+
+    def listen_message(self):
+        if not self.messages:
+            raise EndOfMessages()
+        return self.messages.pop(0)
+
+    def hgetall(self, redis_key):
+        return dict(self.db.get(redis_key, {}))
+
+
+def listen(daemon, db, notifications):
+    config_db = mock.MagicMock()
+    config_db.TABLE_NAME_SEPARATOR = '|'
+    config_db.get_redis_client.return_value = FakeRedis(db, notifications)
+    # As swsssdk, the NULL placeholder of a key without attributes is dropped
+    config_db.raw_to_typed.side_effect = lambda raw_data: dict(
+        (field, value) for (field, value) in raw_data.items() if field != 'NULL')
+    daemon.config_db = config_db
+    with mock.patch.object(hostcfgd, 'ConfigDBConnector', FakeConfigDBConnector):
+        try:
+            daemon.listen()
+        except EndOfMessages:
+            pass
+
+
+class TestListen(object):
+    def test_set_and_del(self):
+        daemon = make_daemon({'LOOPBACK_INTERFACE': {}})
+        handler = mock.MagicMock()
+        daemon.subscribe('LOOPBACK_INTERFACE', handler)
+        db = {'LOOPBACK_INTERFACE|Loopback0|10.1.0.32/32': {'NULL': 'NULL'}}
+
+        key = ('Loopback0', '10.1.0.32/32')
+        listen(daemon, db, [('LOOPBACK_INTERFACE|Loopback0|10.1.0.32/32', 'hset')])
+        handler.assert_called_once_with(key, {}, True)
+        assert daemon.config_cache['LOOPBACK_INTERFACE'] == {key: {}}
+
+        listen(daemon, {}, [('LOOPBACK_INTERFACE|Loopback0|10.1.0.32/32', 'del'),
+                            ('PORT|Ethernet0', 'hset')])
+        assert handler.call_args_list == [mock.call(key, {}, True),
+                                          mock.call(key, {}, False)]
+        assert daemon.config_cache['LOOPBACK_INTERFACE'] == {}
+
+    def test_set_of_deleted_key(self):
+        daemon = make_daemon({'FEATURE': {'snmp': {'state': 'enabled'}}})
+        daemon.subscribe('FEATURE', daemon.feature_state_handler)
+        daemon.update_feature_state = mock.MagicMock()
+
+        # The hset notification is received after the key was deleted
+        listen(daemon, {}, [('FEATURE|snmp', 'hset')])
+
+        assert daemon.config_cache['FEATURE'] == {}
+        assert not daemon.update_feature_state.called
+
+    def test_feature_update(self):
+        daemon = make_daemon({'FEATURE': {}})
+        daemon.subscribe('FEATURE', daemon.feature_state_handler)
+        daemon.update_feature_state = mock.MagicMock()
+
+        listen(daemon, {'FEATURE|snmp': {'state': 'disabled'}}, [('FEATURE|snmp', 'hset')])
+
+        daemon.update_feature_state.assert_called_once_with('snmp', 'disabled', {'snmp': {'state': 'disabled'}})
+
+
+class TestAaaCfgDebounce(object):
+    def test_bulk_changes_regenerate_once(self):
+        aaacfg = hostcfgd.AaaCfg()
+        aaacfg.modify_conf_file = mock.MagicMock()
+        with mock.patch.object(hostcfgd, 'AAA_CFG_DEBOUNCE_SECS', 0.1):
+            aaacfg.aaa_update('authentication', {'login': 'tacacs+,local'})
+            for i in range(5):
+                aaacfg.tacacs_server_update('10.0.0.{}'.format(i), {'priority': '1'})
+            aaacfg.tacacs_global_update('global', {'timeout': '10'})
+            assert not aaacfg.modify_conf_file.called
+            time.sleep(0.5)
+
+        aaacfg.modify_conf_file.assert_called_once_with()
+        assert len(aaacfg.tacplus_servers) == 5
+        assert aaacfg.tacplus_global == {'timeout': '10'}
+        assert aaacfg.modify_conf_timer is None
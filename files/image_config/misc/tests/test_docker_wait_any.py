@@ -0,0 +1,231 @@
+import imp
+import json
+import os
+import re
+import shutil
+import socket
+import tempfile
+import threading
+
+try:
+    import queue
+    import socketserver
+    from http.server import BaseHTTPRequestHandler
+except ImportError:
+    # python 2
+    import Queue as queue
+    import SocketServer as socketserver
+    from BaseHTTPServer import BaseHTTPRequestHandler
+
+import pytest
+
+docker = pytest.importorskip('docker')
+
+DOCKER_WAIT_ANY = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'docker-wait-any')
+docker_wait_any = imp.load_source('docker_wait_any', DOCKER_WAIT_ANY)
+
+API_VERSION = '1.40'
+
+
+class DockerApiHandler(BaseHTTPRequestHandler):
+    """ The part of the Docker engine API used by docker-wait-any """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        dockerd = self.server.dockerd
+        path = re.sub(r'^/v[\d.]+', '', self.path.split('?')[0])
+
+        match = re.match(r'^/containers/([^/]+)/json$', path)
+        if path == '/version':
+            self.send_json(200, {'ApiVersion': API_VERSION, 'Version': '19.03.8'})
+        elif match:
+            running = dockerd.containers.get(match.group(1))
+            if running is None:
+                self.send_json(404, {'message': 'No such container: {}'.format(match.group(1))})
+            else:
+                self.send_json(200, {'State': {'Running': running}})
+        elif path == '/events':
+            self.stream_events(dockerd.subscribe())
+        else:
+            self.send_json(404, {'message': 'page not found'})
+
+    def stream_events(self, events):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        while True:
+            event = events.get()
+            if event is None:
+                self.wfile.write(b'0\r\n\r\n')
+                return
+            data = json.dumps(event).encode() + b'\n'
+            self.wfile.write('{:x}\r\n'.format(len(data)).encode() + data + b'\r\n')
+            self.wfile.flush()
+
+
+class DockerApiServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, address = socketserver.UnixStreamServer.get_request(self)
+        self.dockerd.connections.append(request)
+        # UNIX sockets have no client address, BaseHTTPRequestHandler expects one
+        return request, ('local', 0)
+
+    def handle_error(self, request, client_address):
+        # The connections are dropped on purpose by FakeDockerd.stop()
+        pass
+
+
+class FakeDockerd(object):
+    """
+    Serves a fake Docker engine API on a UNIX socket. stop() drops the socket
+    and its connections, like a restart of the docker daemon.
+    """
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.containers = {}
+        self.subscribers = []
+        self.connections = []
+        self.subscribed = threading.Event()
+        self.server = None
+
+    def start(self):
+        self.server = DockerApiServer(self.socket_path, DockerApiHandler)
+        self.server.dockerd = self
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        for connection in self.connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+        self.connections = []
+        for events in self.subscribers:
+            events.put(None)
+        self.subscribers = []
+        os.unlink(self.socket_path)
+
+    def subscribe(self):
+        events = queue.Queue()
+        self.subscribers.append(events)
+        self.subscribed.set()
+        return events
+
+    def wait_subscribed(self):
+        assert self.subscribed.wait(5)
+        self.subscribed.clear()
+
+    def emit(self, action, name):
+        for events in self.subscribers:
+            events.put({'Type': 'container', 'Action': action, 'status': action,
+                        'Actor': {'Attributes': {'name': name}}})
+
+
+class Waiter(object):
+    """ Runs wait_for_containers in a thread """
+    def __init__(self, socket_path, container_names):
+        self.result = None
+        client = docker.APIClient(base_url='unix://' + socket_path, version=API_VERSION)
+        self.thread = threading.Thread(target=self.run, args=(client, container_names))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self, client, container_names):
+        self.result = docker_wait_any.wait_for_containers(client, container_names)
+
+    def join(self):
+        self.thread.join(5)
+        assert not self.thread.is_alive()
+        return self.result
+
+
+@pytest.fixture
+def dockerd(monkeypatch):
+    monkeypatch.setattr(docker_wait_any, 'RETRY_DELAY_SECS', 0.05)
+    monkeypatch.setattr(docker_wait_any, 'MAX_RETRY_DELAY_SECS', 0.2)
+    tmp_dir = tempfile.mkdtemp()
+    dockerd = FakeDockerd(os.path.join(tmp_dir, 'docker.sock'))
+    dockerd.containers.update({'swss': True, 'syncd': True})
+    yield dockerd
+    if dockerd.server is not None and os.path.exists(dockerd.socket_path):
+        dockerd.stop()
+    shutil.rmtree(tmp_dir)
+
+
+class TestDockerWaitAny(object):
+    def test_container_stops(self, dockerd):
+        dockerd.start()
+        waiter = Waiter(dockerd.socket_path, ['swss', 'syncd'])
+        dockerd.wait_subscribed()
+
+        # Events of other containers or actions are ignored
+        dockerd.emit('die', 'teamd')
+        dockerd.emit('start', 'swss')
+        dockerd.emit('die', 'syncd')
+        assert waiter.join() == 'syncd'
+
+    def test_container_already_stopped(self, dockerd):
+        dockerd.containers['swss'] = False
+        dockerd.start()
+        assert Waiter(dockerd.socket_path, ['swss', 'syncd']).join() == 'swss'
+
+    def test_missing_container_is_waited_on(self, dockerd):
+        dockerd.start()
+        waiter = Waiter(dockerd.socket_path, ['teamd', 'syncd'])
+        dockerd.wait_subscribed()
+        dockerd.emit('stop', 'teamd')
+        assert waiter.join() == 'teamd'
+
+    def test_daemon_restart(self, dockerd):
+        dockerd.start()
+        waiter = Waiter(dockerd.socket_path, ['swss', 'syncd'])
+        dockerd.wait_subscribed()
+
+        # The daemon goes away, subscribing again fails until it is back
+        dockerd.stop()
+        threading.Event().wait(0.5)
+        assert waiter.thread.is_alive()
+        dockerd.start()
+        dockerd.wait_subscribed()
+
+        dockerd.emit('die', 'swss')
+        assert waiter.join() == 'swss'
+
+    def test_container_stopped_during_restart(self, dockerd):
+        dockerd.start()
+        waiter = Waiter(dockerd.socket_path, ['swss', 'syncd'])
+        dockerd.wait_subscribed()
+
+        dockerd.stop()
+        dockerd.containers['syncd'] = False
+        dockerd.start()
+        # Caught by the inspection following the new subscription
+        assert waiter.join() == 'syncd'
+
+    def test_daemon_not_started_yet(self, dockerd):
+        waiter = Waiter(dockerd.socket_path, ['swss', 'syncd'])
+        threading.Event().wait(0.3)
+        dockerd.start()
+        dockerd.wait_subscribed()
+        dockerd.emit('die', 'swss')
+        assert waiter.join() == 'swss'
@@ -0,0 +1,129 @@
+import imp
+import os
+import socket
+import subprocess
+import threading
+import sys
+import time
+
+import pytest
+
+PROCESS_WATCHER = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'process_watcher')
+process_watcher = imp.load_source('process_watcher', PROCESS_WATCHER)
+
+SLEEPER = 'import time; time.sleep(1000)'
+
+
+def cmdline(*args):
+    return ' '.join([sys.executable, '-c', SLEEPER] + list(args))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture(scope='module')
+def connector_table():
+    """
+    A ProcessTable kept up to date by the netlink process connector only. The
+    connector is bound to the pid of the test process, so it is opened once.
+    """
+    try:
+        sock = process_watcher.open_proc_connector()
+    except socket.error as e:
+        pytest.skip('netlink process connector unavailable: {}'.format(e))
+
+    table = process_watcher.ProcessTable()
+    table.rescan()
+    watcher = threading.Thread(target=process_watcher.watch_proc_connector, args=(table, sock))
+    watcher.daemon = True
+    watcher.start()
+    return table
+
+
+@pytest.fixture
+def spawn():
+    procs = []
+
+    def spawn(*args):
+        proc = subprocess.Popen([sys.executable, '-c', SLEEPER] + list(args))
+        procs.append(proc)
+        return proc
+
+    yield spawn
+    for proc in procs:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+class TestReadCmdline(object):
+    @pytest.fixture
+    def proc_path(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(process_watcher, 'PROC_PATH', str(tmpdir))
+        return tmpdir
+
+    def write_cmdline(self, proc_path, pid, data):
+        proc_path.mkdir(str(pid)).join('cmdline').write(data, mode='wb')
+
+    def test_arguments(self, proc_path):
+        self.write_cmdline(proc_path, 1, '/usr/bin/python\0/usr/bin/bgpcfgd\0')
+        assert process_watcher.read_cmdline(1) == '/usr/bin/python /usr/bin/bgpcfgd'
+
+    def test_empty_last_argument(self, proc_path):
+        # Matches ' '.join(psutil.Process(pid).cmdline()) == 'foo -x '
+        self.write_cmdline(proc_path, 1, 'foo\0-x\0\0')
+        assert process_watcher.read_cmdline(1) == 'foo -x '
+
+    def test_gone(self, proc_path):
+        assert process_watcher.read_cmdline(1) is None
+
+
+class TestProcConnector(object):
+    def test_spawn_and_kill(self, connector_table, spawn):
+        proc = spawn('spawn-and-kill')
+        assert wait_for(lambda: connector_table.cmdlines.get(proc.pid) == cmdline('spawn-and-kill'))
+        assert connector_table.find_running(cmdline('spawn-and-kill'))
+
+        proc.kill()
+        proc.wait()
+        assert wait_for(lambda: proc.pid not in connector_table.cmdlines)
+        assert not connector_table.is_running(cmdline('spawn-and-kill'))
+
+    def test_many_processes(self, connector_table, spawn):
+        procs = [spawn('many', '{:02d}'.format(i)) for i in range(20)]
+        assert wait_for(lambda: all(proc.pid in connector_table.cmdlines for proc in procs))
+        assert all(connector_table.find_running(cmdline('many', '{:02d}'.format(i))) for i in range(20))
+
+        for proc in procs[:10]:
+            proc.kill()
+            proc.wait()
+        assert wait_for(lambda: not any(proc.pid in connector_table.cmdlines for proc in procs[:10]))
+        assert not any(connector_table.is_running(cmdline('many', '{:02d}'.format(i))) for i in range(10))
+        assert all(connector_table.is_running(cmdline('many', '{:02d}'.format(i))) for i in range(10, 20))
+
+    def test_stopped_process(self, connector_table, spawn):
+        proc = spawn('stopped')
+        assert wait_for(lambda: proc.pid in connector_table.cmdlines)
+        os.kill(proc.pid, 19)  # SIGSTOP
+        assert wait_for(lambda: process_watcher.read_state(proc.pid) == 'T')
+        assert not connector_table.is_running(cmdline('stopped'))
+
+
+class TestRescan(object):
+    def test_missed_events(self, spawn):
+        # Without any event source, a negative answer is confirmed by a rescan of /proc
+        table = process_watcher.ProcessTable()
+        table.rescan()
+        proc = spawn('missed')
+        assert table.is_running(cmdline('missed'))
+
+        proc.kill()
+        proc.wait()
+        assert not table.is_running(cmdline('missed'))
+        assert proc.pid not in table.cmdlines
@@ -1,15 +1,32 @@
 #!/usr/bin/env python
 
+import argparse
+import errno
+import fcntl
+import json
 import syslog
 import os
+import stat
+import time
 
 from collections import defaultdict
-from datetime import datetime
 
 SYSLOG_IDENTIFIER = 'core_cleanup.py'
-CORE_FILE_DIR = os.path.basename(__file__)
+CORE_FILE_DIR = '/var/core/'
+INDEX_FILE = '/var/cache/core_cleanup/index.json'
+INDEX_VERSION = 1
 MAX_CORE_FILES = 4
 
+# Global quota on the total size of the core files in bytes, 0 for no quota
+MAX_TOTAL_CORE_SIZE = 0
+
+# Max age of a core file in days, 0 for no limit
+MAX_CORE_AGE_DAYS = 0
+
+# A core file which was modified within this time may still be being written,
+# so its size is checked again on the next run
+CORE_SETTLE_SECS = 600
+
 def log_info(msg):
     syslog.openlog(SYSLOG_IDENTIFIER)
     syslog.syslog(syslog.LOG_INFO, msg)
@@ -20,32 +37,195 @@ def log_error(msg):
     syslog.syslog(syslog.LOG_ERR, msg)
     syslog.closelog()
 
+
+class CoreFileIndex(object):
+    """
+    Persistent index of the core files, mapping a file name to its process,
+    timestamp and size. Only the entries added to the core directory since
+    the last run are stat'ed, and the directory is not listed at all if it
+    hasn't changed.
+    """
+    def __init__(self, core_dir, index_file):
+        self.core_dir = core_dir
+        self.index_file = index_file
+        self.dir_mtime = None
+        # name -> {'process', 'timestamp', 'size', 'settled'}
+        self.files = {}
+
+    def load(self):
+        try:
+            with open(self.index_file) as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self.dir_mtime = data['dir_mtime']
+                self.files = data['files']
+        except (IOError, OSError, ValueError, KeyError):
+            # Rebuilt from the core directory below
+            self.dir_mtime = None
+            self.files = {}
+
+    def save(self):
+        index_dir = os.path.dirname(self.index_file)
+        if not os.path.isdir(index_dir):
+            os.makedirs(index_dir)
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'dir_mtime': self.dir_mtime, 'files': self.files}, f)
+        os.rename(tmp_file, self.index_file)
+
+    @staticmethod
+    def parse_name(name, mtime):
+        # Core files are named <process>.<timestamp>.<pid>.core[.gz]
+        fields = name.split('.')
+        try:
+            timestamp = int(fields[1])
+        except (IndexError, ValueError):
+            timestamp = int(mtime)
+        return fields[0], timestamp
+
+    def _stat_entry(self, name, now):
+        try:
+            st = os.stat(os.path.join(self.core_dir, name))
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        process, timestamp = self.parse_name(name, st.st_mtime)
+        return {
+            'process': process,
+            'timestamp': timestamp,
+            'size': st.st_size,
+            'settled': now - st.st_mtime >= CORE_SETTLE_SECS,
+        }
+
+    def refresh(self):
+        now = time.time()
+        dir_mtime = os.stat(self.core_dir).st_mtime
+
+        if dir_mtime != self.dir_mtime:
+            names = set(os.listdir(self.core_dir))
+            for name in list(self.files.keys()):
+                if name not in names:
+                    del self.files[name]
+            for name in names - set(self.files.keys()):
+                entry = self._stat_entry(name, now)
+                if entry is not None:
+                    self.files[name] = entry
+            self.dir_mtime = dir_mtime
+
+        # Files which were still being written when indexed
+        for name in [name for (name, entry) in self.files.items() if not entry['settled']]:
+            entry = self._stat_entry(name, now)
+            if entry is None:
+                del self.files[name]
+            else:
+                self.files[name] = entry
+
+    def remove(self, name):
+        self.files.pop(name, None)
+
+
+def is_core_in_use(path):
+    """
+    Returns True if the core file is held by core_uploader, which takes a
+    shared lock on it while it is being archived and uploaded
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return False
+    except (IOError, OSError) as e:
+        if e.errno in (errno.EAGAIN, errno.EACCES):
+            return True
+        raise
+    finally:
+        # Closing the file releases the lock
+        os.close(fd)
+
+
+def select_cores_to_delete(files, max_core_files, max_total_size, max_age_days, now):
+    """
+    Returns the names of the core files to delete, oldest first: cores past
+    the max age, then per-process quota, then global size quota
+    """
+    to_delete = []
+    kept = []
+
+    by_process = defaultdict(list)
+    for name, entry in files.items():
+        by_process[entry['process']].append(name)
+
+    for process, names in by_process.items():
+        names.sort(reverse=True, key=lambda x: (files[x]['timestamp'], x))
+        for i, name in enumerate(names):
+            too_old = max_age_days and now - files[name]['timestamp'] > max_age_days * 24 * 3600
+            if too_old or i >= max_core_files:
+                to_delete.append(name)
+            else:
+                kept.append(name)
+
+    if max_total_size:
+        total_size = sum(files[name]['size'] for name in kept)
+        kept.sort(key=lambda x: (files[x]['timestamp'], x))
+        for name in kept:
+            if total_size <= max_total_size:
+                break
+            to_delete.append(name)
+            total_size -= files[name]['size']
+
+    to_delete.sort(key=lambda x: (files[x]['timestamp'], x))
+    return to_delete
+
+
 def main():
+    parser = argparse.ArgumentParser(description='Clean up core files')
+    parser.add_argument('--max-per-process', type=int, default=MAX_CORE_FILES,
+                        help='Max number of core files kept per process')
+    parser.add_argument('--max-total-size', type=int, default=MAX_TOTAL_CORE_SIZE,
+                        help='Max total size of the core files in bytes, 0 for no limit')
+    parser.add_argument('--max-age-days', type=int, default=MAX_CORE_AGE_DAYS,
+                        help='Max age of a core file in days, 0 for no limit')
+    args = parser.parse_args()
+
     if os.getuid() != 0:
         log_error('Root required to clean up core files')
         return
 
     log_info('Cleaning up core files')
-    core_files = [f for f in os.listdir(CORE_FILE_DIR) if os.path.isfile(os.path.join(CORE_FILE_DIR, f))]
-
-    core_files_by_process = defaultdict(list)
-    for f in core_files:
-        process = f.split('.')[0]
-        curr_files = core_files_by_process[process]
-        curr_files.append(f)
-
-        if len(curr_files) > MAX_CORE_FILES:
-            curr_files.sort(reverse = True, key = lambda x: datetime.utcfromtimestamp(int(x.split('.')[1])))
-            oldest_core = curr_files[MAX_CORE_FILES]
-            log_info('Deleting {}'.format(oldest_core))
-            try:
-                os.remove(os.path.join(CORE_FILE_DIR, oldest_core))
-            except:
-                log_error('Unexpected error occured trying to delete {}'.format(oldest_core))
-            core_files_by_process[process] = curr_files[0:MAX_CORE_FILES]
+
+    index = CoreFileIndex(CORE_FILE_DIR, INDEX_FILE)
+    index.load()
+    index.refresh()
+
+    now = time.time()
+    deleted = False
+    for name in select_cores_to_delete(index.files, args.max_per_process, args.max_total_size, args.max_age_days, now):
+        path = os.path.join(CORE_FILE_DIR, name)
+        if is_core_in_use(path):
+            log_info('Skipping {}, it is being uploaded'.format(name))
+            continue
+        log_info('Deleting {}'.format(name))
+        try:
+            os.remove(path)
+        except:
+            log_error('Unexpected error occured trying to delete {}'.format(name))
+        index.remove(name)
+        deleted = True
+
+    if deleted:
+        # The deletions changed the directory mtime, and a core may have been
+        # added meanwhile, so list the directory again on the next run
+        index.dir_mtime = None
+
+    try:
+        index.save()
+    except (IOError, OSError) as e:
+        log_error('Failed to save core file index: {}'.format(e))
 
     log_info('Finished cleaning up core files')
 
 if __name__ == '__main__':
     main()
-
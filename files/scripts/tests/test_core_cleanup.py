@@ -0,0 +1,139 @@
+import fcntl
+import imp
+import os
+import sys
+import time
+
+import mock
+import pytest
+
+CORE_CLEANUP = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'core_cleanup.py')
+core_cleanup = imp.load_source('core_cleanup', CORE_CLEANUP)
+
+NOW = 1600000000
+DAY = 24 * 3600
+
+
+class CoreDir(object):
+    """ A synthetic core directory, with settled files unless told otherwise """
+    def __init__(self, tmpdir):
+        self.dir = tmpdir.mkdir('core')
+        self.index_file = str(tmpdir.join('cache', 'index.json'))
+
+    def add(self, process, timestamp, size=100, pid=1, mtime=None):
+        name = '{}.{}.{}.core.gz'.format(process, timestamp, pid)
+        path = self.dir.join(name)
+        path.write_binary(b'\0' * size)
+        mtime = timestamp if mtime is None else mtime
+        os.utime(str(path), (mtime, mtime))
+        return name
+
+    def names(self):
+        return set(os.listdir(str(self.dir)))
+
+    def index(self):
+        index = core_cleanup.CoreFileIndex(str(self.dir) + '/', self.index_file)
+        index.load()
+        return index
+
+    def cleanup(self, *args):
+        with mock.patch.object(core_cleanup, 'CORE_FILE_DIR', str(self.dir) + '/'), \
+                mock.patch.object(core_cleanup, 'INDEX_FILE', self.index_file), \
+                mock.patch.object(core_cleanup.os, 'getuid', return_value=0), \
+                mock.patch.object(core_cleanup.time, 'time', return_value=NOW), \
+                mock.patch.object(core_cleanup, 'log_info'), \
+                mock.patch.object(sys, 'argv', ['core_cleanup.py'] + list(args)):
+            core_cleanup.main()
+
+
+@pytest.fixture
+def core_dir(tmpdir):
+    return CoreDir(tmpdir)
+
+
+class TestRetention(object):
+    def test_max_per_process(self, core_dir):
+        orchagent = [core_dir.add('orchagent', NOW - i * 60) for i in range(10)]
+        syncd = [core_dir.add('syncd', NOW - i * 60) for i in range(3)]
+
+        core_dir.cleanup('--max-per-process', '4')
+        # The 4 newest cores of each process are kept
+        assert core_dir.names() == set(orchagent[:4] + syncd)
+
+    def test_max_age_and_total_size(self, core_dir):
+        old = core_dir.add('bgpd', NOW - 10 * DAY)
+        big = [core_dir.add('orchagent', NOW - DAY + i, size=1000, pid=i) for i in range(3)]
+        small = core_dir.add('syncd', NOW - 60, size=10)
+
+        core_dir.cleanup('--max-age-days', '7', '--max-total-size', '2100')
+        # The too old core goes first, then the oldest ones until the total fits
+        assert core_dir.names() == set(big[1:] + [small])
+        assert old not in core_dir.names()
+
+    def test_locked_core_is_kept(self, core_dir):
+        names = [core_dir.add('orchagent', NOW - i * 60) for i in range(3)]
+        with open(str(core_dir.dir.join(names[2])), 'rb') as f:
+            # core_uploader holds a shared lock while it uploads a core
+            fcntl.flock(f, fcntl.LOCK_SH)
+            core_dir.cleanup('--max-per-process', '1')
+            assert core_dir.names() == set([names[0], names[2]])
+
+        core_dir.cleanup('--max-per-process', '1')
+        assert core_dir.names() == set([names[0]])
+
+
+class TestIndex(object):
+    def test_unchanged_directory_is_not_listed(self, core_dir):
+        for i in range(20):
+            core_dir.add('orchagent', NOW - DAY - i * 60, pid=i)
+        core_dir.cleanup('--max-per-process', '100')
+
+        index = core_dir.index()
+        assert len(index.files) == 20
+        with mock.patch.object(core_cleanup.os, 'listdir') as listdir, \
+                mock.patch.object(core_cleanup.os, 'stat', side_effect=os.stat) as mock_stat:
+            index.refresh()
+        assert not listdir.called
+        # Only the core directory itself
+        assert mock_stat.call_count == 1
+
+    def test_only_new_files_are_stated(self, core_dir):
+        for i in range(20):
+            core_dir.add('orchagent', NOW - DAY - i * 60, pid=i)
+        core_dir.cleanup('--max-per-process', '100')
+
+        new = core_dir.add('syncd', NOW)
+        # Make sure the directory mtime changed, whatever the timestamp granularity
+        os.utime(str(core_dir.dir), (NOW + 1, NOW + 1))
+        index = core_dir.index()
+        with mock.patch.object(core_cleanup.os, 'stat', side_effect=os.stat) as mock_stat:
+            index.refresh()
+        assert sorted(os.path.basename(call[0][0]) for call in mock_stat.call_args_list[1:]) == [new]
+        assert index.files[new]['process'] == 'syncd'
+
+    def test_unsettled_file_is_stated_again(self, core_dir):
+        name = core_dir.add('orchagent', NOW, size=10, mtime=time.time())
+        index = core_dir.index()
+        index.refresh()
+        assert not index.files[name]['settled']
+
+        # The core was still being written
+        core_dir.dir.join(name).write_binary(b'\0' * 1000)
+        index.refresh()
+        assert index.files[name]['size'] == 1000
+
+    def test_removed_file_and_corrupted_index(self, core_dir):
+        names = [core_dir.add('orchagent', NOW - i * 60, pid=i) for i in range(3)]
+        core_dir.cleanup('--max-per-process', '100')
+
+        core_dir.dir.join(names[0]).remove()
+        index = core_dir.index()
+        index.refresh()
+        assert set(index.files) == set(names[1:])
+
+        with open(core_dir.index_file, 'w') as f:
+            f.write('{')
+        index = core_dir.index()
+        assert index.files == {}
+        index.refresh()
+        assert set(index.files) == set(names[1:])
@@ -0,0 +1,234 @@
+import imp
+import os
+import subprocess
+import sys
+import time
+
+from distutils.spawn import find_executable
+
+import mock
+import pytest
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# The listener runs inside the containers, stand in for the modules it imports
+sys.modules.setdefault('swsssdk', mock.MagicMock())
+childutils = mock.MagicMock()
+sys.modules.setdefault('supervisor', mock.MagicMock(childutils=childutils))
+sys.modules.setdefault('supervisor.childutils', childutils)
+
+LISTENER = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'supervisor-proc-exit-listener')
+listener = imp.load_source('supervisor_proc_exit_listener', LISTENER)
+
+REDIS_SERVER = find_executable('redis-server')
+
+CONFIG_DB_ID = 4
+
+pytestmark = pytest.mark.skipif(not (REDIS_SERVER and redis), reason='requires redis-server and the redis python package')
+
+
+class EndOfEvents(Exception):
+    pass
+
+
+class LocalConfigDB(object):
+    """ The part of ConfigDBConnector used by the listener, over a local redis-server """
+    CONFIG_DB = 'CONFIG_DB'
+    TABLE_NAME_SEPARATOR = '|'
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.client = None
+
+    def __call__(self):
+        return self
+
+    def connect(self):
+        self.client = redis.StrictRedis(unix_socket_path=self.socket_path, db=CONFIG_DB_ID, decode_responses=True)
+
+    def get_redis_client(self, db_name):
+        return self.client
+
+    def get_dbid(self, db_name):
+        return CONFIG_DB_ID
+
+    def get_entry(self, table, key):
+        data = self.client.hgetall('{}|{}'.format(table, key))
+        data.pop('NULL', None)
+        return data
+
+    def get_keys(self, table):
+        return [key.split('|', 1)[1] for key in self.client.keys(table + '|*')]
+
+
+class RedisServer(object):
+    """ A redis-server on a unix socket, sending keyspace notifications """
+    def __init__(self, tmp_dir):
+        self.socket_path = os.path.join(tmp_dir, 'redis.sock')
+        self.process = subprocess.Popen([REDIS_SERVER, '--port', '0', '--unixsocket', self.socket_path,
+                                         '--save', '', '--appendonly', 'no', '--notify-keyspace-events', 'KA'],
+                                        stdout=open(os.devnull, 'w'))
+        for _ in range(100):
+            if os.path.exists(self.socket_path):
+                break
+            time.sleep(0.05)
+        self.admin = redis.StrictRedis(unix_socket_path=self.socket_path, db=CONFIG_DB_ID, decode_responses=True)
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+
+    def set_feature(self, name, fvs):
+        self.admin.hset('FEATURE|' + name, mapping=fvs)
+
+    def calls(self, command):
+        """ Number of calls of command received by the server """
+        return self.admin.info('commandstats').get('cmdstat_' + command, {}).get('calls', 0)
+
+    def connections(self):
+        """ Number of connections received by the server, this client's excluded """
+        return self.admin.info('stats')['total_connections_received'] - 1
+
+    def drop_clients(self):
+        """ Closes the connections of all the other clients """
+        for client_type in ('normal', 'pubsub'):
+            self.admin.execute_command('CLIENT', 'KILL', 'TYPE', client_type, 'SKIPME', 'yes')
+
+
+class Replay(object):
+    """
+    Replays recorded supervisor events through the listener. Each event can
+    carry a callback run when the listener reports READY for it, to change
+    Config DB between two events.
+    """
+    def __init__(self, events):
+        self.events = list(events)
+
+    def ready(self):
+        if not self.events:
+            raise EndOfEvents()
+        self.current, action = self.events.pop(0)
+        if action:
+            action()
+            # Let the keyspace notifications reach the listener
+            time.sleep(0.1)
+
+    def ok(self):
+        pass
+
+    def readline(self):
+        return 'eventname:{} len:0\n'.format(self.current[0])
+
+    def read(self, size):
+        return ''
+
+    def eventdata(self, payload):
+        return self.current[1], ''
+
+
+def exited(processname, expected=0):
+    return ('PROCESS_STATE_EXITED', {'processname': processname, 'groupname': processname, 'expected': str(expected)})
+
+
+def running(processname):
+    return ('PROCESS_STATE_RUNNING', {'processname': processname, 'groupname': processname})
+
+
+@pytest.fixture
+def server(tmpdir):
+    server = RedisServer(str(tmpdir))
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def run(server, tmpdir, monkeypatch):
+    critical = tmpdir.join('critical_processes')
+    critical.write('program:orchagent\n')
+    monkeypatch.setattr(listener, 'CRITICAL_PROCESSES_FILE', str(critical))
+
+    def run(events):
+        replay = Replay(events)
+        kill = mock.Mock()
+        with mock.patch.object(listener.swsssdk, 'ConfigDBConnector', LocalConfigDB(server.socket_path)), \
+                mock.patch.object(listener.childutils, 'listener', replay), \
+                mock.patch.object(listener.childutils, 'get_headers',
+                                  lambda line: dict(field.split(':') for field in line.split())), \
+                mock.patch.object(listener.childutils, 'eventdata', replay.eventdata), \
+                mock.patch.object(listener.sys, 'stdin', replay), \
+                mock.patch.object(listener.os, 'kill', kill):
+            with pytest.raises((EndOfEvents, SystemExit)) as exc:
+                listener.main(['-c', 'swss'])
+        return kill, exc.value
+
+    return run
+
+
+class TestReplay(object):
+    def test_single_connection(self, server, run):
+        server.set_feature('swss', {'auto_restart': 'disabled'})
+        events = [(running('orchagent'), None)] + [(exited('portsyncd'), None)] * 50
+
+        kill, _ = run(events)
+        # One connection, for the commands and the subscription, and one
+        # read for all the events
+        assert server.connections() == 2
+        assert server.calls('subscribe') == 1
+        assert server.calls('hgetall') == 1
+        assert server.calls('keys') == 0
+        assert not kill.called
+
+    def test_notifications_burst(self, server, run):
+        server.set_feature('swss', {'auto_restart': 'disabled'})
+
+        def enable():
+            for _ in range(10):
+                server.set_feature('swss', {'auto_restart': 'enabled'})
+
+        events = [(exited('portsyncd'), None), (exited('orchagent'), enable)]
+        kill, _ = run(events)
+        # The 10 notifications of FEATURE|swss are read as a single change
+        assert server.calls('hgetall') == 2
+        assert kill.called
+
+    def test_other_keys_not_notified(self, server, run):
+        server.set_feature('swss', {'auto_restart': 'disabled'})
+
+        def change_others():
+            server.set_feature('swss_other', {'auto_restart': 'enabled'})
+            server.set_feature('bgp', {'auto_restart': 'enabled'})
+
+        kill, _ = run([(exited('orchagent'), None), (exited('orchagent'), change_others)])
+        assert server.calls('hgetall') == 1
+        assert not kill.called
+
+    def test_reconnect(self, server, run):
+        server.set_feature('swss', {'auto_restart': 'disabled'})
+
+        def drop():
+            server.drop_clients()
+            server.set_feature('swss', {'auto_restart': 'enabled'})
+
+        events = [(exited('orchagent'), None), (exited('orchagent'), drop)]
+        kill, _ = run(events)
+        # The change made while disconnected was picked up by the resync
+        assert server.connections() == 4
+        assert server.calls('subscribe') == 2
+        assert server.calls('hgetall') == 2
+        assert kill.call_count == 1
+
+    @pytest.mark.parametrize('features, code', [
+        ({}, 2),
+        ({'bgp': {'auto_restart': 'enabled'}}, 3),
+        ({'swss': {'state': 'enabled'}}, 4),
+    ])
+    def test_exit_codes(self, server, run, features, code):
+        for name, fvs in features.items():
+            server.set_feature(name, fvs)
+        _, exc = run([(exited('orchagent'), None)])
+        assert isinstance(exc, SystemExit)
+        assert exc.code == code
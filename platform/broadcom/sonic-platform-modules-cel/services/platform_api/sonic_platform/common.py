@@ -1,11 +1,100 @@
 import os
 import imp
+import time
+import uuid
 import yaml
+import threading
 import subprocess
 
 from sonic_py_common import device_info
 
 
+class _PendingRead(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class OutputCache(object):
+    """
+    Cache of the raw outputs of the config-defined sources, keyed on the
+    source, e.g. the ipmitool command or the sysfs path. Concurrent reads
+    of the same source are coalesced into a single read.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._pending = {}
+
+    def _get_fresh(self, key, ttl):
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry[0] < ttl:
+            return entry[1]
+        return None
+
+    def get(self, key, ttl, load):
+        """
+        Returns the output of key if it was read within ttl seconds,
+        otherwise reads it with load(). A failed read, None or False, is
+        not cached.
+        """
+        with self._lock:
+            output = self._get_fresh(key, ttl)
+            if output is not None:
+                return output
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _PendingRead()
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            pending.event.wait()
+            return pending.result
+
+        output = None
+        try:
+            output = load()
+        finally:
+            with self._lock:
+                if output is not None and output is not False:
+                    self._entries[key] = (time.time(), output)
+                del self._pending[key]
+            pending.result = output
+            pending.event.set()
+        return output
+
+    def get_stale(self, keys_ttl):
+        """
+        Returns the keys among keys_ttl, a dict of key to ttl, which are
+        neither fresh nor being read
+        """
+        with self._lock:
+            return [key for (key, ttl) in keys_ttl.items()
+                    if self._get_fresh(key, ttl) is None and key not in self._pending]
+
+    def put(self, key, output):
+        if output is None or output is False:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), output)
+
+    def invalidate(self, source=None, key=None):
+        """
+        Drop the cached output of key, of all the keys of source if key is
+        None, or everything if both are None
+        """
+        with self._lock:
+            if key is not None:
+                self._entries.pop(key, None)
+            else:
+                for cached_key in list(self._entries.keys()):
+                    if source is None or cached_key[0] == source:
+                        del self._entries[cached_key]
+
+
 class Common:
 
     DEVICE_PATH = '/usr/share/sonic/device/'
@@ -27,10 +116,31 @@ class Common:
     HOST_CHK_CMD = "docker > /dev/null 2>&1"
     REF_KEY = '$ref:'
 
+    # Default time in seconds an output is cached per source, which can be
+    # overridden by the 'cache_ttl' of the function config. 0 disables the
+    # cache, concurrent identical reads are still coalesced.
+    CACHE_TTL = {
+        OUTPUT_SOURCE_IPMI: 1.0,
+        OUTPUT_SOURCE_SYSFS: 1.0,
+    }
+
+    # Shared by the Common instances of all the devices
+    _output_cache = OutputCache()
+
     def __init__(self, conf=None):
         self._main_conf = conf
+        self._prefetch_device = None
         (self.platform, self.hwsku) = device_info.get_platform_and_hwsku()
 
+    def _command_result(self, raw_data, err):
+        """
+        Returns the status and the output of a command, which succeeded if
+        it wrote nothing on stderr
+        """
+        if err == '':
+            return True, raw_data.strip()
+        return False, ""
+
     def _run_command(self, command):
         status = False
         output = ""
@@ -38,8 +148,7 @@ class Common:
             p = subprocess.Popen(
                 command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
             raw_data, err = p.communicate()
-            if err == '':
-                status, output = True, raw_data.strip()
+            status, output = self._command_result(raw_data, err)
         except Exception:
             pass
         return status, output
@@ -72,14 +181,65 @@ class Common:
 
         return output
 
-    def _ipmi_get(self, index, config):
+    def _run_batch(self, commands):
+        """
+        Runs the commands in a single shell, returns the list of their
+        outputs, None for a command which failed as per _run_command
+        """
+        # Each command is followed by a marker line on both stdout and
+        # stderr, which splits the streams per command
+        marker = '__batch_{}__'.format(uuid.uuid4().hex)
+        script = ''.join("{{ {0}\n}}; printf '\\n{1}\\n'; printf '\\n{1}\\n' >&2\n".format(cmd, marker)
+                         for cmd in commands)
+        try:
+            p = subprocess.Popen(
+                script, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            raw_data, err = p.communicate()
+        except Exception:
+            return [None] * len(commands)
+
+        separator = '\n{}\n'.format(marker)
+        raw_outputs = raw_data.split(separator)
+        errs = err.split(separator)
+        outputs = []
+        for i in range(len(commands)):
+            if i < len(raw_outputs) - 1 and i < len(errs) - 1:
+                status, output = self._command_result(raw_outputs[i], errs[i])
+                outputs.append(output if status else None)
+            else:
+                outputs.append(None)
+        return outputs
+
+    def _get_cache_key(self, index, config):
+        """
+        Returns the key of the source of config in the output cache, None
+        if the output of the source is not cached
+        """
+        output_source = config.get('output_source')
+        if output_source == self.OUTPUT_SOURCE_IPMI:
+            return (output_source, self._ipmi_command(index, config))
+        elif output_source == self.OUTPUT_SOURCE_SYSFS:
+            return (output_source, self._sysfs_path(index, config))
+        return None
+
+    def _get_cache_ttl(self, config):
+        return float(config.get('cache_ttl', self.CACHE_TTL[config['output_source']]))
+
+    def _ipmi_command(self, index, config):
         argument = config.get('argument')
-        cmd = config['command'].format(
+        return config['command'].format(
             config['argument'][index]) if argument else config['command']
-        status, output = self._run_command(cmd)
-        return output if status else None
 
-    def _sysfs_read(self, index, config):
+    def _ipmi_get(self, index, config):
+        cmd = self._ipmi_command(index, config)
+
+        def load():
+            status, output = self._run_command(cmd)
+            return output if status else None
+
+        return self._output_cache.get((self.OUTPUT_SOURCE_IPMI, cmd), self._get_cache_ttl(config), load)
+
+    def _sysfs_path(self, index, config):
         sysfs_path = config.get('sysfs_path')
         argument = config.get('argument', '')
 
@@ -89,6 +249,14 @@ class Common:
         if type(argument) is list:
             sysfs_path = sysfs_path.format(argument[index])
 
+        return sysfs_path
+
+    def _sysfs_read(self, index, config):
+        sysfs_path = self._sysfs_path(index, config)
+        return self._output_cache.get((self.OUTPUT_SOURCE_SYSFS, sysfs_path), self._get_cache_ttl(config),
+                                      lambda: self._read_sysfs_path(sysfs_path))
+
+    def _read_sysfs_path(self, sysfs_path):
         content = ""
         try:
             content = open(sysfs_path)
@@ -100,14 +268,7 @@ class Common:
         return content
 
     def _sysfs_write(self, index, config, input):
-        sysfs_path = config.get('sysfs_path')
-        argument = config.get('argument', '')
-
-        if self.REF_KEY in argument:
-            argument = self._main_conf[argument.split(":")[1]]
-
-        if type(argument) is list:
-            sysfs_path = sysfs_path.format(argument[index])
+        sysfs_path = self._sysfs_path(index, config)
 
         write_offset = int(config.get('write_offset', 0))
         output = ""
@@ -119,11 +280,16 @@ class Common:
         except IOError as e:
             print("Error: unable to open file: %s" % str(e))
             return False, output
+        finally:
+            self._output_cache.invalidate(key=(self.OUTPUT_SOURCE_SYSFS, sysfs_path))
         return True, output
 
     def _ipmi_set(self, index, config, input):
         arg = config['argument'][index].format(input)
-        return self._run_command(config['command'].format(arg))
+        result = self._run_command(config['command'].format(arg))
+        # Any BMC reading may depend on what was set
+        self._output_cache.invalidate(source=self.OUTPUT_SOURCE_IPMI)
+        return result
 
     def _hex_ver_decode(self, hver, num_of_bits, num_of_points):
         ver_list = []
@@ -206,6 +372,9 @@ class Common:
         """
         output_source = config.get('output_source')
 
+        if self._prefetch_device is not None and output_source in self.CACHE_TTL:
+            self._prefetch_if_stale(index, config)
+
         if output_source == self.OUTPUT_SOURCE_IPMI:
             output = self._ipmi_get(index, config)
 
@@ -273,6 +442,62 @@ class Common:
 
         return output
 
+    def enable_prefetch(self, index, config):
+        """
+        Makes get_output prefetch the device whenever the ipmitool or sysfs
+        source it reads is stale, so a getter called after the cache expired
+        reads all the sources of the device in one pass, running the ipmitool
+        commands in a single shell. Only the getters, functions named get_*,
+        are read. Sources which are fresh in the cache or being read are
+        skipped, a command which fails is read again by get_output.
+
+        Args:
+            index: An integer containing the index of device.
+            config: A dict object containing the configuration of the device,
+                    mapping function names to their configuration.
+        """
+        self._prefetch_device = (index, config)
+
+    def _prefetch_if_stale(self, index, config):
+        try:
+            key = self._get_cache_key(index, config)
+        except (IndexError, KeyError):
+            return
+        if not self._output_cache.get_stale({key: self._get_cache_ttl(config)}):
+            return
+        stale_keys = self._output_cache.get_stale(self._get_device_keys(*self._prefetch_device))
+        # A source stale on its own is read by get_output alone
+        if [stale_key for stale_key in stale_keys if stale_key != key]:
+            self._read_sources(stale_keys)
+
+    def _get_device_keys(self, index, config):
+        """
+        Returns the cache keys of the getters of a device, functions named
+        get_*, as a dict of key to ttl
+        """
+        keys_ttl = {}
+        for func_name, func_conf in config.items():
+            # Only the getters, some setters have an output source too
+            if not func_name.startswith('get_') or type(func_conf) is not dict or \
+                    func_conf.get('output_source') not in self.CACHE_TTL:
+                continue
+            try:
+                key = self._get_cache_key(index, func_conf)
+            except (IndexError, KeyError):
+                continue
+            keys_ttl[key] = min(keys_ttl.get(key, float('inf')), self._get_cache_ttl(func_conf))
+        return keys_ttl
+
+    def _read_sources(self, keys):
+        commands = [cmd for (source, cmd) in keys if source == self.OUTPUT_SOURCE_IPMI]
+        if commands:
+            for cmd, output in zip(commands, self._run_batch(commands)):
+                self._output_cache.put((self.OUTPUT_SOURCE_IPMI, cmd), output)
+
+        for source, sysfs_path in keys:
+            if source == self.OUTPUT_SOURCE_SYSFS:
+                self._output_cache.put((source, sysfs_path), self._read_sysfs_path(sysfs_path))
+
     def get_event(self, timeout, config, sfp_list):
         """
         Returns a nested dictionary containing all devices which have
@@ -28,6 +28,8 @@ class Fan(FanBase):
         self._is_psu_fan = is_psu_fan
         if self._is_psu_fan:
             self._initialize_psu_fan(psu_index)
+        self._api_common.enable_prefetch(
+            self._fan_index, self._config if not self._is_psu_fan else self._psu_fan_config)
 
         self._name = self.get_name()
 
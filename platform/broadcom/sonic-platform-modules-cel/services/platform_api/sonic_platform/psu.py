@@ -24,6 +24,7 @@ class Psu(PsuBase):
         self._psu_index = index
         self._config = conf
         self._api_common = Common(self._config)
+        self._api_common.enable_prefetch(self._psu_index, self._config)
         self._fan_conf = fan_conf
         self._initialize_psu_fan()
 
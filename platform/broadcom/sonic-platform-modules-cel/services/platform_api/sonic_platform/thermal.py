@@ -24,6 +24,7 @@ class Thermal(ThermalBase):
         self._thermal_index = index
         self._config = conf
         self._api_common = Common(self._config)
+        self._api_common.enable_prefetch(self._thermal_index, self._config)
 
     def get_name(self):
         """
@@ -0,0 +1,145 @@
+import os
+import stat
+import subprocess
+import sys
+import threading
+
+import mock
+import pytest
+
+for module in ('sonic_py_common', 'sonic_platform_base', 'sonic_platform_base.thermal_base'):
+    sys.modules.setdefault(module, mock.MagicMock())
+sys.modules['sonic_py_common'].device_info.get_platform_and_hwsku.return_value = ('x86_64-cel_test-r0', 'test')
+
+
+class ThermalBase(object):
+    pass
+
+
+sys.modules['sonic_platform_base.thermal_base'].ThermalBase = ThermalBase
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'sonic_platform'))
+import common
+from common import Common, OutputCache
+from thermal import Thermal
+
+# Logs its arguments, answers the last one without its 0x, and fails on 0xbad,
+# after IPMITOOL_DELAY seconds
+FAKE_IPMITOOL = """#!/bin/sh
+echo "$*" >> {log}
+sleep ${{IPMITOOL_DELAY:-0}}
+for arg; do last=$arg; done
+if [ "$last" = "0xbad" ]; then
+    echo "Unable to send RAW command" >&2
+    exit 1
+fi
+echo " ${{last#0x}}"
+"""
+
+THERMAL_CONFIG = {
+    'thermal_num': 2,
+    'get_name': {'output_source': 'value_list', 'value_list': ['Thermal 0', 'Thermal 1']},
+    'get_temperature': {'output_source': 'ipmitool', 'command': 'ipmitool raw 0x04 0x2d {}',
+                        'argument': ['0x10', '0x11']},
+    'get_high_threshold': {'output_source': 'ipmitool', 'command': 'ipmitool raw 0x04 0x27 {}',
+                           'argument': ['0x20', '0xbad']},
+    'get_high_critical_threshold': {'output_source': 'ipmitool', 'command': 'ipmitool raw 0x04 0x27 {}',
+                                    'argument': ['0x20', '0x21']},
+    'get_low_threshold': {'output_source': 'value', 'value': 'N/A'},
+    'set_low_threshold': {'output_source': 'ipmitool', 'command': 'ipmitool raw 0x04 0x26 {}',
+                          'argument': ['0x30', '0x31']},
+}
+
+
+@pytest.fixture
+def ipmitool(tmpdir, monkeypatch):
+    """ Puts a fake ipmitool on PATH, returns the function listing its invocations """
+    log = tmpdir.join('ipmitool.log')
+    path = tmpdir.join('ipmitool')
+    path.write(FAKE_IPMITOOL.format(log=log))
+    path.chmod(stat.S_IRWXU)
+    monkeypatch.setenv('PATH', '{}:{}'.format(tmpdir, os.environ['PATH']))
+    monkeypatch.setattr(Common, '_output_cache', OutputCache())
+    return lambda: log.read().splitlines() if log.check() else []
+
+
+@pytest.fixture
+def popen():
+    with mock.patch.object(common.subprocess, 'Popen', wraps=subprocess.Popen) as popen:
+        yield popen
+
+
+def test_batch_and_single_command_success_rule(ipmitool):
+    api_common = Common()
+    commands = ['echo out', 'echo out; echo warning >&2', 'echo out; false', 'printf "a\\nb"']
+    outputs = api_common._run_batch(commands)
+    for command, output in zip(commands, outputs):
+        status, single_output = api_common._run_command(command)
+        assert output == (single_output if status else None)
+    assert outputs == ['out', None, 'out', 'a\nb']
+
+
+def test_getters_run_one_batch(ipmitool, popen):
+    thermal = Thermal(0, conf=THERMAL_CONFIG)
+    assert thermal.get_name() == 'Thermal 0'
+    assert popen.call_count == 0
+
+    assert thermal.get_temperature() == 10
+    assert thermal.get_high_threshold() == 20
+    assert thermal.get_high_critical_threshold() == 20
+    assert thermal.get_low_threshold() == 'N/A'
+
+    # One shell running each distinct getter command once, no setter
+    assert popen.call_count == 1
+    assert sorted(ipmitool()) == ['raw 0x04 0x27 0x20', 'raw 0x04 0x2d 0x10']
+
+
+def test_expired_cache_prefetches_again(ipmitool, popen):
+    thermal = Thermal(0, conf=THERMAL_CONFIG)
+    thermal.get_temperature()
+    Common._output_cache.invalidate()
+    thermal.get_high_threshold()
+    thermal.get_temperature()
+    assert popen.call_count == 2
+    assert len(ipmitool()) == 4
+
+
+def test_failed_command_read_again(ipmitool, popen):
+    thermal = Thermal(1, conf=THERMAL_CONFIG)
+    assert thermal.get_temperature() == 11
+    assert popen.call_count == 1
+    assert len(ipmitool()) == 3
+
+    # The failure of the batch is not cached, the getter retries on its own
+    assert thermal.get_high_threshold() == Common.NULL_VAL
+    assert popen.call_count == 2
+    assert ipmitool()[-1] == 'raw 0x04 0x27 0xbad'
+    assert thermal.get_high_critical_threshold() == 21
+    assert popen.call_count == 2
+
+
+def test_devices_share_the_cache(ipmitool, popen):
+    Thermal(0, conf=THERMAL_CONFIG).get_temperature()
+    Thermal(0, conf=THERMAL_CONFIG).get_high_critical_threshold()
+    assert popen.call_count == 1
+    assert len(ipmitool()) == 2
+
+
+def test_concurrent_reads_run_one_command(ipmitool, popen, monkeypatch):
+    monkeypatch.setenv('IPMITOOL_DELAY', '0.5')
+    config = THERMAL_CONFIG['get_temperature']
+    outputs = []
+
+    def read():
+        outputs.append(Common().get_output(0, config, Common.NULL_VAL))
+
+    threads = [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The second reader waited for the output of the first one
+    assert outputs == ['10', '10']
+    assert popen.call_count == 1
+    assert ipmitool() == ['raw 0x04 0x2d 0x10']
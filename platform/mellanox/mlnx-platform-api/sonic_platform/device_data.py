@@ -1,3 +1,5 @@
+import bisect
+
 DEVICE_DATA = {
     'x86_64-mlnx_msn2700-r0': {
         'thermal': {
@@ -230,4 +232,87 @@ DEVICE_DATA = {
             'led_num': 1
         }
     }
-}
\ No newline at end of file
+}
+
+# Edges of the ambient temperature covered by each minimum cooling level table
+MIN_COOLING_TABLE_LOW = -127
+MIN_COOLING_TABLE_HIGH = 120
+
+
+def compile_minimum_table(platform, category, table):
+    """
+    Compile a minimum cooling level table, e.g. {"-127:30":13, "31:120":14},
+    into sorted interval arrays for bisect lookup. The ranges must not overlap
+    and must cover [MIN_COOLING_TABLE_LOW, MIN_COOLING_TABLE_HIGH] without gaps.
+
+    Returns:
+        A tuple (lows, highs, cooling_levels) of lists sorted by temperature
+    Raises:
+        ValueError if the table is invalid
+    """
+    intervals = []
+    for range_str, cooling_level in table.items():
+        try:
+            low, high = [int(edge.strip()) for edge in range_str.split(':')]
+        except ValueError:
+            raise ValueError("{} {}: invalid temperature range '{}'".format(platform, category, range_str))
+        if low > high:
+            raise ValueError("{} {}: empty temperature range '{}'".format(platform, category, range_str))
+        intervals.append((low, high, cooling_level))
+    intervals.sort()
+
+    if not intervals or intervals[0][0] != MIN_COOLING_TABLE_LOW or intervals[-1][1] != MIN_COOLING_TABLE_HIGH:
+        raise ValueError("{} {}: temperature ranges do not cover {}:{}".format(
+            platform, category, MIN_COOLING_TABLE_LOW, MIN_COOLING_TABLE_HIGH))
+
+    for (prev_low, prev_high, _), (low, high, _) in zip(intervals, intervals[1:]):
+        if low <= prev_high:
+            raise ValueError("{} {}: temperature range {}:{} overlaps {}:{}".format(
+                platform, category, low, high, prev_low, prev_high))
+        if low != prev_high + 1:
+            raise ValueError("{} {}: temperatures {}:{} are missing".format(
+                platform, category, prev_high + 1, low - 1))
+
+    lows, highs, cooling_levels = [list(values) for values in zip(*intervals)]
+    return lows, highs, cooling_levels
+
+
+def compile_minimum_tables(device_data):
+    """
+    Compile the minimum cooling level tables of all the platforms
+
+    Returns:
+        A dict {platform: {category: (lows, highs, cooling_levels)}}
+    """
+    minimum_tables = {}
+    for platform, platform_data in device_data.items():
+        if 'thermal' in platform_data and 'minimum_table' in platform_data['thermal']:
+            minimum_tables[platform] = dict(
+                (category, compile_minimum_table(platform, category, table))
+                for category, table in platform_data['thermal']['minimum_table'].items())
+    return minimum_tables
+
+
+MINIMUM_TABLES = compile_minimum_tables(DEVICE_DATA)
+
+
+def get_min_cooling_level(platform, category, temperature):
+    """
+    Look up the minimum cooling level for an ambient temperature
+
+    Args:
+        platform: platform name, a key of DEVICE_DATA
+        category: minimum table category, e.g. 'unk_trust'
+        temperature: ambient temperature in Celsius
+    Returns:
+        The cooling level of the range holding the temperature, None if the
+        platform has no such table or no range holds the temperature
+    """
+    if platform not in MINIMUM_TABLES or category not in MINIMUM_TABLES[platform]:
+        return None
+
+    lows, highs, cooling_levels = MINIMUM_TABLES[platform][category]
+    index = bisect.bisect_left(highs, temperature)
+    if index < len(highs) and lows[index] <= temperature:
+        return cooling_levels[index]
+    return None
@@ -14,6 +14,7 @@ import subprocess
 try:
     from sonic_platform_base.fan_base import FanBase
     from .led import FanLed, ComponentFaultyIndicator
+    from .sysfs_snapshot import hw_mgmt_snapshot
 except ImportError as e:
     raise ImportError (str(e) + "- required module not found")
 
@@ -71,6 +72,20 @@ class Fan(FanBase):
         self.fan_pwm_path = "pwm1"
 
 
+    @classmethod
+    def _read_int_attr(cls, filename):
+        """
+        Read an integer hw-management attribute from the shared snapshot
+
+        Raises:
+            ValueError if the attribute can't be read or isn't an integer
+        """
+        value = hw_mgmt_snapshot.read(os.path.join(FAN_PATH, filename))
+        if value is None:
+            raise ValueError("Failed to read {}".format(filename))
+        return int(value)
+
+
     def get_direction(self):
         """
         Retrieves the fan's direction
@@ -110,8 +125,7 @@ class Fan(FanBase):
             status = 0
         else:
             try:
-                with open(os.path.join(FAN_PATH, self.fan_status_path), 'r') as fault_status:
-                    status = int(fault_status.read().strip())
+                status = self._read_int_attr(self.fan_status_path)
             except (ValueError, IOError):
                 status = 1
 
@@ -139,8 +153,7 @@ class Fan(FanBase):
     def _get_min_speed_in_rpm(self):
         speed = 0
         try:
-            with open(os.path.join(FAN_PATH, self.fan_min_speed_path), 'r') as min_fan_speed:
-                speed = int(min_fan_speed.read())
+            speed = self._read_int_attr(self.fan_min_speed_path)
         except (ValueError, IOError):
             speed = 0
         
@@ -150,8 +163,7 @@ class Fan(FanBase):
     def _get_max_speed_in_rpm(self):
         speed = 0
         try:
-            with open(os.path.join(FAN_PATH, self.fan_max_speed_path), 'r') as max_fan_speed:
-                speed = int(max_fan_speed.read().strip())
+            speed = self._read_int_attr(self.fan_max_speed_path)
         except (ValueError, IOError):
             speed = 0
         
@@ -167,8 +179,7 @@ class Fan(FanBase):
         """
         speed = 0
         try:
-            with open(os.path.join(FAN_PATH, self.fan_speed_get_path), 'r') as fan_curr_speed:
-                speed_in_rpm = int(fan_curr_speed.read().strip())
+            speed_in_rpm = self._read_int_attr(self.fan_speed_get_path)
         except (ValueError, IOError):
             speed_in_rpm = 0
 
@@ -196,8 +207,7 @@ class Fan(FanBase):
             return self.get_speed()
 
         try:
-            with open(os.path.join(FAN_PATH, self.fan_speed_set_path), 'r') as fan_pwm:
-                pwm = int(fan_pwm.read().strip())
+            pwm = self._read_int_attr(self.fan_speed_set_path)
         except (ValueError, IOError):
             pwm = 0
         
@@ -250,6 +260,7 @@ class Fan(FanBase):
             pwm = int(round(PWM_MAX*speed/100.0))
             with open(os.path.join(FAN_PATH, self.fan_speed_set_path), 'w') as fan_pwm:
                 fan_pwm.write(str(pwm))
+            hw_mgmt_snapshot.invalidate(os.path.join(FAN_PATH, self.fan_speed_set_path))
         except (ValueError, IOError):
             status = False
 
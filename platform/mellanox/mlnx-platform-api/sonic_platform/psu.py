@@ -15,6 +15,7 @@ try:
     from sonic_platform.fan import Fan
     from .led import PsuLed, SharedLed, ComponentFaultyIndicator
     from .device_data import DEVICE_DATA
+    from .sysfs_snapshot import hw_mgmt_snapshot
 except ImportError as e:
     raise ImportError (str(e) + "- required module not found")
 
@@ -122,10 +123,10 @@ class Psu(PsuBase):
         """
         result = 0
         try:
-            if not os.path.exists(filename):
+            value = hw_mgmt_snapshot.read(filename)
+            if value is None:
                 return result
-            with open(filename, 'r') as fileobj:
-                result = int(fileobj.read().strip())
+            result = int(value)
         except Exception as e:
             logger.log_info("Fail to read file {} due to {}".format(filename, repr(e)))
         return result
@@ -86,6 +86,9 @@ SDK_DAEMON_READY_FILE = '/tmp/sdk_ready'
 
 PMPE_PACKET_SIZE = 2000
 
+# Size of the port attributes array passed to sx_api_port_device_get
+SX_PORT_ATTR_ARR_SIZE = 64
+
 logger = Logger()
 
 class sfp_event:
@@ -94,11 +97,17 @@ class sfp_event:
     SX_OPEN_RETRIES = 30
     SX_OPEN_TIMEOUT = 5
     SELECT_TIMEOUT = 1
+    # Max number of PMPE notifications handled in a single check_sfp_status call
+    PMPE_BATCH_SIZE = 128
 
     def __init__(self):
         self.swid = 0
         self.handle = None
 
+        # Map from logical port to module port, built from the SDK port attributes
+        # and refreshed only when an event doesn't match it (port mapping changed)
+        self.port_module_map = {}
+
         # Allocate SDK fd and user channel structures
         self.rx_fd_p = new_sx_fd_t_p()
         self.user_channel_p = new_sx_user_channel_t_p()
@@ -166,6 +175,8 @@ class sfp_event:
 
             if rc != SX_STATUS_SUCCESS:
                 raise RuntimeError("sx_api_host_ifc_trap_id_register_set failed with rc {}, exiting...".format(rc))
+
+            self.update_port_module_map()
         except Exception as e:
             logger.log_error("sfp_event initialization failed due to {}, exiting...".format(repr(e)))
             if swid_cnt_p is not None:
@@ -196,6 +207,56 @@ class sfp_event:
         delete_sx_fd_t_p(self.rx_fd_p)
         delete_sx_user_channel_t_p(self.user_channel_p)
 
+    def update_port_module_map(self):
+        """
+        Rebuild the logical port to module port map with a single sx_api_port_device_get call
+        """
+        port_attributes_list = new_sx_port_attributes_t_arr(SX_PORT_ATTR_ARR_SIZE)
+        port_cnt_p = new_uint32_t_p()
+        uint32_t_p_assign(port_cnt_p, SX_PORT_ATTR_ARR_SIZE)
+
+        rc = sx_api_port_device_get(self.handle, 1 , 0, port_attributes_list,  port_cnt_p)
+        if rc != SX_STATUS_SUCCESS:
+            logger.log_error("sx_api_port_device_get exited with error, rc {}".format(rc))
+        else:
+            port_module_map = {}
+            port_cnt = uint32_t_p_value(port_cnt_p)
+            for i in xrange(port_cnt):
+                port_attributes = sx_port_attributes_t_arr_getitem(port_attributes_list, i)
+                port_module_map[port_attributes.log_port] = port_attributes.port_mapping.module_port
+            self.port_module_map = port_module_map
+
+        delete_sx_port_attributes_t_arr(port_attributes_list)
+        delete_uint32_t_p(port_cnt_p)
+
+    def get_module_ports(self, logical_ports, module_id):
+        """
+        Get the module ports of the logical ports of a PMPE event. They all belong to the
+        module of the event, so a logical port which is unknown or mapped to another module
+        means the port mapping has changed since the map was built: refresh it once.
+        """
+        if any(self.port_module_map.get(logical_port) != module_id for logical_port in logical_ports):
+            logger.log_info("Logical ports {} don't match module {} in port module map, refreshing it"
+                            .format(logical_ports, module_id))
+            self.update_port_module_map()
+
+        return [self.port_module_map.get(logical_port) for logical_port in logical_ports]
+
+    def wait_for_pmpe(self, timeout):
+        """
+        Returns True if the SDK fd has a notification to read within timeout seconds
+        """
+        try:
+            read, _, _ = select.select([self.rx_fd_p.fd], [], [], timeout)
+        except select.error as err:
+            rc, msg = err
+            if rc == errno.EAGAIN or rc == errno.EINTR:
+                return False
+            else:
+                raise
+
+        return self.rx_fd_p.fd in read
+
     def check_sfp_status(self, port_change, timeout):
         """
         the meaning of timeout is aligned with select.select, which has the following meaning:
@@ -210,60 +271,65 @@ class sfp_event:
                 sx_lib_host_ifc_recv_list can return all notification in the fd via a single reading operation but
                                          not supported by PMPE register (I've tested it but failed)
             as a result the only way to satisfy the logic is to call sx_lib_host_ifc_recv in a loop until all notifications
-            has been read and we have to find a way to check that. it seems the only way to check that is via using select. 
-            in this sense, we return one notification each time check_sfp_status called and let the caller, get_change_event,
-            to repeat calling it with timeout = 0 in a loop until no new notification read (in this case it returns false).
-            by doing so all the notifications in the fd can be retrieved through a single call to get_change_event.
+            has been read and we have to find a way to check that. it seems the only way to check that is via using select.
+            in this sense, after the first notification is read we keep polling the fd with timeout = 0 and reading
+            notifications until no more is pending or PMPE_BATCH_SIZE notifications have been handled, so that a burst
+            of notifications, e.g. a mass insertion, is handled by a single call.
         """
         found = 0
 
-        try:
-            read, _, _ = select.select([self.rx_fd_p.fd], [], [], timeout)
-        except select.error as err:
-            rc, msg = err
-            if rc == errno.EAGAIN or rc == errno.EINTR:
-                return False
-            else:
-                raise
+        if not self.wait_for_pmpe(timeout):
+            return False
 
-        for fd in read:
-            if fd == self.rx_fd_p.fd:
-                success, port_list, module_state, error_type = self.on_pmpe(self.rx_fd_p)
-                if not success:
-                    logger.log_error("failed to read from {}".format(fd))
-                    break
-
-                sfp_state = sfp_value_status_dict.get(module_state, STATUS_UNKNOWN)
-                if sfp_state == STATUS_UNKNOWN:
-                    # in the following sequence, STATUS_UNKNOWN can be returned.
-                    # so we shouldn't raise exception here.
-                    # 1. some sfp module is inserted
-                    # 2. sfp_event gets stuck and fails to fetch the change event instantaneously
-                    # 3. and then the sfp module is removed
-                    # 4. sfp_event starts to try fetching the change event
-                    # in this case found is increased so that True will be returned
-                    logger.log_info("unknown module state {}, maybe the port suffers two adjacent insertion/removal".format(module_state))
-                    found += 1
-                    continue
+        for i in xrange(self.PMPE_BATCH_SIZE):
+            success, port_list, module_state, error_type = self.on_pmpe(self.rx_fd_p)
+            if not success:
+                logger.log_error("failed to read from {}".format(self.rx_fd_p.fd))
+                break
 
-                # If get SFP status error(0x3) from SDK, then need to read the error_type to get the detailed error
-                if sfp_state == STATUS_ERROR:
-                    if error_type in sdk_sfp_err_type_dict.keys():
-                        # In SFP at error status case, need to overwrite the sfp_state with the exact error code
-                        sfp_state = sdk_sfp_err_type_dict[error_type]
-                    else:
-                        # For errors don't block the eeprom accessing, we don't report it to XCVRD
-                        logger.log_info("SFP error on port but not blocking eeprom read, error_type {}".format(error_type))
-                        found +=1
-                        continue
+            found += self.handle_pmpe(port_change, port_list, module_state, error_type)
 
-                for port in port_list:
-                    logger.log_info("SFP on port {} state {}".format(port, sfp_state))
-                    port_change[port+1] = sfp_state
-                    found += 1
+            if not self.wait_for_pmpe(0):
+                break
 
         return found != 0
 
+    def handle_pmpe(self, port_change, port_list, module_state, error_type):
+        """
+        Record the SFP state carried by a PMPE notification in port_change.
+        Returns the number of changes found.
+        """
+        found = 0
+
+        sfp_state = sfp_value_status_dict.get(module_state, STATUS_UNKNOWN)
+        if sfp_state == STATUS_UNKNOWN:
+            # in the following sequence, STATUS_UNKNOWN can be returned.
+            # so we shouldn't raise exception here.
+            # 1. some sfp module is inserted
+            # 2. sfp_event gets stuck and fails to fetch the change event instantaneously
+            # 3. and then the sfp module is removed
+            # 4. sfp_event starts to try fetching the change event
+            # in this case found is increased so that True will be returned
+            logger.log_info("unknown module state {}, maybe the port suffers two adjacent insertion/removal".format(module_state))
+            return 1
+
+        # If get SFP status error(0x3) from SDK, then need to read the error_type to get the detailed error
+        if sfp_state == STATUS_ERROR:
+            if error_type in sdk_sfp_err_type_dict.keys():
+                # In SFP at error status case, need to overwrite the sfp_state with the exact error code
+                sfp_state = sdk_sfp_err_type_dict[error_type]
+            else:
+                # For errors don't block the eeprom accessing, we don't report it to XCVRD
+                logger.log_info("SFP error on port but not blocking eeprom read, error_type {}".format(error_type))
+                return 1
+
+        for port in port_list:
+            logger.log_info("SFP on port {} state {}".format(port, sfp_state))
+            port_change[port+1] = sfp_state
+            found += 1
+
+        return found
+
     def on_pmpe(self, fd_p):
         ''' on port module plug event handler '''
 
@@ -274,11 +340,9 @@ class sfp_event:
         pkt = new_uint8_t_arr(pkt_size)
         recv_info_p = new_sx_receive_info_t_p()
         pmpe_t = sx_event_pmpe_t()
-        port_attributes_list = new_sx_port_attributes_t_arr(64)
-        port_cnt_p = new_uint32_t_p()
-        uint32_t_p_assign(port_cnt_p,64)
         label_port_list = []
         module_state = 0
+        error_type = 0
 
         rc = sx_lib_host_ifc_recv(fd_p, pkt, pkt_size_p, recv_info_p)
         if rc != 0:
@@ -301,22 +365,15 @@ class sfp_event:
                 logger.log_info("Receive PMPE plug in/out event on module {}: status {}".format(module_id, module_state))
             else:
                 logger.log_error("Receive PMPE unknown event on module {}: status {}".format(module_id, module_state))
-            for i in xrange(port_list_size):
-                logical_port = sx_port_log_id_t_arr_getitem(logical_port_list, i)
-                rc = sx_api_port_device_get(self.handle, 1 , 0, port_attributes_list,  port_cnt_p)
-                port_cnt = uint32_t_p_value(port_cnt_p)
-
-                for i in xrange(port_cnt):
-                    port_attributes = sx_port_attributes_t_arr_getitem(port_attributes_list,i)
-                    if port_attributes.log_port == logical_port:
-                        lable_port = port_attributes.port_mapping.module_port
-                        break
+            logical_ports = [sx_port_log_id_t_arr_getitem(logical_port_list, i) for i in xrange(port_list_size)]
+            for logical_port, lable_port in zip(logical_ports, self.get_module_ports(logical_ports, module_id)):
+                if lable_port is None:
+                    logger.log_error("Module port of logical port {} not found".format(logical_port))
+                    continue
                 label_port_list.append(lable_port)
 
         delete_uint32_t_p(pkt_size_p)
         delete_uint8_t_arr(pkt)
         delete_sx_receive_info_t_p(recv_info_p)
-        delete_sx_port_attributes_t_arr(port_attributes_list)
-        delete_uint32_t_p(port_cnt_p)
 
         return status, label_port_list, module_state, error_type
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+#############################################################################
+# Mellanox
+#
+# Module contains a snapshot reader of the hw-management attributes, shared
+# by the thermal, fan and psu objects
+#
+#############################################################################
+
+import os
+import threading
+import time
+
+from sonic_py_common.hwmon import SysfsAttrReader
+
+# Default time in seconds during which a snapshot is considered fresh.
+# Getters called within this window are served without touching sysfs.
+DEFAULT_FRESHNESS_SECS = 1
+
+# Default time in seconds after which an attribute which hasn't been
+# requested anymore is dropped from the snapshot, and its fd closed
+DEFAULT_EXPIRY_SECS = 60
+
+SYSFS_ROOT = "/sys/"
+
+
+class SysfsSnapshot(object):
+    """
+    Reads every hw-management attribute which has been requested within the
+    expiry window in a single pass and serves the values from that snapshot
+    until it is older than the freshness window.
+
+    Attributes backed by sysfs keep their file descriptor open across passes
+    and are re-read with pread. Other files (e.g. regular files maintained
+    by hw-management scripts, which may be replaced) are opened on each pass.
+    """
+    def __init__(self, freshness=DEFAULT_FRESHNESS_SECS, sysfs_root=SYSFS_ROOT, expiry=DEFAULT_EXPIRY_SECS):
+        self.freshness = freshness
+        self.sysfs_root = sysfs_root
+        self.expiry = expiry
+        self.lock = threading.Lock()
+        # Path of each attribute of the snapshot -> time it was last requested
+        self.paths = {}
+        self.values = {}
+        self.reader = SysfsAttrReader()
+        self.timestamp = None
+
+    def set_freshness(self, freshness):
+        """
+        Set the freshness window in seconds, 0 disables the snapshot
+        """
+        with self.lock:
+            self.freshness = freshness
+            self.timestamp = None
+
+    def _read_attr(self, path):
+        """
+        Read one attribute, returns its stripped content or None if it can't be read
+        """
+        if os.path.realpath(path).startswith(self.sysfs_root):
+            return self.reader.read(path)
+
+        try:
+            with open(path, 'r') as fileobj:
+                return fileobj.read().strip()
+        except (IOError, OSError):
+            return None
+
+    def _refresh(self, now):
+        for path, requested in list(self.paths.items()):
+            if now - requested >= self.expiry:
+                del self.paths[path]
+                self.reader.close(path)
+        self.values = dict((path, self._read_attr(path)) for path in self.paths)
+        self.timestamp = now
+
+    def read_many(self, paths):
+        """
+        Get the content of several attributes, taking at most one pass over sysfs.
+
+        Returns:
+            A list of the stripped contents of the attributes, None for an
+            attribute which can't be read
+        """
+        with self.lock:
+            if self.freshness <= 0:
+                return [self._read_attr(path) for path in paths]
+
+            now = time.time()
+            new_paths = [path for path in paths if path not in self.paths]
+            for path in paths:
+                self.paths[path] = now
+            if self.timestamp is None or now - self.timestamp >= self.freshness:
+                self._refresh(now)
+            else:
+                # Attributes requested for the first time join the snapshot
+                for path in new_paths:
+                    self.values[path] = self._read_attr(path)
+
+            return [self.values.get(path) for path in paths]
+
+    def read(self, path):
+        """
+        Get the content of an attribute from the snapshot, see read_many
+        """
+        return self.read_many([path])[0]
+
+    def invalidate(self, path=None):
+        """
+        Re-read an attribute of the snapshot after it has been written, or drop
+        the whole snapshot if path is None
+        """
+        with self.lock:
+            if path is None:
+                self.timestamp = None
+            elif path in self.values:
+                self.values[path] = self._read_attr(path)
+
+    def close(self):
+        with self.lock:
+            self.reader.close()
+            self.paths.clear()
+            self.values = {}
+            self.timestamp = None
+
+
+# Snapshot shared by all the Thermal, Fan and Psu objects
+hw_mgmt_snapshot = SysfsSnapshot()
@@ -15,6 +15,7 @@ try:
     from os.path import isfile, join
     import io
     import os.path
+    from .sysfs_snapshot import hw_mgmt_snapshot
 except ImportError as e:
     raise ImportError (str(e) + "- required module not found")
 
@@ -378,12 +379,9 @@ class Thermal(ThermalBase):
         """
         Read a generic file, returns the contents of the file
         """
-        result = None
-        try:
-            with open(filename, 'r') as fileobj:
-                result = fileobj.read().strip()
-        except Exception as e:
-            logger.log_info("Fail to read file {} due to {}".format(filename, repr(e)))
+        result = hw_mgmt_snapshot.read(filename)
+        if result is None:
+            logger.log_info("Fail to read file {}".format(filename))
         return result
 
 
@@ -572,16 +570,9 @@ class Thermal(ThermalBase):
     def _check_thermal_zone_temperature(cls, thermal_zone_path):
         normal_temp_path = join(thermal_zone_path, THERMAL_ZONE_NORMAL_TEMPERATURE)
         current_temp_path = join(thermal_zone_path, THERMAL_ZONE_TEMPERATURE)
-        normal = None
-        current = None
-        try:    
-            with open(normal_temp_path, 'r') as file_obj:
-                normal = float(file_obj.read())
-
-            with open(current_temp_path, 'r') as file_obj:
-                current = float(file_obj.read())
-
-            return current <= normal
+        try:
+            normal, current = hw_mgmt_snapshot.read_many([normal_temp_path, current_temp_path])
+            return float(current) <= float(normal)
         except Exception as e:
             logger.log_info("Fail to check thermal zone temperature for file {} due to {}".format(thermal_zone_path, repr(e)))
 
@@ -591,10 +582,9 @@ class Thermal(ThermalBase):
             raise Exception("Fail to get thermal profile for this switch")
 
         start, count = cls.thermal_profile[THERMAL_DEV_CATEGORY_MODULE]
-        for index in range(count):
-            fault_file_path = MODULE_TEMPERATURE_FAULT_PATH.format(index + start)
-            fault = cls._read_generic_file(fault_file_path, 0)
-            if fault.strip() != '0':
+        fault_file_paths = [MODULE_TEMPERATURE_FAULT_PATH.format(index + start) for index in range(count)]
+        for fault in hw_mgmt_snapshot.read_many(fault_file_paths):
+            if fault != '0':
                 return 'untrust'
         return 'trust'
 
@@ -604,6 +594,5 @@ class Thermal(ThermalBase):
         port_ambient_path = join(HW_MGMT_THERMAL_ROOT, THERMAL_DEV_PORT_AMBIENT)
 
         # if there is any exception, let it raise
-        fan_ambient_temp = int(cls._read_generic_file(fan_ambient_path, 0))
-        port_ambient_temp = int(cls._read_generic_file(port_ambient_path, 0))
+        fan_ambient_temp, port_ambient_temp = [int(value) for value in hw_mgmt_snapshot.read_many([fan_ambient_path, port_ambient_path])]
         return fan_ambient_temp if fan_ambient_temp < port_ambient_temp else port_ambient_temp
@@ -150,7 +150,7 @@ class ThermalRecoverAction(ThermalPolicyActionBase):
 class ChangeMinCoolingLevelAction(ThermalPolicyActionBase):
     UNKNOWN_SKU_COOLING_LEVEL = 6
     def execute(self, thermal_info_dict):
-        from .device_data import DEVICE_DATA
+        from .device_data import DEVICE_DATA, get_min_cooling_level
         from .fan import Fan
         from .thermal_infos import ChassisInfo
         from .thermal_conditions import MinCoolingLevelChangeCondition
@@ -162,15 +162,9 @@ class ChangeMinCoolingLevelAction(ThermalPolicyActionBase):
         else:
             trust_state = MinCoolingLevelChangeCondition.trust_state
             temperature = MinCoolingLevelChangeCondition.temperature
-            minimum_table = DEVICE_DATA[chassis.platform_name]['thermal']['minimum_table']['unk_{}'.format(trust_state)]
-
-            for key, cooling_level in minimum_table.items():
-                temp_range = key.split(':')
-                temp_min = int(temp_range[0].strip())
-                temp_max = int(temp_range[1].strip())
-                if temp_min <= temperature <= temp_max:
-                    Fan.min_cooling_level = cooling_level - 10
-                    break
+            cooling_level = get_min_cooling_level(chassis.platform_name, 'unk_{}'.format(trust_state), temperature)
+            if cooling_level is not None:
+                Fan.min_cooling_level = cooling_level - 10
         
         current_cooling_level = Fan.get_cooling_level()
         if current_cooling_level < Fan.min_cooling_level:
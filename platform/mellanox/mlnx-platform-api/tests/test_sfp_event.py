@@ -0,0 +1,168 @@
+import importlib
+import os
+import sys
+import types
+from mock import MagicMock, patch
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+
+
+class FakeSdk(object):
+    """
+    Minimal stand-in for python_sdk_api.sx_api, which only exists on the switch.
+    Pointers and arrays are plain python objects, PMPE notifications are queued
+    in self.events and API calls are counted in self.calls.
+    """
+    SX_STATUS_SUCCESS = 0
+
+    def __init__(self, port_module_map):
+        self.port_module_map = port_module_map
+        self.events = []
+        self.calls = {}
+
+    def count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def new_uint32_t_p(self):
+        return [0]
+
+    def uint32_t_p_assign(self, p, value):
+        p[0] = value
+
+    def uint32_t_p_value(self, p):
+        return p[0]
+
+    def new_uint8_t_arr(self, size):
+        return bytearray(size)
+
+    def new_sx_receive_info_t_p(self):
+        return MagicMock()
+
+    def sx_event_pmpe_t(self):
+        return MagicMock()
+
+    def new_sx_port_attributes_t_arr(self, size):
+        return [None] * size
+
+    def sx_port_attributes_t_arr_getitem(self, arr, i):
+        return arr[i]
+
+    def sx_port_log_id_t_arr_getitem(self, arr, i):
+        return arr[i]
+
+    def sx_api_port_device_get(self, handle, device_id, swid, port_attributes_list, port_cnt_p):
+        self.count('sx_api_port_device_get')
+        ports = sorted(self.port_module_map.items())
+        for i, (log_port, module_port) in enumerate(ports):
+            attrs = MagicMock()
+            attrs.log_port = log_port
+            attrs.port_mapping.module_port = module_port
+            port_attributes_list[i] = attrs
+        port_cnt_p[0] = len(ports)
+        return self.SX_STATUS_SUCCESS
+
+    def sx_lib_host_ifc_recv(self, fd_p, pkt, pkt_size_p, recv_info_p):
+        self.count('sx_lib_host_ifc_recv')
+        log_ports, module_state = self.events.pop(0)
+        pmpe = recv_info_p.event_info.pmpe
+        pmpe.list_size = len(log_ports)
+        pmpe.log_port_list = log_ports
+        pmpe.module_state = module_state
+        pmpe.error_type = 0
+        pmpe.module_id = self.port_module_map[log_ports[0]]
+        return self.SX_STATUS_SUCCESS
+
+    def select(self, rlist, wlist, xlist, timeout):
+        return (rlist if self.events else [], [], [])
+
+    def module(self):
+        sx_api = types.ModuleType('python_sdk_api.sx_api')
+        for name in dir(self):
+            if not name.startswith('_') and name not in ('count', 'module', 'select'):
+                setattr(sx_api, name, getattr(self, name))
+        for name in ('delete_uint32_t_p', 'delete_uint8_t_arr', 'delete_sx_receive_info_t_p',
+                     'delete_sx_port_attributes_t_arr', 'new_sx_fd_t_p', 'new_sx_user_channel_t_p'):
+            setattr(sx_api, name, MagicMock())
+        return sx_api
+
+
+def load_sfp_event(sdk):
+    python_sdk_api = types.ModuleType('python_sdk_api')
+    python_sdk_api.sx_api = sdk.module()
+    with patch.dict(sys.modules, {'python_sdk_api': python_sdk_api, 'python_sdk_api.sx_api': python_sdk_api.sx_api}):
+        # Import a fresh copy of the module bound to this fake SDK
+        sys.modules.pop('sonic_platform.sfp_event', None)
+        sfp_event = importlib.import_module('sonic_platform.sfp_event')
+    sys.modules.pop('sonic_platform.sfp_event', None)
+    return sfp_event
+
+
+def test_pmpe_burst_uses_cached_port_map():
+    # 4 logical ports per module, logical port ids are not contiguous
+    port_module_map = dict((0x10000 + i * 0x100, i // 4) for i in range(32))
+    sdk = FakeSdk(port_module_map)
+    sfp_event = load_sfp_event(sdk)
+
+    event = sfp_event.sfp_event()
+    event.rx_fd_p = MagicMock(fd=1)
+    event.update_port_module_map()
+    assert sdk.calls['sx_api_port_device_get'] == 1
+
+    # A burst of plug in events, e.g. after a mass insertion
+    sdk.events = [([0x10000 + module * 4 * 0x100], sfp_event.SDK_SFP_STATE_IN) for module in range(8)]
+    port_change = {}
+    with patch.object(sfp_event.select, 'select', side_effect=sdk.select):
+        assert event.check_sfp_status(port_change, 0)
+
+    # All the notifications are handled in one call without querying the port attributes again
+    assert sdk.calls['sx_lib_host_ifc_recv'] == 8
+    assert sdk.calls['sx_api_port_device_get'] == 1
+    assert port_change == dict((module + 1, sfp_event.STATUS_PLUGIN) for module in range(8))
+
+    port_change = {}
+    with patch.object(sfp_event.select, 'select', side_effect=sdk.select):
+        assert not event.check_sfp_status(port_change, 0)
+    assert port_change == {}
+
+
+def test_pmpe_unknown_port_refreshes_port_map():
+    port_module_map = {0x10000: 0, 0x10100: 1}
+    sdk = FakeSdk(port_module_map)
+    sfp_event = load_sfp_event(sdk)
+
+    event = sfp_event.sfp_event()
+    event.rx_fd_p = MagicMock(fd=1)
+    event.update_port_module_map()
+
+    # The port is split, a new logical port is mapped to module 1
+    port_module_map[0x10180] = 1
+    sdk.events = [([0x10180], sfp_event.SDK_SFP_STATE_OUT)]
+    port_change = {}
+    with patch.object(sfp_event.select, 'select', side_effect=sdk.select):
+        assert event.check_sfp_status(port_change, 0)
+
+    assert sdk.calls['sx_api_port_device_get'] == 2
+    assert port_change == {2: sfp_event.STATUS_PLUGOUT}
+
+
+def test_pmpe_remapped_port_refreshes_port_map():
+    port_module_map = {0x10000: 0, 0x10100: 1}
+    sdk = FakeSdk(port_module_map)
+    sfp_event = load_sfp_event(sdk)
+
+    event = sfp_event.sfp_event()
+    event.rx_fd_p = MagicMock(fd=1)
+    event.update_port_module_map()
+
+    # The logical ports are swapped between the modules, both are still known
+    port_module_map.update({0x10000: 1, 0x10100: 0})
+    sdk.events = [([0x10000], sfp_event.SDK_SFP_STATE_IN), ([0x10100], sfp_event.SDK_SFP_STATE_OUT)]
+    port_change = {}
+    with patch.object(sfp_event.select, 'select', side_effect=sdk.select):
+        assert event.check_sfp_status(port_change, 0)
+
+    # The first event didn't match the map and refreshed it, the second one matched
+    assert sdk.calls['sx_api_port_device_get'] == 2
+    assert port_change == {2: sfp_event.STATUS_PLUGIN, 1: sfp_event.STATUS_PLUGOUT}
@@ -0,0 +1,160 @@
+import os
+import sys
+import pytest
+from mock import MagicMock, patch
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+
+from sonic_platform import sysfs_snapshot
+from sonic_platform.sysfs_snapshot import SysfsSnapshot
+
+
+def attr_path(tmpdir, name):
+    return str(tmpdir.join(name))
+
+
+def write_attr(tmpdir, name, value):
+    tmpdir.join(name).write('{}\n'.format(value))
+
+
+class TestSysfsSnapshot(object):
+    @pytest.fixture(autouse=True)
+    def sysfs(self, tmpdir):
+        self.sysfs = tmpdir
+
+    def test_freshness_window(self):
+        snapshot = SysfsSnapshot(freshness=5)
+        write_attr(self.sysfs, 'fan1_speed_get', 6000)
+        write_attr(self.sysfs, 'fan2_speed_get', 6100)
+
+        with patch.object(sysfs_snapshot.time, 'time', MagicMock(return_value=100.0)) as mock_time:
+            assert snapshot.read_many([attr_path(self.sysfs, 'fan1_speed_get'), attr_path(self.sysfs, 'fan2_speed_get')]) == ['6000', '6100']
+
+            # Served from the snapshot within the freshness window
+            write_attr(self.sysfs, 'fan1_speed_get', 7000)
+            assert snapshot.read(attr_path(self.sysfs, 'fan1_speed_get')) == '6000'
+
+            mock_time.return_value = 105.0
+            assert snapshot.read(attr_path(self.sysfs, 'fan1_speed_get')) == '7000'
+
+            # Attributes which can't be read are reported as None
+            assert snapshot.read(attr_path(self.sysfs, 'fan3_speed_get')) is None
+
+        snapshot.set_freshness(0)
+        write_attr(self.sysfs, 'fan2_speed_get', 7100)
+        assert snapshot.read(attr_path(self.sysfs, 'fan2_speed_get')) == '7100'
+        snapshot.close()
+
+    def test_single_pass_and_fd_reuse(self):
+        snapshot = SysfsSnapshot(freshness=5, sysfs_root=os.path.realpath(str(self.sysfs)))
+        paths = []
+        for index in range(1, 33):
+            write_attr(self.sysfs, 'module{}_temp_fault'.format(index), 0)
+            paths.append(attr_path(self.sysfs, 'module{}_temp_fault'.format(index)))
+
+        with patch.object(sysfs_snapshot.time, 'time', MagicMock(return_value=100.0)) as mock_time, \
+                patch.object(sysfs_snapshot.os, 'open', side_effect=os.open) as mock_open:
+            assert snapshot.read_many(paths) == ['0'] * len(paths)
+            assert mock_open.call_count == len(paths)
+
+            for path in paths:
+                snapshot.read(path)
+            assert mock_open.call_count == len(paths)
+
+            # The next pass re-reads the attributes through the cached file descriptors
+            write_attr(self.sysfs, 'module5_temp_fault', 1)
+            mock_time.return_value = 200.0
+            assert snapshot.read(paths[4]) == '1'
+            assert mock_open.call_count == len(paths)
+
+        snapshot.close()
+        assert not snapshot.reader.fds
+
+    def test_invalidate_after_write(self):
+        snapshot = SysfsSnapshot(freshness=5)
+        write_attr(self.sysfs, 'fan1_speed_set', 153)
+        assert snapshot.read(attr_path(self.sysfs, 'fan1_speed_set')) == '153'
+
+        write_attr(self.sysfs, 'fan1_speed_set', 204)
+        snapshot.invalidate(attr_path(self.sysfs, 'fan1_speed_set'))
+        assert snapshot.read(attr_path(self.sysfs, 'fan1_speed_set')) == '204'
+        snapshot.close()
+
+
+    def test_unrequested_attributes_expire(self):
+        snapshot = SysfsSnapshot(freshness=5, sysfs_root=os.path.realpath(str(self.sysfs)), expiry=60)
+        write_attr(self.sysfs, 'psu1_temp', 30000)
+        write_attr(self.sysfs, 'psu2_temp', 31000)
+
+        with patch.object(sysfs_snapshot.time, 'time', MagicMock(return_value=100.0)) as mock_time:
+            snapshot.read_many([attr_path(self.sysfs, 'psu1_temp'), attr_path(self.sysfs, 'psu2_temp')])
+            assert len(snapshot.reader.fds) == 2
+
+            # Only psu1 keeps being requested, e.g. psu2 was removed
+            for now in range(110, 200, 10):
+                mock_time.return_value = float(now)
+                assert snapshot.read(attr_path(self.sysfs, 'psu1_temp')) == '30000'
+
+            assert list(snapshot.paths) == [attr_path(self.sysfs, 'psu1_temp')]
+            assert list(snapshot.reader.fds) == [attr_path(self.sysfs, 'psu1_temp')]
+
+            # An expired attribute joins the snapshot again when it is requested
+            assert snapshot.read(attr_path(self.sysfs, 'psu2_temp')) == '31000'
+            assert len(snapshot.paths) == 2
+
+        snapshot.close()
+
+
+class TestSnapshotGetters(object):
+    @pytest.fixture(autouse=True)
+    def sysfs(self, tmpdir):
+        self.sysfs = tmpdir
+        self.snapshot = SysfsSnapshot(freshness=5)
+        yield
+        self.snapshot.close()
+
+    def test_fan_getters(self):
+        from sonic_platform import fan
+        from sonic_platform.fan import Fan
+
+        write_attr(self.sysfs, 'fan1_speed_get', 10500)
+        write_attr(self.sysfs, 'fan1_max', 21000)
+        write_attr(self.sysfs, 'fan1_speed_set', 153)
+        write_attr(self.sysfs, 'fan1_fault', 0)
+
+        with patch.object(fan, 'FAN_PATH', str(self.sysfs)), \
+                patch.object(fan, 'hw_mgmt_snapshot', self.snapshot):
+            system_fan = Fan(0, MagicMock())
+            assert system_fan.get_speed() == 50
+            assert system_fan.get_target_speed() == 60
+            assert system_fan.get_status()
+
+            write_attr(self.sysfs, 'fan1_fault', 1)
+            self.snapshot.invalidate()
+            assert not system_fan.get_status()
+
+            os.remove(attr_path(self.sysfs, 'fan1_speed_get'))
+            self.snapshot.invalidate()
+            assert system_fan.get_speed() == 0
+
+    def test_module_temperature_trustable(self):
+        from sonic_platform import thermal
+        from sonic_platform.thermal import Thermal, THERMAL_DEV_CATEGORY_MODULE
+
+        for index in range(1, 5):
+            write_attr(self.sysfs, 'module{}_temp_fault'.format(index), 0)
+
+        with patch.object(thermal, 'MODULE_TEMPERATURE_FAULT_PATH', attr_path(self.sysfs, 'module{}_temp_fault')), \
+                patch.object(thermal, 'hw_mgmt_snapshot', self.snapshot), \
+                patch.object(Thermal, 'thermal_profile', {THERMAL_DEV_CATEGORY_MODULE: (1, 4)}):
+            assert Thermal.check_module_temperature_trustable() == 'trust'
+
+            write_attr(self.sysfs, 'module3_temp_fault', 1)
+            self.snapshot.invalidate()
+            assert Thermal.check_module_temperature_trustable() == 'untrust'
+
+            os.remove(attr_path(self.sysfs, 'module3_temp_fault'))
+            self.snapshot.invalidate()
+            assert Thermal.check_module_temperature_trustable() == 'untrust'
@@ -467,6 +467,46 @@ def check_minimum_table_data(platform, minimum_table):
                 assert cooling_level > previous_cooling_level
             previous_cooling_level = cooling_level
 
+def find_min_cooling_level_by_scan(minimum_table, temperature):
+    # Reference lookup which scans the "low:high" range strings
+    for key, cooling_level in minimum_table.items():
+        temp_range = key.split(':')
+        if int(temp_range[0].strip()) <= temperature <= int(temp_range[1].strip()):
+            return cooling_level
+    return None
+
+def test_compiled_minimum_table_equivalence():
+    from sonic_platform.device_data import DEVICE_DATA, MINIMUM_TABLES, get_min_cooling_level
+    temperatures = list(range(-130, 125)) + [x + 0.5 for x in range(-130, 125)]
+    for platform, platform_data in DEVICE_DATA.items():
+        if 'thermal' not in platform_data or 'minimum_table' not in platform_data['thermal']:
+            assert platform not in MINIMUM_TABLES
+            continue
+        for category, minimum_table in platform_data['thermal']['minimum_table'].items():
+            for temperature in temperatures:
+                assert get_min_cooling_level(platform, category, temperature) == \
+                    find_min_cooling_level_by_scan(minimum_table, temperature), \
+                    '{}-{} mismatch at {}'.format(platform, category, temperature)
+
+    assert get_min_cooling_level('invalid', 'unk_trust', 25) is None
+
+def test_compile_minimum_table_validation():
+    from sonic_platform.device_data import compile_minimum_table
+    assert compile_minimum_table('p', 'unk_trust', {"31:120":14, "-127:30":13}) == ([-127, 31], [30, 120], [13, 14])
+
+    invalid_tables = [
+        {},
+        {"-127:30":13, "30:120":14},
+        {"-127:30":13, "32:120":14},
+        {"-127:30":13, "31:100":14},
+        {"-120:30":13, "31:120":14},
+        {"-127:30":13, "40:31":14, "41:120":15},
+        {"-127:abc":13},
+    ]
+    for table in invalid_tables:
+        with pytest.raises(ValueError):
+            compile_minimum_table('p', 'unk_trust', table)
+
 def test_dynamic_minimum_policy(thermal_manager):
     from sonic_platform.thermal_conditions import MinCoolingLevelChangeCondition
     from sonic_platform.thermal_actions import ChangeMinCoolingLevelAction
@@ -1,13 +1,173 @@
 #!/usr/bin/env python
 
-import swsssdk
+"""
+    chassis_db.py
+    Load the virtual chassis topology into the chassis DB. The topology file
+    maps each redis hash to its fields:
+        { "<hash key>": { "<field>": "<value>", ... }, ... }
+    All the hashes are built in memory and written in a single MULTI/EXEC
+    pipeline. The loaded topology is kept in the chassis DB, in the
+    LOADED_TOPOLOGY_KEY hash, so a reload only writes the hashes and fields
+    which changed since the previous load, and removes the ones which
+    disappeared from the file.
+"""
+
+from __future__ import print_function
+
+import argparse
 import json
-chassisdb = swsssdk.SonicV2Connector(host='10.0.0.200', port='6380')
-chassisdb.connect(chassisdb.CHASSIS_DB)
-fname='/usr/share/sonic/virtual_chassis/chassis_db.json'
-with open(fname) as f:
-   js = json.load(f)
-   client=chassisdb.get_redis_client(chassisdb.CHASSIS_DB)
-   for h, table in js.items():
-      for k, v in table.items():
-         client.hset(h, k, v)
+import os
+import sys
+import time
+
+import swsssdk
+
+TOPOLOGY_FILE = '/usr/share/sonic/virtual_chassis/chassis_db.json'
+CHASSIS_DB_HOST = '10.0.0.200'
+CHASSIS_DB_PORT = '6380'
+
+# Hash of the topology loaded last in the chassis DB, mapping each hash key
+# of the topology to the JSON of its fields. It is a hash under a table of
+# its own, so the consumers of the chassis DB reading all its keys as hashes
+# can read it as well.
+LOADED_TOPOLOGY_KEY = 'VIRTUAL_CHASSIS_LOADER|LOADED_TOPOLOGY'
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+
+def read_topology(fname):
+    """
+    Returns the topology of the file, as a dict of hash key -> dict of
+    field -> string value. Raises ValueError if the file doesn't match the
+    expected schema.
+    """
+    with open(fname) as f:
+        js = json.load(f)
+
+    if not isinstance(js, dict):
+        raise ValueError('{}: expected an object of hashes'.format(fname))
+
+    topology = {}
+    for key, table in js.items():
+        if key == LOADED_TOPOLOGY_KEY:
+            raise ValueError('{}: {} is reserved'.format(fname, key))
+        if not isinstance(table, dict) or not table:
+            raise ValueError('{}: {} is not a non-empty object of fields'.format(fname, key))
+        fvs = {}
+        for field, value in table.items():
+            if isinstance(value, bool) or not isinstance(value, (string_types, int, float)):
+                raise ValueError('{}: {}: {} is not a string or a number'.format(fname, key, field))
+            fvs[field] = value if isinstance(value, string_types) else str(value)
+        topology[key] = fvs
+    return topology
+
+
+def get_loaded_topology(client):
+    """ Returns the topology loaded last, None if unknown """
+    loaded = {}
+    for key, fvs in client.hgetall(LOADED_TOPOLOGY_KEY).items():
+        if isinstance(key, bytes):
+            key = key.decode()
+        try:
+            fvs = json.loads(fvs)
+        except ValueError:
+            return None
+        if not isinstance(fvs, dict):
+            return None
+        loaded[key] = fvs
+    return loaded or None
+
+
+def load_topology(client, topology, loaded=None):
+    """
+    Write the topology to the chassis DB in one transaction. Only the
+    changes from the loaded topology are written, all the hashes are
+    rewritten if it is None. Returns the number of hashes written or deleted.
+    """
+    pipe = client.pipeline(transaction=True)
+    count = 0
+
+    if loaded is None:
+        pipe.delete(LOADED_TOPOLOGY_KEY)
+        for key, fvs in topology.items():
+            pipe.delete(key)
+            pipe.hset(key, mapping=fvs)
+            pipe.hset(LOADED_TOPOLOGY_KEY, key, json.dumps(fvs, sort_keys=True))
+            count += 1
+    else:
+        for key in loaded:
+            if key not in topology:
+                pipe.delete(key)
+                pipe.hdel(LOADED_TOPOLOGY_KEY, key)
+                count += 1
+        for key, fvs in topology.items():
+            old_fvs = loaded.get(key, {})
+            if fvs == old_fvs:
+                continue
+            if key not in loaded:
+                # Drop whatever the hash held before the loader knew of it
+                pipe.delete(key)
+            stale_fields = [field for field in old_fvs if field not in fvs]
+            if stale_fields:
+                pipe.hdel(key, *stale_fields)
+            changed_fvs = dict((field, value) for field, value in fvs.items() if old_fvs.get(field) != value)
+            if changed_fvs:
+                pipe.hset(key, mapping=changed_fvs)
+            pipe.hset(LOADED_TOPOLOGY_KEY, key, json.dumps(fvs, sort_keys=True))
+            count += 1
+
+    pipe.execute()
+    return count
+
+
+def load_file(client, fname, full=False):
+    topology = read_topology(fname)
+    loaded = None if full else get_loaded_topology(client)
+    count = load_topology(client, topology, loaded)
+    print('Loaded {}: {} hashes updated'.format(fname, count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load the virtual chassis topology into the chassis DB')
+    parser.add_argument('-f', '--file', default=TOPOLOGY_FILE, help='topology file')
+    parser.add_argument('--host', default=CHASSIS_DB_HOST, help='chassis DB host')
+    parser.add_argument('--port', default=CHASSIS_DB_PORT, help='chassis DB port')
+    parser.add_argument('--full', action='store_true', help='rewrite all the hashes of the topology')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='keep running, and reload the topology file when it changes')
+    args = parser.parse_args()
+
+    chassisdb = swsssdk.SonicV2Connector(host=args.host, port=args.port)
+    chassisdb.connect(chassisdb.CHASSIS_DB)
+    client = chassisdb.get_redis_client(chassisdb.CHASSIS_DB)
+
+    try:
+        load_file(client, args.file, args.full)
+    except ValueError as e:
+        print('Invalid topology: {}'.format(e), file=sys.stderr)
+        sys.exit(1)
+
+    if args.watch is None:
+        return
+
+    mtime = os.stat(args.file).st_mtime
+    while True:
+        time.sleep(args.watch)
+        try:
+            new_mtime = os.stat(args.file).st_mtime
+        except OSError:
+            continue
+        if new_mtime == mtime:
+            continue
+        mtime = new_mtime
+        try:
+            load_file(client, args.file)
+        except ValueError as e:
+            print('Invalid topology, not reloaded: {}'.format(e), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
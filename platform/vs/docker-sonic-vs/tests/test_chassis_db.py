@@ -0,0 +1,158 @@
+import imp
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from distutils.spawn import find_executable
+from unittest import TestCase, skipUnless
+
+import mock
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+sys.modules.setdefault('swsssdk', mock.MagicMock())
+
+CHASSIS_DB = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'chassis_db.py')
+chassis_db = imp.load_source('chassis_db', CHASSIS_DB)
+
+REDIS_SERVER = find_executable('redis-server')
+
+NUM_LINECARDS = 16
+NUM_PORTS = 64
+
+WRITE_COMMANDS = ('hset', 'hmset', 'hdel', 'del', 'set')
+
+
+def generate_topology():
+    """ The system ports and interfaces of a large chassis """
+    topology = {}
+    for lc in range(1, NUM_LINECARDS + 1):
+        for port in range(NUM_PORTS):
+            name = 'Linecard{}|Asic0|Ethernet{}'.format(lc, port * 4)
+            topology['SYSTEM_PORT|' + name] = {
+                'system_port_id': str(lc * NUM_PORTS + port),
+                'switch_id': str(lc * 2),
+                'core_index': str(port % 2),
+                'core_port_index': str(port + 1),
+                'speed': '400000',
+            }
+            topology['SYSTEM_INTERFACE|' + name] = {'mtu': '9100'}
+    return topology
+
+
+@skipUnless(REDIS_SERVER and redis, 'requires redis-server and the redis python package')
+class TestChassisDb(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.topology_file = os.path.join(self.tmp_dir, 'chassis_db.json')
+        self.socket_path = os.path.join(self.tmp_dir, 'redis.sock')
+        self.server = subprocess.Popen([REDIS_SERVER, '--port', '0', '--unixsocket', self.socket_path,
+                                        '--save', '', '--appendonly', 'no'],
+                                       stdout=open(os.devnull, 'w'))
+        for _ in range(100):
+            if os.path.exists(self.socket_path):
+                break
+            time.sleep(0.05)
+        self.client = redis.StrictRedis(unix_socket_path=self.socket_path, decode_responses=True)
+        self.topology = generate_topology()
+
+    def tearDown(self):
+        if self.server.poll() is None:
+            self.server.terminate()
+            self.server.wait()
+        shutil.rmtree(self.tmp_dir)
+
+    def load(self, topology, full=False):
+        with open(self.topology_file, 'w') as f:
+            json.dump(topology, f)
+        chassis_db.load_file(self.client, self.topology_file, full)
+
+    def write_count(self):
+        stats = self.client.info('commandstats')
+        return sum(stats.get('cmdstat_' + command, {}).get('calls', 0) for command in WRITE_COMMANDS)
+
+    def assert_db_matches(self, topology):
+        keys = set(self.client.keys()) - set([chassis_db.LOADED_TOPOLOGY_KEY])
+        self.assertEqual(keys, set(topology))
+        pipe = self.client.pipeline(transaction=False)
+        for key in sorted(keys):
+            pipe.hgetall(key)
+        self.assertEqual(dict(zip(sorted(keys), pipe.execute())), topology)
+        # Every key of the chassis DB, the loader's included, is a hash
+        self.assertEqual(set(self.client.type(key) for key in self.client.keys()), set(['hash']))
+
+    def test_full_load(self):
+        key = 'SYSTEM_PORT|Linecard1|Asic0|Ethernet0'
+        self.client.hset(key, 'stale_field', 'x')
+
+        self.load(self.topology)
+        self.assert_db_matches(self.topology)
+        self.assertEqual(chassis_db.get_loaded_topology(self.client), self.topology)
+
+        # A full load rewrites everything, whatever was loaded
+        self.client.hset(key, 'speed', '100000')
+        self.load(self.topology, full=True)
+        self.assert_db_matches(self.topology)
+
+    def test_unchanged_reload(self):
+        self.load(self.topology)
+        writes = self.write_count()
+
+        loaded = chassis_db.get_loaded_topology(self.client)
+        self.assertEqual(chassis_db.load_topology(self.client, self.topology, loaded), 0)
+        self.load(self.topology)
+        self.assertEqual(self.write_count(), writes)
+        self.assert_db_matches(self.topology)
+
+    def test_incremental_diff(self):
+        self.load(self.topology)
+
+        topology = json.loads(json.dumps(self.topology))
+        del topology['SYSTEM_INTERFACE|Linecard1|Asic0|Ethernet0']
+        topology['SYSTEM_PORT|Linecard2|Asic0|Ethernet4']['speed'] = '100000'
+        del topology['SYSTEM_PORT|Linecard3|Asic0|Ethernet8']['core_index']
+        topology['SYSTEM_INTERFACE|Linecard4|Asic0|Ethernet12']['admin_status'] = 'up'
+        topology['SYSTEM_LAG|Linecard5|Asic0|PortChannel1'] = {'system_lag_id': '1', 'switch_id': '10'}
+
+        loaded = chassis_db.get_loaded_topology(self.client)
+        writes = self.write_count()
+        self.assertEqual(chassis_db.load_topology(self.client, topology, loaded), 5)
+        # One write to the hash and one to the loaded topology per change,
+        # and the deletion of the new hash
+        self.assertEqual(self.write_count() - writes, 11)
+        self.assert_db_matches(topology)
+        self.assertEqual(chassis_db.get_loaded_topology(self.client), topology)
+
+    def test_incremental_new_key_overwrites_leftovers(self):
+        self.load(self.topology)
+
+        key = 'SYSTEM_LAG|Linecard5|Asic0|PortChannel1'
+        self.client.hset(key, mapping={'system_lag_id': '7', 'stale_field': 'x'})
+        topology = dict(self.topology)
+        topology[key] = {'system_lag_id': '1', 'switch_id': '10'}
+
+        self.load(topology)
+        self.assert_db_matches(topology)
+
+    def test_schema_rejection(self):
+        self.load(self.topology)
+        writes = self.write_count()
+
+        for invalid in ([self.topology],
+                        {'SYSTEM_PORT|Linecard1|Asic0|Ethernet0': {}},
+                        {'SYSTEM_PORT|Linecard1|Asic0|Ethernet0': 'speed'},
+                        {'SYSTEM_PORT|Linecard1|Asic0|Ethernet0': {'speed': {'value': '1'}}},
+                        {'SYSTEM_PORT|Linecard1|Asic0|Ethernet0': {'admin_status': True}},
+                        {chassis_db.LOADED_TOPOLOGY_KEY: {'speed': '1'}}):
+            with self.assertRaises(ValueError):
+                self.load(invalid)
+
+        self.assertEqual(self.write_count(), writes)
+        self.assert_db_matches(self.topology)
@@ -0,0 +1,62 @@
+import copy
+import os
+import sys
+
+import pytest
+
+from minigraph import parse_xml
+
+from .conftest import SYNTHETIC_SIZES
+
+# sonic-cfggen arguments of the benchmarks reading the config DB
+FROM_DB_ARGS = [
+    ('print-data', ['-d', '--print-data']),
+    ('print-data-compact', ['-d', '--print-data', '--compact']),
+    ('var-json-port', ['-d', '--var-json', 'PORT']),
+]
+
+
+class FakeConfigDBPipeConnector(object):
+    """ Config DB serving a copy of config, as returned by get_config """
+    config = {}
+
+    def __init__(self, **kwargs):
+        pass
+
+    def connect(self, *args, **kwargs):
+        pass
+
+    def get_config(self):
+        return copy.deepcopy(self.config)
+
+
+@pytest.fixture
+def run_cfggen(cfggen, monkeypatch):
+    """ Returns a function running sonic-cfggen main() with the given arguments, output discarded """
+    devnull = open(os.devnull, 'w')
+    monkeypatch.setattr(sys, 'stdout', devnull)
+    monkeypatch.setattr(cfggen, 'ConfigDBPipeConnector', FakeConfigDBPipeConnector)
+
+    def run(argv):
+        monkeypatch.setattr(sys, 'argv', ['sonic-cfggen'] + argv)
+        cfggen.main()
+
+    yield run
+    devnull.close()
+
+
+@pytest.mark.parametrize('num_ports', SYNTHETIC_SIZES)
+@pytest.mark.parametrize('args',
+                         [args[1] for args in FROM_DB_ARGS],
+                         ids=[args[0] for args in FROM_DB_ARGS])
+def test_from_db(benchmark, run_cfggen, monkeypatch, synthetic_graphs, args, num_ports):
+    minigraph, port_config = synthetic_graphs[num_ports]
+    monkeypatch.setattr(FakeConfigDBPipeConnector, 'config',
+                        parse_xml(minigraph, port_config_file=port_config))
+    benchmark(run_cfggen, args)
+
+
+@pytest.mark.parametrize('num_ports', SYNTHETIC_SIZES)
+def test_minigraph_print_data(benchmark, run_cfggen, synthetic_graphs, num_ports):
+    minigraph, port_config = synthetic_graphs[num_ports]
+    benchmark(run_cfggen, ['-m', minigraph, '-p', port_config, '--print-data'])
@@ -0,0 +1,57 @@
+import pytest
+
+from minigraph import parse_xml
+from portconfig import get_port_config
+
+from .conftest import SYNTHETIC_SIZES, repo_file, sample_file
+
+ARISTA7050_SKU_DIR = ('device', 'arista', 'x86_64-arista_7050_qx32s', 'Arista-7050-QX-32S')
+DELL6100_SKU_DIR = ('device', 'dell', 'x86_64-dell_s6100_c2538-r0', 'Force10-S6100')
+
+# (id, minigraph, port config) of the sample graphs of the unit tests
+SAMPLE_GRAPHS = [
+    ('simple', sample_file('simple-sample-graph.xml'), sample_file('t0-sample-port-config.ini')),
+    ('t0', sample_file('t0-sample-graph.xml'), sample_file('t0-sample-port-config.ini')),
+    ('t1-mlnx', sample_file('t1-sample-graph-mlnx.xml'), sample_file('sample-port-config-mlnx.ini')),
+    ('arista7050-t0', sample_file('sample-arista-7050-t0-minigraph.xml'), repo_file(*(ARISTA7050_SKU_DIR + ('port_config.ini',)))),
+    ('dell6100-t0', sample_file('sample-dell-6100-t0-minigraph.xml'), repo_file(*(DELL6100_SKU_DIR + ('port_config.ini',)))),
+]
+
+
+@pytest.mark.parametrize('minigraph,port_config',
+                         [graph[1:] for graph in SAMPLE_GRAPHS],
+                         ids=[graph[0] for graph in SAMPLE_GRAPHS])
+def test_parse_xml_sample(benchmark, minigraph, port_config):
+    results = benchmark(parse_xml, minigraph, port_config_file=port_config)
+    assert results['DEVICE_METADATA']['localhost']['hostname']
+
+
+@pytest.mark.parametrize('num_ports', SYNTHETIC_SIZES)
+def test_parse_xml_synthetic(benchmark, synthetic_graphs, num_ports):
+    minigraph, port_config = synthetic_graphs[num_ports]
+    results = benchmark(parse_xml, minigraph, port_config_file=port_config)
+    assert len(results['PORT']) == num_ports
+    # A v4 and a v6 session per routed port and per port channel of 2
+    assert len(results['BGP_NEIGHBOR']) == 2 * (num_ports // 2 + num_ports // 8)
+
+
+@pytest.mark.parametrize('port_config',
+                         [graph[2] for graph in SAMPLE_GRAPHS[1:]],
+                         ids=[graph[0] for graph in SAMPLE_GRAPHS[1:]])
+def test_get_port_config_ini(benchmark, port_config):
+    ports, _, _ = benchmark(get_port_config, port_config_file=port_config)
+    assert ports
+
+
+def test_get_port_config_platform_json(benchmark):
+    ports, _, _ = benchmark(get_port_config,
+                            port_config_file=sample_file('sample_platform.json'),
+                            hwsku_config_file=sample_file('sample_hwsku.json'))
+    assert ports
+
+
+@pytest.mark.parametrize('num_ports', SYNTHETIC_SIZES)
+def test_get_port_config_synthetic(benchmark, synthetic_graphs, num_ports):
+    _, port_config = synthetic_graphs[num_ports]
+    ports, _, _ = benchmark(get_port_config, port_config_file=port_config)
+    assert len(ports) == num_ports
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from minigraph import parse_xml
+
+from .conftest import SYNTHETIC_SIZES, repo_file, sample_file
+
+# Real templates, rendered with the data sonic-cfggen would pass them
+TEMPLATES = [
+    ('interfaces', repo_file('files', 'image_config', 'interfaces', 'interfaces.j2')),
+    ('ports.json', repo_file('dockers', 'docker-orchagent', 'ports.json.j2')),
+    ('lldpd.conf', repo_file('dockers', 'docker-lldp', 'lldpd.conf.j2')),
+    ('dhcp-relay.supervisord', repo_file('dockers', 'docker-dhcp-relay', 'docker-dhcp-relay.supervisord.conf.j2')),
+    ('quagga-bgpd.conf', repo_file('dockers', 'docker-fpm-quagga', 'bgpd.conf.j2')),
+    ('quagga-zebra.conf', repo_file('dockers', 'docker-fpm-quagga', 'zebra.conf.j2')),
+]
+
+GRAPHS = ['t0'] + ['synthetic-{}'.format(num_ports) for num_ports in SYNTHETIC_SIZES]
+
+ADDITIONAL_DATA = {'hwaddr': 'e4:1d:2d:a5:f3:ad'}
+
+
+def get_graph(graph, synthetic_graphs):
+    if graph == 't0':
+        return sample_file('t0-sample-graph.xml'), sample_file('t0-sample-port-config.ini')
+    return synthetic_graphs[int(graph.split('-')[1])]
+
+
+@pytest.mark.parametrize('graph', GRAPHS)
+@pytest.mark.parametrize('template_file',
+                         [template[1] for template in TEMPLATES],
+                         ids=[template[0] for template in TEMPLATES])
+def test_render_template(benchmark, cfggen, synthetic_graphs, template_file, graph):
+    minigraph, port_config = get_graph(graph, synthetic_graphs)
+    data = {}
+    cfggen.deep_update(data, parse_xml(minigraph, port_config_file=port_config))
+    cfggen.deep_update(data, ADDITIONAL_DATA)
+
+    paths = ['/', '/usr/share/sonic/templates', os.path.dirname(os.path.abspath(template_file))]
+    env = cfggen._get_jinja2_env(paths)
+    template = env.get_template(os.path.basename(template_file))
+
+    output = benchmark(template.render, data)
+    assert output
@@ -0,0 +1,67 @@
+import imp
+import os
+
+import pytest
+
+from . import synthetic_graph
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+ENGINE_DIR = os.path.dirname(BENCH_DIR)
+TESTS_DIR = os.path.join(ENGINE_DIR, 'tests')
+REPO_DIR = os.path.join(ENGINE_DIR, '..', '..')
+
+# Number of ports of the synthetic graphs
+SYNTHETIC_SIZES = [64, 512]
+
+
+def sample_file(*path):
+    return os.path.join(TESTS_DIR, *path)
+
+
+def repo_file(*path):
+    return os.path.join(REPO_DIR, *path)
+
+
+def load_cfggen():
+    """ Returns the sonic-cfggen script loaded as a module """
+    return imp.load_source('sonic_cfggen', os.path.join(ENGINE_DIR, 'sonic-cfggen'))
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    """
+    Keep the benchmarks off redis and start each of them from a clean
+    minigraph state, port_alias_map is a module global filled by parse_xml
+    """
+    import minigraph
+    import portconfig
+
+    monkeypatch.setattr(portconfig, 'db_connect_configdb', lambda: None)
+    minigraph.port_alias_map.clear()
+    minigraph.port_alias_asic_map.clear()
+
+
+@pytest.fixture(scope='session')
+def synthetic_graphs(tmpdir_factory):
+    """ Dict of number of ports -> (minigraph file, port config file) """
+    tmpdir = tmpdir_factory.mktemp('synthetic')
+    graphs = {}
+    for num_ports in SYNTHETIC_SIZES:
+        minigraph_file = str(tmpdir.join('minigraph-{}.xml'.format(num_ports)))
+        port_config_file = str(tmpdir.join('port_config-{}.ini'.format(num_ports)))
+        synthetic_graph.write_minigraph(minigraph_file, num_ports)
+        synthetic_graph.write_port_config(port_config_file, num_ports)
+        graphs[num_ports] = (minigraph_file, port_config_file)
+    return graphs
+
+
+@pytest.fixture
+def cfggen(monkeypatch):
+    """
+    The sonic-cfggen module, with its platform lookup detached from the
+    running system, and without redis so the jinja2 bytecode cache is off
+    """
+    module = load_cfggen()
+    monkeypatch.setattr(module, 'SonicV2Connector', lambda **kwargs: None)
+    monkeypatch.setattr(module.device_info, 'get_platform', lambda: None)
+    return module
@@ -0,0 +1,41 @@
+#!/bin/bash
+#
+# Run the sonic-config-engine benchmarks
+#
+# Usage:
+#   run_benchmarks.sh [PYTEST_ARGS...]
+#       Run the benchmarks
+#   run_benchmarks.sh save [NAME] [PYTEST_ARGS...]
+#       Run the benchmarks and store the results as baseline NAME (default: baseline)
+#   run_benchmarks.sh compare [NAME] [THRESHOLD] [PYTEST_ARGS...]
+#       Run the benchmarks and fail if the mean time of any of them regressed
+#       by more than THRESHOLD percent (default: 10) against baseline NAME
+#
+# The baselines are stored under .benchmarks/, per machine. They are only
+# meaningful on the machine, and with the python version, they were taken on.
+#
+
+BENCH_DIR=$(dirname $(realpath $0))
+STORAGE=${BENCHMARK_STORAGE:-$BENCH_DIR/.benchmarks}
+PYTHON=${PYTHON:-python3}
+
+PYTEST_ARGS="-o python_files=bench_*.py --benchmark-only --benchmark-storage=file://$STORAGE"
+
+cd $BENCH_DIR/..
+
+case "$1" in
+save)
+    NAME=${2:-baseline}
+    shift $(( $# < 2 ? $# : 2 ))
+    exec $PYTHON -m pytest $PYTEST_ARGS --benchmark-save=$NAME "$@" benchmarks
+    ;;
+compare)
+    NAME=${2:-baseline}
+    THRESHOLD=${3:-10}
+    shift $(( $# < 3 ? $# : 3 ))
+    exec $PYTHON -m pytest $PYTEST_ARGS --benchmark-compare="*_$NAME" --benchmark-compare-fail=mean:$THRESHOLD% "$@" benchmarks
+    ;;
+*)
+    exec $PYTHON -m pytest $PYTEST_ARGS "$@" benchmarks
+    ;;
+esac
@@ -0,0 +1,229 @@
+"""
+Generators of synthetic minigraphs and port configs of arbitrary size for
+the benchmarks. The generated graph is a leaf router where:
+    - the first half of the ports are routed ports, with a T0 neighbor and
+      a v4 and a v6 BGP session each,
+    - the third quarter of the ports are grouped by 2 into routed port
+      channels, with a BGP session pair each,
+    - the last quarter of the ports are members of Vlan1000,
+    - one data ACL is attached to every 4 ports, plus an everflow ACL and
+      the SNMP and SSH control plane ACLs.
+"""
+
+HOSTNAME = 'switch-t1'
+HWSKU = 'Force10-S6000'
+ASN = 65100
+NEIGHBOR_ASN = 64600
+
+GRAPH_HEADER = """<DeviceMiniGraph xmlns="Microsoft.Search.Autopilot.Evolution" xmlns:i="http://www.w3.org/2001/XMLSchema-instance">
+"""
+
+GRAPH_FOOTER = """  <Hostname>{hostname}</Hostname>
+  <HwSku>{hwsku}</HwSku>
+</DeviceMiniGraph>
+"""
+
+BGP_SESSION = """      <BGPSession>
+        <StartRouter>{hostname}</StartRouter>
+        <StartPeer>{local_addr}</StartPeer>
+        <EndRouter>{neighbor}</EndRouter>
+        <EndPeer>{peer_addr}</EndPeer>
+        <Multihop>1</Multihop>
+        <HoldTime>180</HoldTime>
+        <KeepAliveTime>60</KeepAliveTime>
+      </BGPSession>
+"""
+
+BGP_ROUTER = """      <a:BGPRouterDeclaration>
+        <a:ASN>{asn}</a:ASN>
+        <a:Hostname>{hostname}</a:Hostname>
+        <a:RouteMaps/>
+      </a:BGPRouterDeclaration>
+"""
+
+BGP_PEER = """          <BGPPeer>
+            <Address>{address}</Address>
+            <RouteMapIn i:nil="true"/>
+            <RouteMapOut i:nil="true"/>
+            <Vrf i:nil="true"/>
+          </BGPPeer>
+"""
+
+IP_INTERFACE = """        <IPInterface>
+          <Name i:nil="true"/>
+          <AttachTo>{attach_to}</AttachTo>
+          <Prefix>{prefix}</Prefix>
+        </IPInterface>
+"""
+
+PORT_CHANNEL = """        <PortChannel>
+          <Name>{name}</Name>
+          <AttachTo>{members}</AttachTo>
+          <SubInterface/>
+        </PortChannel>
+"""
+
+ACL_INTERFACE = """        <AclInterface>
+          <AttachTo>{attach_to}</AttachTo>
+          <InAcl>{name}</InAcl>
+          <Type>{acl_type}</Type>
+        </AclInterface>
+"""
+
+DEVICE_LINK = """      <DeviceLinkBase i:type="DeviceInterfaceLink">
+        <ElementType>DeviceInterfaceLink</ElementType>
+        <Bandwidth>40000</Bandwidth>
+        <EndDevice>{neighbor}</EndDevice>
+        <EndPort>Ethernet1</EndPort>
+        <StartDevice>{hostname}</StartDevice>
+        <StartPort>{alias}</StartPort>
+      </DeviceLinkBase>
+"""
+
+DEVICE = """      <Device i:type="{device_type}">
+        <Hostname>{hostname}</Hostname>
+        <HwSku>{hwsku}</HwSku>
+      </Device>
+"""
+
+
+def port_name(index):
+    return 'Ethernet{}'.format(index * 4)
+
+
+def port_alias(index):
+    return 'fortyGigE0/{}'.format(index * 4)
+
+
+def ipv4_pair(index):
+    """ Returns the local and peer addresses of the index-th /31 """
+    base = index * 2
+    prefix = '10.{}.{}.'.format((base >> 16) & 0xff, (base >> 8) & 0xff)
+    return prefix + str(base & 0xff), prefix + str((base & 0xff) + 1)
+
+
+def ipv6_pair(index):
+    """ Returns the local and peer addresses of the index-th /126 """
+    base = index * 4
+    return 'fc00::{:x}'.format(base + 1), 'fc00::{:x}'.format(base + 2)
+
+
+def write_port_config(filename, num_ports):
+    with open(filename, 'w') as f:
+        f.write('# name lanes alias index speed\n')
+        for i in range(num_ports):
+            lanes = ','.join(str(lane) for lane in range(i * 4 + 1, i * 4 + 5))
+            f.write('{} {} {} {} 40000\n'.format(port_name(i), lanes, port_alias(i), i))
+
+
+def write_minigraph(filename, num_ports):
+    routed_ports = range(0, num_ports // 2)
+    pc_ports = range(num_ports // 2, num_ports * 3 // 4)
+    vlan_ports = range(num_ports * 3 // 4, num_ports)
+
+    # Neighbor of each linked port, the members of a port channel are linked
+    # to the same neighbor
+    link_neighbors = {}
+    for i in routed_ports:
+        link_neighbors[i] = 'ARISTA{:04d}T0'.format(i)
+    for i in pc_ports:
+        link_neighbors[i] = 'ARISTA{:04d}T0'.format(i - (i - pc_ports[0]) % 2)
+    neighbors = sorted(set(link_neighbors.values()))
+
+    # (attach_to, neighbor) of each routed interface
+    l3_intfs = [(port_alias(i), link_neighbors[i]) for i in routed_ports]
+    port_channels = []
+    for j, i in enumerate(pc_ports[::2]):
+        name = 'PortChannel{:04d}'.format(j + 1)
+        members = [port_alias(k) for k in (i, i + 1) if k in pc_ports]
+        port_channels.append((name, members))
+        l3_intfs.append((name, link_neighbors[i]))
+
+    out = [GRAPH_HEADER]
+
+    out.append('  <CpgDec>\n    <PeeringSessions>\n')
+    for index, (_, neighbor) in enumerate(l3_intfs):
+        local_v4, peer_v4 = ipv4_pair(index)
+        local_v6, peer_v6 = ipv6_pair(index)
+        out.append(BGP_SESSION.format(hostname=HOSTNAME, local_addr=local_v4, neighbor=neighbor, peer_addr=peer_v4))
+        out.append(BGP_SESSION.format(hostname=HOSTNAME, local_addr=local_v6, neighbor=neighbor, peer_addr=peer_v6))
+    out.append('    </PeeringSessions>\n')
+    out.append('    <Routers xmlns:a="http://schemas.datacontract.org/2004/07/Microsoft.Search.Autopilot.Evolution">\n')
+    out.append('      <a:BGPRouterDeclaration>\n        <a:ASN>{}</a:ASN>\n        <a:Hostname>{}</a:Hostname>\n        <a:Peers>\n'.format(ASN, HOSTNAME))
+    for index in range(len(l3_intfs)):
+        out.append(BGP_PEER.format(address=ipv4_pair(index)[1]))
+    out.append('        </a:Peers>\n        <a:RouteMaps/>\n      </a:BGPRouterDeclaration>\n')
+    for neighbor in neighbors:
+        out.append(BGP_ROUTER.format(asn=NEIGHBOR_ASN, hostname=neighbor))
+    out.append('    </Routers>\n  </CpgDec>\n')
+
+    out.append("""  <DpgDec>
+    <DeviceDataPlaneInfo>
+      <LoopbackIPInterfaces xmlns:a="http://schemas.datacontract.org/2004/07/Microsoft.Search.Autopilot.Evolution">
+        <a:LoopbackIPInterface>
+          <Name>HostIP</Name>
+          <AttachTo>Loopback0</AttachTo>
+          <a:PrefixStr>10.1.0.32/32</a:PrefixStr>
+        </a:LoopbackIPInterface>
+        <a:LoopbackIPInterface>
+          <Name>HostIP1</Name>
+          <AttachTo>Loopback0</AttachTo>
+          <a:PrefixStr>FC00:1::32/128</a:PrefixStr>
+        </a:LoopbackIPInterface>
+      </LoopbackIPInterfaces>
+      <ManagementIPInterfaces xmlns:a="http://schemas.datacontract.org/2004/07/Microsoft.Search.Autopilot.Evolution">
+        <a:ManagementIPInterface>
+          <Name>HostIP</Name>
+          <AttachTo>eth0</AttachTo>
+          <a:PrefixStr>10.250.0.100/24</a:PrefixStr>
+        </a:ManagementIPInterface>
+      </ManagementIPInterfaces>
+""")
+    out.append('      <Hostname>{}</Hostname>\n'.format(HOSTNAME))
+    out.append('      <PortChannelInterfaces>\n')
+    for name, members in port_channels:
+        out.append(PORT_CHANNEL.format(name=name, members=';'.join(members)))
+    out.append('      </PortChannelInterfaces>\n')
+    out.append('      <VlanInterfaces>\n')
+    if vlan_ports:
+        out.append("""        <VlanInterface>
+          <Name>Vlan1000</Name>
+          <AttachTo>{}</AttachTo>
+          <DhcpRelays>192.0.0.1;192.0.0.2</DhcpRelays>
+          <VlanID>1000</VlanID>
+          <Tag>1000</Tag>
+          <Subnets>192.168.0.0/21</Subnets>
+        </VlanInterface>
+""".format(';'.join(port_alias(i) for i in vlan_ports)))
+    out.append('      </VlanInterfaces>\n')
+    out.append('      <IPInterfaces>\n')
+    for index, (attach_to, _) in enumerate(l3_intfs):
+        out.append(IP_INTERFACE.format(attach_to=attach_to, prefix=ipv4_pair(index)[0] + '/31'))
+        out.append(IP_INTERFACE.format(attach_to=attach_to, prefix=ipv6_pair(index)[0] + '/126'))
+    if vlan_ports:
+        out.append(IP_INTERFACE.format(attach_to='Vlan1000', prefix='192.168.0.1/21'))
+    out.append('      </IPInterfaces>\n')
+    out.append('      <AclInterfaces>\n')
+    attachable = [attach_to for (attach_to, _) in l3_intfs]
+    for k in range(0, len(attachable), 4):
+        out.append(ACL_INTERFACE.format(attach_to=';'.join(attachable[k:k + 4]),
+                                        name='DataAcl{}'.format(k // 4), acl_type='DataPlane'))
+    out.append(ACL_INTERFACE.format(attach_to='ERSPAN', name='Everflow', acl_type='Everflow'))
+    out.append(ACL_INTERFACE.format(attach_to='SNMP', name='SNMP_ACL', acl_type='SNMP'))
+    out.append(ACL_INTERFACE.format(attach_to='SSH', name='SSH_ACL', acl_type='SSH'))
+    out.append('      </AclInterfaces>\n')
+    out.append('    </DeviceDataPlaneInfo>\n  </DpgDec>\n')
+
+    out.append('  <PngDec>\n    <DeviceInterfaceLinks>\n')
+    for i in sorted(link_neighbors):
+        out.append(DEVICE_LINK.format(neighbor=link_neighbors[i], hostname=HOSTNAME, alias=port_alias(i)))
+    out.append('    </DeviceInterfaceLinks>\n    <Devices>\n')
+    out.append(DEVICE.format(device_type='LeafRouter', hostname=HOSTNAME, hwsku=HWSKU))
+    for neighbor in neighbors:
+        out.append(DEVICE.format(device_type='ToRRouter', hostname=neighbor, hwsku='Arista-VM'))
+    out.append('    </Devices>\n  </PngDec>\n')
+
+    out.append(GRAPH_FOOTER.format(hostname=HOSTNAME, hwsku=HWSKU))
+
+    with open(filename, 'w') as f:
+        f.write(''.join(out))
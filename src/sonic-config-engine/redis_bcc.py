@@ -1,26 +1,89 @@
 import jinja2
+from jinja2.bccache import Bucket
 
 class RedisBytecodeCache(jinja2.BytecodeCache):
-    """ A bytecode cache for jinja2 template that stores bytecode in Redis """
+    """ A bytecode cache for jinja2 template that stores bytecode in Redis
+
+    The whole cache is fetched with a single HGETALL on the first load, and
+    the bytecode dumped while rendering is kept until flush() writes it back
+    in a single pipeline. Entries are keyed by the template name and the
+    checksum of its source, so the bytecode of a modified template is never
+    loaded, and the entries of its previous versions are removed on flush.
+    """
 
     REDIS_HASH = 'JINJA2_CACHE'
+    KEY_SEPARATOR = '|'
 
     def __init__(self, client):
         self._client = client
+        self._redis = None
+        self._entries = None
+        self._dirty = {}
         try:
             self._client.connect(self._client.STATE_DB, retry_on=False)
+            self._redis = self._client.get_redis_client(self._client.STATE_DB)
         except Exception:
             self._client = None
 
+    def get_bucket(self, environment, name, filename, source):
+        checksum = self.get_source_checksum(source)
+        key = self.get_cache_key(name, filename) + self.KEY_SEPARATOR + checksum
+        bucket = Bucket(environment, key, checksum)
+        self.load_bytecode(bucket)
+        return bucket
+
+    def prefetch(self):
+        """ Fetch all the cached bytecode in one round-trip """
+        self._entries = {}
+        if self._client is None:
+            return
+        try:
+            entries = self._redis.hgetall(self.REDIS_HASH)
+        except Exception:
+            return
+        for key, code in entries.items():
+            if isinstance(key, bytes):
+                key = key.decode()
+            self._entries[key] = code
+
     def load_bytecode(self, bucket):
         if self._client is None:
             return
-        code = self._client.get(self._client.STATE_DB, self.REDIS_HASH, bucket.key)
-        if code is not None:
+        if self._entries is None:
+            self.prefetch()
+        code = self._entries.get(bucket.key)
+        if code is None:
+            return
+        try:
             bucket.bytecode_from_string(code)
+        except Exception:
+            bucket.reset()
 
     def dump_bytecode(self, bucket):
         if self._client is None:
             return
-        self._client.set(self._client.STATE_DB, self.REDIS_HASH, bucket.key, bucket.bytecode_to_string())
+        code = bucket.bytecode_to_string()
+        self._dirty[bucket.key] = code
+        if self._entries is not None:
+            self._entries[bucket.key] = code
+
+    def flush(self):
+        """ Write the dumped bytecode back in one pipeline """
+        if self._client is None or not self._dirty:
+            return
+        templates = set(key.split(self.KEY_SEPARATOR)[0] for key in self._dirty)
+        stale_keys = [key for key in (self._entries or {})
+                      if key.split(self.KEY_SEPARATOR)[0] in templates and key not in self._dirty]
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            if stale_keys:
+                pipe.hdel(self.REDIS_HASH, *stale_keys)
+            for key, code in self._dirty.items():
+                pipe.hset(self.REDIS_HASH, key, code)
+            pipe.execute()
+        except Exception:
+            pass
+        for key in stale_keys:
+            self._entries.pop(key, None)
+        self._dirty = {}
 
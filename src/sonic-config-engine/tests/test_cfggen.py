@@ -85,6 +85,19 @@ class TestCfgGen(TestCase):
         output = self.run_script(argument)
         self.assertTrue(len(output.strip()) > 0)
 
+    def test_print_data_compact(self):
+        argument = '-m "' + self.sample_graph + '" --print-data'
+        output = self.run_script(argument)
+        compact_output = self.run_script(argument + ' --compact')
+        self.assertEqual(compact_output.count('\n'), 1)
+        self.assertEqual(json.loads(compact_output), json.loads(output))
+
+    def test_additional_json_data_compact(self):
+        argument = '-a \'{"k1":{"k11":"v11","k12":["v12",1]}, "k2":{"k22":"v22"}}\' --var-json k1 --compact'
+        output = self.run_script(argument)
+        self.assertEqual(json.loads(output), {"k11": "v11", "k12": ["v12", 1]})
+        self.assertNotIn(' ', output)
+
     def test_jinja_expression(self, graph=None, expected_router_type='LeafRouter'):
         if graph is None:
             graph = self.sample_graph
@@ -0,0 +1,120 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from distutils.spawn import find_executable
+from unittest import TestCase, skipUnless
+
+import jinja2
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from redis_bcc import RedisBytecodeCache
+
+REDIS_SERVER = find_executable('redis-server')
+
+
+class CountingRedis(redis.StrictRedis if redis else object):
+    """ Redis client counting the commands sent outside of a pipeline """
+    commands = 0
+
+    def execute_command(self, *args, **options):
+        self.commands += 1
+        return super(CountingRedis, self).execute_command(*args, **options)
+
+
+class LocalConnector(object):
+    """ The part of SonicV2Connector used by RedisBytecodeCache, over a local redis-server """
+    STATE_DB = 'STATE_DB'
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.client = None
+
+    def connect(self, db_name, retry_on=True):
+        self.client = CountingRedis(unix_socket_path=self.socket_path)
+        self.client.ping()
+        self.client.commands = 0
+
+    def get_redis_client(self, db_name):
+        return self.client
+
+
+@skipUnless(REDIS_SERVER and redis, 'requires redis-server and the redis python package')
+class TestRedisBytecodeCache(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.template_dir = os.path.join(self.tmp_dir, 'templates')
+        os.mkdir(self.template_dir)
+        self.socket_path = os.path.join(self.tmp_dir, 'redis.sock')
+        self.server = subprocess.Popen([REDIS_SERVER, '--port', '0', '--unixsocket', self.socket_path,
+                                        '--save', '', '--appendonly', 'no'],
+                                       stdout=open(os.devnull, 'w'))
+        for _ in range(100):
+            if os.path.exists(self.socket_path):
+                break
+            time.sleep(0.05)
+
+        self.write_template('main.j2', "{% from 'macros.j2' import port %}"
+                                       "{% for i in range(3) %}{{ port(i) }}{% include 'footer.j2' %}{% endfor %}")
+        self.write_template('macros.j2', "{% macro port(i) %}Ethernet{{ i * 4 }}{% endmacro %}")
+        self.write_template('footer.j2', ";")
+
+    def tearDown(self):
+        if self.server.poll() is None:
+            self.server.terminate()
+            self.server.wait()
+        shutil.rmtree(self.tmp_dir)
+
+    def write_template(self, name, source):
+        with open(os.path.join(self.template_dir, name), 'w') as f:
+            f.write(source)
+
+    def render(self):
+        """ Render main.j2 with a new cache, returns the output and the cache """
+        bcc = RedisBytecodeCache(LocalConnector(self.socket_path))
+        env = jinja2.Environment(loader=jinja2.FileSystemLoader(self.template_dir), bytecode_cache=bcc)
+        output = env.get_template('main.j2').render()
+        bcc.flush()
+        return output, bcc
+
+    def cached_keys(self, bcc):
+        return set(key.decode() for key in bcc._redis.hkeys(RedisBytecodeCache.REDIS_HASH))
+
+    def test_single_fetch(self):
+        output, bcc = self.render()
+        self.assertEqual(output, 'Ethernet0;Ethernet4;Ethernet8;')
+        # HGETALL, everything else went through the pipeline
+        self.assertEqual(bcc._client.client.commands, 1)
+        self.assertEqual(len(self.cached_keys(bcc)), 3)
+
+        output, bcc = self.render()
+        self.assertEqual(output, 'Ethernet0;Ethernet4;Ethernet8;')
+        self.assertEqual(bcc._client.client.commands, 1)
+        # All the templates were loaded from the cache, nothing to write back
+        self.assertEqual(bcc._dirty, {})
+
+    def test_modified_template(self):
+        _, bcc = self.render()
+        keys = self.cached_keys(bcc)
+
+        self.write_template('macros.j2', "{% macro port(i) %}Ethernet{{ i }}{% endmacro %}")
+        output, bcc = self.render()
+        self.assertEqual(output, 'Ethernet0;Ethernet1;Ethernet2;')
+
+        # The entry of the previous version of macros.j2 was replaced
+        new_keys = self.cached_keys(bcc)
+        self.assertEqual(len(new_keys), 3)
+        self.assertEqual(len(keys & new_keys), 2)
+
+    def test_no_redis(self):
+        self.server.terminate()
+        self.server.wait()
+        output, bcc = self.render()
+        self.assertEqual(output, 'Ethernet0;Ethernet4;Ethernet8;')
+        self.assertIsNone(bcc._client)
@@ -1,7 +1,9 @@
+import copy
 import glob
 import os
 import re
 import subprocess
+import threading
 
 import yaml
 from natsort import natsorted
@@ -31,13 +33,93 @@ ASIC_CONF_FILENAME = "asic.conf"
 FRONTEND_ASIC_SUB_ROLE = "FrontEnd"
 BACKEND_ASIC_SUB_ROLE = "BackEnd"
 
+# Process-wide caches. File-backed facts are keyed by file path and
+# invalidated when the file's mtime or size changes. DB-backed facts are
+# always read from the DB, through a connection per namespace shared by
+# all callers in the process.
+_cache_lock = threading.Lock()
+_file_cache = {}
+_config_db_pool = {}
 
-def get_localhost_info(field):
+
+def clear_cache():
+    """
+    Drops every cached file-backed fact, as well as all pooled Config DB
+    connections, so the next call of any helper re-reads its data
+    """
+    with _cache_lock:
+        _file_cache.clear()
+        _config_db_pool.clear()
+
+
+def _read_file_cached(path, parser):
+    """
+    Returns parser(path), re-running the parser only if the file's mtime or
+    size changed since the previous call. If the file cannot be stat'ed, the
+    parser is run every time and its result is not cached. Each caller gets
+    its own copy of the cached result, which it is free to modify.
+    """
     try:
+        stat = os.stat(path)
+        signature = (stat.st_mtime, stat.st_size)
+    except OSError:
+        return parser(path)
+
+    with _cache_lock:
+        cached = _file_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return copy.deepcopy(cached[1])
+
+    value = parser(path)
+    with _cache_lock:
+        _file_cache[path] = (signature, value)
+    return copy.deepcopy(value)
+
+
+def get_pooled_config_db(namespace=None):
+    """
+    Returns a connected Config DB handle for the namespace, shared by all
+    callers in this process. The handle is meant for reads of the helpers in
+    this package; callers which subscribe or write should create their own.
+    """
+    # None and the empty string both denote the default namespace
+    namespace = namespace or None
+    with _cache_lock:
+        config_db = _config_db_pool.get(namespace)
+    if config_db is not None:
+        return config_db
+
+    # Connect without holding the lock, connect() may block for a while
+    if namespace is None:
         config_db = ConfigDBConnector()
-        config_db.connect()
+    else:
+        SonicDBConfig.load_sonic_global_db_config()
+        config_db = ConfigDBConnector(use_unix_socket_path=True, namespace=namespace)
+    config_db.connect()
 
-        metadata = config_db.get_table('DEVICE_METADATA')
+    with _cache_lock:
+        # Another thread may have connected meanwhile, keep a single handle
+        return _config_db_pool.setdefault(namespace, config_db)
+
+
+def get_config_db_table(table, namespace=None):
+    """
+    Returns the contents of a Config DB table, read through the pooled
+    connection of the namespace. A pooled connection which fails is dropped
+    so the next call reconnects.
+    """
+    namespace = namespace or None
+    try:
+        return get_pooled_config_db(namespace).get_table(table)
+    except Exception:
+        with _cache_lock:
+            _config_db_pool.pop(namespace, None)
+        raise
+
+
+def get_localhost_info(field):
+    try:
+        metadata = get_config_db_table('DEVICE_METADATA')
 
         if 'localhost' in metadata and field in metadata['localhost']:
             return metadata['localhost'][field]
@@ -62,8 +144,12 @@ def get_machine_info():
     if not os.path.isfile(MACHINE_CONF_PATH):
         return None
 
+    return _read_file_cached(MACHINE_CONF_PATH, _parse_machine_conf)
+
+
+def _parse_machine_conf(path):
     machine_vars = {}
-    with open(MACHINE_CONF_PATH) as machine_conf_file:
+    with open(path) as machine_conf_file:
         for line in machine_conf_file:
             tokens = line.split('=')
             if len(tokens) < 2:
@@ -292,6 +378,10 @@ def get_num_npus():
     asic_conf_file_path = get_asic_conf_file_path()
     if asic_conf_file_path is None:
         return 1
+    return _read_file_cached(asic_conf_file_path, _parse_num_npus)
+
+
+def _parse_num_npus(asic_conf_file_path):
     with open(asic_conf_file_path) as asic_conf_file:
         for line in asic_conf_file:
             tokens = line.split('=')
@@ -340,10 +430,7 @@ def get_all_namespaces():
     if is_multi_npu():
         for npu in range(num_npus):
             namespace = "{}{}".format(NPU_NAME_PREFIX, npu)
-            config_db = ConfigDBConnector(use_unix_socket_path=True, namespace=namespace)
-            config_db.connect()
-
-            metadata = config_db.get_table('DEVICE_METADATA')
+            metadata = get_config_db_table('DEVICE_METADATA', namespace)
             if metadata['localhost']['sub_role'] == FRONTEND_ASIC_SUB_ROLE:
                 front_ns.append(namespace)
             elif metadata['localhost']['sub_role'] == BACKEND_ASIC_SUB_ROLE:
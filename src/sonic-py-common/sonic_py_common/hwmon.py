@@ -0,0 +1,254 @@
+"""
+Helpers for platform monitors which drive the fans from hwmon temperature
+inputs: sample a declared set of sysfs inputs in one pass, map the
+temperature to a PWM value with a hysteresis-based fan curve, and write
+PWM outputs only when the value changes. Everything is read and written
+directly through sysfs, without spawning processes.
+"""
+
+import bisect
+import os
+import threading
+
+# Max size of a sysfs attribute
+ATTR_MAX_SIZE = 4096
+
+
+def pread(fd, size=ATTR_MAX_SIZE, offset=0):
+    """
+    Read from a file descriptor at an offset, without moving its file position
+    """
+    # os.pread is not available in python 2, fall back to lseek + read
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+class SysfsAttrReader(object):
+    """
+    Reads sysfs attributes through file descriptors which are kept open
+    between reads and re-read from offset 0. It is not thread safe, the
+    callers serialize the reads with their own lock.
+    """
+    def __init__(self):
+        self.fds = {}
+
+    def read(self, path):
+        """
+        Read an attribute
+
+        Returns:
+            The stripped content of the attribute, None if it can't be read
+        """
+        fd = self.fds.get(path)
+        if fd is not None:
+            try:
+                return pread(fd).decode('ascii', 'ignore').strip()
+            except (IOError, OSError):
+                # The attribute may have been re-created, e.g. when the device
+                # is re-probed, so open it again below
+                self.close(path)
+
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except (IOError, OSError):
+            return None
+        self.fds[path] = fd
+
+        try:
+            return pread(fd).decode('ascii', 'ignore').strip()
+        except (IOError, OSError):
+            self.close(path)
+            return None
+
+    def close(self, path=None):
+        """
+        Close the file descriptor of an attribute, or all of them if path is None
+        """
+        paths = list(self.fds.keys()) if path is None else [path]
+        for path in paths:
+            fd = self.fds.pop(path, None)
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+
+def read_sysfs_int(path):
+    """
+    Read an integer sysfs attribute
+
+    Returns:
+        The integer value, None if the attribute can't be read or parsed
+    """
+    try:
+        with open(path, 'r') as f:
+            return int(f.read().strip())
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def write_sysfs(path, value):
+    """
+    Write a value to a sysfs attribute
+
+    Returns:
+        True on success, False otherwise
+    """
+    try:
+        with open(path, 'w') as f:
+            f.write(str(value))
+        return True
+    except (IOError, OSError):
+        return False
+
+
+class HwmonSampler(object):
+    """
+    Samples a declared set of hwmon inputs, e.g. temp1_input, in one pass.
+    The file descriptors are kept open between passes and re-read from
+    offset 0, so a pass costs one read per input.
+    """
+    def __init__(self, inputs):
+        """
+        Args:
+            inputs: dict of input name to sysfs path
+        """
+        self.inputs = dict(inputs)
+        self.reader = SysfsAttrReader()
+        self.lock = threading.Lock()
+
+    def _read(self, path):
+        value = self.reader.read(path)
+        try:
+            return int(value) if value is not None else None
+        except ValueError:
+            return None
+
+    def sample(self):
+        """
+        Read all the declared inputs
+
+        Returns:
+            dict of input name to integer value, None for an input which
+            can't be read
+        """
+        with self.lock:
+            return dict((name, self._read(path)) for (name, path) in self.inputs.items())
+
+    def close(self):
+        with self.lock:
+            self.reader.close()
+
+
+class FanCurve(object):
+    """
+    Step fan curve with hysteresis.
+
+    The curve is a list of (temperature, pwm) points sorted by temperature.
+    The pwm of a point applies once the temperature rises above the
+    temperature of the point, the pwm of the first point applies below
+    that. The curve only steps down once the temperature has dropped to the
+    temperature of the current point minus 'hysteresis', which keeps the
+    fans from oscillating around a threshold.
+    """
+    def __init__(self, points, hysteresis=0):
+        if not points:
+            raise ValueError("A fan curve needs at least one point")
+        points = sorted(points)
+        self.temperatures = [temperature for (temperature, _) in points]
+        self.pwms = [pwm for (_, pwm) in points]
+        self.hysteresis = hysteresis
+        self.level = 0
+
+    def _level_of(self, temperature):
+        return max(bisect.bisect_left(self.temperatures, temperature) - 1, 0)
+
+    def update(self, temperature):
+        """
+        Move the curve to the given temperature
+
+        Returns:
+            The pwm value for the temperature
+        """
+        level = self._level_of(temperature)
+        if level < self.level:
+            level = min(self._level_of(temperature + self.hysteresis), self.level)
+        self.level = level
+        return self.pwms[level]
+
+
+class PwmWriter(object):
+    """
+    Writes a PWM value to a set of outputs, skipping the write when the value
+    of an output is unchanged.
+    """
+    def __init__(self, outputs):
+        """
+        Args:
+            outputs: list of sysfs paths of the PWM outputs
+        """
+        self.outputs = list(outputs)
+        self.values = {}
+
+    def write(self, value):
+        """
+        Set all the outputs to value
+
+        Returns:
+            The number of outputs which were written
+        """
+        written = 0
+        for path in self.outputs:
+            if path not in self.values:
+                # Seed with the current value so the first pass does not
+                # rewrite an output which is already set
+                self.values[path] = read_sysfs_int(path)
+            if self.values[path] == value:
+                continue
+            if write_sysfs(path, value):
+                self.values[path] = value
+                written += 1
+            else:
+                self.values.pop(path, None)
+        return written
+
+
+class FanController(object):
+    """
+    Runs one fan control pass at a time: sample the temperature inputs,
+    aggregate them (max by default), apply the fan curve and write PWM.
+    When none of the inputs can be read the fans are set to failsafe_pwm.
+    """
+    def __init__(self, sampler, curve, writer, failsafe_pwm, aggregate=max):
+        self.sampler = sampler
+        self.curve = curve
+        self.writer = writer
+        self.failsafe_pwm = failsafe_pwm
+        self.aggregate = aggregate
+
+    def run_once(self):
+        """
+        Returns:
+            A tuple (temperature, pwm), temperature is None if no input could
+            be read
+        """
+        values = [value for value in self.sampler.sample().values() if value is not None]
+        if values:
+            temperature = self.aggregate(values)
+            pwm = self.curve.update(temperature)
+        else:
+            temperature = None
+            pwm = self.failsafe_pwm
+        self.writer.write(pwm)
+        return temperature, pwm
+
+    def run(self, interval, stop_event):
+        """
+        Run a control pass every 'interval' seconds until stop_event is set
+        """
+        while not stop_event.is_set():
+            self.run_once()
+            stop_event.wait(interval)
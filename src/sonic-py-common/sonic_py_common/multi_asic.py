@@ -1,5 +1,7 @@
 import glob
 import os
+import subprocess
+import threading
 
 from natsort import natsorted
 from swsssdk import ConfigDBConnector
@@ -8,6 +10,8 @@ from swsssdk import SonicV2Connector
 
 from .device_info import CONTAINER_PLATFORM_PATH
 from .device_info import HOST_DEVICE_PATH
+from .device_info import _read_file_cached
+from .device_info import get_config_db_table
 from .device_info import get_platform
 
 ASIC_NAME_PREFIX = 'asic'
@@ -100,6 +104,10 @@ def get_num_asics():
     if asic_conf_file_path is None:
         return 1
 
+    return _read_file_cached(asic_conf_file_path, _parse_num_asics)
+
+
+def _parse_num_asics(asic_conf_file_path):
     with open(asic_conf_file_path) as asic_conf_file:
         for line in asic_conf_file:
             tokens = line.split('=')
@@ -199,9 +207,7 @@ def get_all_namespaces():
     if is_multi_asic():
         for asic in range(num_asics):
             namespace = "{}{}".format(ASIC_NAME_PREFIX, asic)
-            config_db = connect_config_db_for_ns(namespace)
-
-            metadata = config_db.get_table('DEVICE_METADATA')
+            metadata = get_config_db_table('DEVICE_METADATA', namespace)
             if metadata['localhost']['sub_role'] == FRONTEND_ASIC_SUB_ROLE:
                 front_ns.append(namespace)
             elif metadata['localhost']['sub_role'] == BACKEND_ASIC_SUB_ROLE:
@@ -245,8 +251,7 @@ def get_port_table(namespace=None):
 
 def get_port_table_for_asic(namespace):
 
-    config_db = connect_config_db_for_ns(namespace)
-    ports = config_db.get_table(PORT_CFG_DB_TABLE)
+    ports = get_config_db_table(PORT_CFG_DB_TABLE, namespace)
     return ports
 
 
@@ -309,8 +314,7 @@ def is_port_channel_internal(port_channel, namespace=None):
     ns_list = get_namespace_list(namespace)
 
     for ns in ns_list:
-        config_db = connect_config_db_for_ns(ns)
-        port_channels = config_db.get_table(PORT_CHANNEL_CFG_DB_TABLE)
+        port_channels = get_config_db_table(PORT_CHANNEL_CFG_DB_TABLE, ns)
 
         if port_channel in port_channels:
             if 'members' in port_channels[port_channel]:
@@ -388,3 +392,152 @@ def validate_namespace(namespace):
         return True
     else:
         return False
+
+
+class PortIndex(object):
+    """
+    In-memory index of the PORT and PORTCHANNEL tables of a list of
+    namespaces, for callers doing many port lookups that hold on to it.
+
+    The tables of every namespace are loaded once, in parallel, after which
+    port to namespace/role lookups are answered from dictionaries without
+    any DB access. If `subscribe` is True, one listener thread per namespace
+    keeps the index up to date using Config DB keyspace notifications.
+
+    When a port is in the tables of several namespaces, its attributes are
+    those of the last namespace and its namespace is the first one, and a
+    port channel is internal if it is internal in any namespace.
+    """
+
+    def __init__(self, namespaces=None, subscribe=False,
+                 tables=(PORT_CFG_DB_TABLE, PORT_CHANNEL_CFG_DB_TABLE)):
+        if namespaces is None:
+            namespaces = get_namespace_list()
+        self.namespaces = list(namespaces)
+        self.tables = list(tables)
+        self.lock = threading.Lock()
+        # namespace -> table name -> table contents
+        self.ns_tables = {}
+        # port name -> port attributes
+        self.ports = {}
+        # port name -> namespace
+        self.port_namespaces = {}
+        # port channel name -> list of port channel attributes, per namespace
+        self.port_channels = {}
+        self.listeners = []
+
+        self.load()
+        if subscribe:
+            self.subscribe()
+
+    def _load_namespace(self, namespace, results):
+        results[namespace] = dict((table, get_config_db_table(table, namespace))
+                                  for table in self.tables)
+
+    def load(self):
+        """
+        (Re)loads the tables of all namespaces, one thread per namespace
+        """
+        results = {}
+        if len(self.namespaces) == 1:
+            self._load_namespace(self.namespaces[0], results)
+        else:
+            threads = [threading.Thread(target=self._load_namespace, args=(ns, results))
+                       for ns in self.namespaces]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        for ns in self.namespaces:
+            if ns not in results:
+                raise RuntimeError('Failed to load port tables for namespace {}'.format(ns))
+
+        with self.lock:
+            self.ns_tables = results
+            self._build()
+
+    def _build(self):
+        """ Merges the tables of the namespaces, called with the lock held """
+        ports = {}
+        port_namespaces = {}
+        port_channels = {}
+        for ns in self.namespaces:
+            tables = self.ns_tables[ns]
+            for (name, attrs) in tables.get(PORT_CFG_DB_TABLE, {}).items():
+                ports[name] = attrs
+                port_namespaces.setdefault(name, ns)
+            for (name, attrs) in tables.get(PORT_CHANNEL_CFG_DB_TABLE, {}).items():
+                port_channels.setdefault(name, []).append(attrs)
+
+        self.ports = ports
+        self.port_namespaces = port_namespaces
+        self.port_channels = port_channels
+
+    def _update(self, namespace, table, key, data):
+        with self.lock:
+            ns_table = self.ns_tables[namespace].setdefault(table, {})
+            if data:
+                ns_table[key] = data
+            else:
+                ns_table.pop(key, None)
+            self._build()
+
+    def _listen(self, namespace):
+        config_db = connect_config_db_for_ns(namespace)
+        for table in self.tables:
+            config_db.subscribe(table,
+                                lambda table, key, data: self._update(namespace, table, key, data))
+        config_db.listen()
+
+    def subscribe(self):
+        """
+        Starts one daemon thread per namespace which applies changes of the
+        tables to the index as they happen
+        """
+        for ns in self.namespaces:
+            listener = threading.Thread(target=self._listen, args=(ns,))
+            listener.daemon = True
+            listener.start()
+            self.listeners.append(listener)
+
+    def get_port_table(self):
+        with self.lock:
+            return dict(self.ports)
+
+    def get_namespace_for_port(self, port_name):
+        with self.lock:
+            namespace = self.port_namespaces.get(port_name)
+        if namespace is None:
+            raise ValueError('Unknown port name {}'.format(port_name))
+        return namespace
+
+    def get_port_role(self, port_name):
+        with self.lock:
+            attrs = self.ports.get(port_name)
+        if attrs is None:
+            raise ValueError('Unknown port name {}'.format(port_name))
+        return attrs.get(PORT_ROLE, EXTERNAL_PORT)
+
+    def is_port_internal(self, port_name):
+        return self.get_port_role(port_name) == INTERNAL_PORT
+
+    def get_external_ports(self, port_names):
+        external_ports = set()
+        with self.lock:
+            for port in port_names:
+                attrs = self.ports.get(port)
+                if attrs is not None and attrs.get(PORT_ROLE, EXTERNAL_PORT) == EXTERNAL_PORT:
+                    external_ports.add(port)
+        return external_ports
+
+    def is_port_channel_internal(self, port_channel):
+        if not is_multi_asic():
+            return False
+
+        with self.lock:
+            port_channels = list(self.port_channels.get(port_channel, []))
+        for attrs in port_channels:
+            if 'members' in attrs and self.is_port_internal(attrs['members'][0]):
+                return True
+        return False
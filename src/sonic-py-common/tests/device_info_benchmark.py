@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Measures the per-call cost of the common device_info/multi_asic helpers with
+a cold cache (cleared before every call) and a warm cache.
+
+Config DB access is simulated by a connector which sleeps for a fixed
+latency on connect and on every table read, so the numbers reflect the
+number of DB round-trips rather than the speed of the local redis.
+
+Usage: python tests/device_info_benchmark.py [iterations]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+# TODO: Remove this if/else block once we no longer support Python 2
+if sys.version_info.major == 3:
+    from unittest import mock
+else:
+    import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sonic_py_common import device_info, multi_asic
+
+DB_LATENCY_SECS = 0.0005
+
+MACHINE_CONF_CONTENTS = "onie_platform=x86_64-mlnx_msn2700-r0\nonie_machine=mlnx_msn2700\n"
+ASIC_CONF_CONTENTS = "NUM_ASIC=1\n"
+
+
+class FakeConfigDBConnector(object):
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def connect(self, *args, **kwargs):
+        time.sleep(DB_LATENCY_SECS)
+
+    def get_table(self, table):
+        time.sleep(DB_LATENCY_SECS)
+        if table == 'DEVICE_METADATA':
+            return {'localhost': {'hwsku': 'ACS-MSN2700', 'platform': 'x86_64-mlnx_msn2700-r0'}}
+        if table == 'PORT':
+            return {'Ethernet{}'.format(i * 4): {'alias': 'etp{}'.format(i + 1)} for i in range(32)}
+        return {}
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    tmpdir = tempfile.mkdtemp()
+    machine_conf = os.path.join(tmpdir, 'machine.conf')
+    with open(machine_conf, 'w') as f:
+        f.write(MACHINE_CONF_CONTENTS)
+    platform_dir = os.path.join(tmpdir, 'platform')
+    os.mkdir(platform_dir)
+    with open(os.path.join(platform_dir, 'asic.conf'), 'w') as f:
+        f.write(ASIC_CONF_CONTENTS)
+
+    helpers = [
+        ('device_info.get_platform', device_info.get_platform),
+        ('device_info.get_hwsku', device_info.get_hwsku),
+        ('device_info.get_num_npus', device_info.get_num_npus),
+        ('device_info.is_multi_npu', device_info.is_multi_npu),
+        ('multi_asic.get_num_asics', multi_asic.get_num_asics),
+        ('multi_asic.get_port_table', multi_asic.get_port_table),
+    ]
+
+    try:
+        with mock.patch.object(device_info, 'MACHINE_CONF_PATH', machine_conf), \
+                mock.patch.object(device_info, 'CONTAINER_PLATFORM_PATH', platform_dir), \
+                mock.patch.object(multi_asic, 'CONTAINER_PLATFORM_PATH', platform_dir), \
+                mock.patch.object(device_info, 'ConfigDBConnector', FakeConfigDBConnector):
+            print("{:<30} {:>14} {:>14}".format("helper", "cold (us/call)", "warm (us/call)"))
+            for (name, helper) in helpers:
+                def cold_call():
+                    device_info.clear_cache()
+                    helper()
+
+                cold = timeit.timeit(cold_call, number=iterations) / iterations
+                device_info.clear_cache()
+                helper()
+                warm = timeit.timeit(helper, number=iterations) / iterations
+                print("{:<30} {:>14.1f} {:>14.1f}".format(name, cold * 1e6, warm * 1e6))
+    finally:
+        device_info.clear_cache()
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -70,6 +70,58 @@ class TestDeviceInfo(object):
             result = device_info.get_platform()
             assert result == "x86_64-mlnx_msn2700-r0"
 
+    def test_get_machine_info_cached_until_file_changes(self, tmpdir):
+        machine_conf = tmpdir.join("machine.conf")
+        machine_conf.write(MACHINE_CONF_CONTENTS)
+        device_info.clear_cache()
+        with mock.patch("sonic_py_common.device_info.MACHINE_CONF_PATH", str(machine_conf)):
+            open_mocked = mock.mock_open(read_data=MACHINE_CONF_CONTENTS)
+            with mock.patch("{}.open".format(BUILTINS), open_mocked):
+                assert device_info.get_machine_info() == EXPECTED_GET_MACHINE_INFO_RESULT
+                assert device_info.get_machine_info() == EXPECTED_GET_MACHINE_INFO_RESULT
+                assert open_mocked.call_count == 1
+
+            # Rewriting the file changes its size, which must invalidate the cache
+            machine_conf.write("onie_platform=x86_64-mlnx_msn2100-r0\n")
+            assert device_info.get_machine_info() == {'onie_platform': 'x86_64-mlnx_msn2100-r0'}
+        device_info.clear_cache()
+
+    def test_get_machine_info_returns_a_copy(self, tmpdir):
+        machine_conf = tmpdir.join("machine.conf")
+        machine_conf.write(MACHINE_CONF_CONTENTS)
+        device_info.clear_cache()
+        with mock.patch("sonic_py_common.device_info.MACHINE_CONF_PATH", str(machine_conf)):
+            device_info.get_machine_info()['onie_platform'] = 'modified'
+            machine_info = device_info.get_machine_info()
+            machine_info.pop('onie_machine')
+            assert device_info.get_machine_info() == EXPECTED_GET_MACHINE_INFO_RESULT
+        device_info.clear_cache()
+
+    def test_get_localhost_info_pooled_connection(self):
+        device_info.clear_cache()
+        with mock.patch("sonic_py_common.device_info.ConfigDBConnector") as config_db_mocked:
+            config_db = config_db_mocked.return_value
+            config_db.get_table.side_effect = lambda table: {'localhost': {'hwsku': 'ACS-MSN2700', 'hostname': 'sonic'}}
+
+            assert device_info.get_hwsku() == 'ACS-MSN2700'
+            assert device_info.get_hostname() == 'sonic'
+            # Both lookups share a single connection, and read the DB each time
+            assert config_db_mocked.call_count == 1
+            assert config_db.connect.call_count == 1
+            assert config_db.get_table.call_count == 2
+
+            # A write to the DB is seen by the next lookup
+            config_db.get_table.side_effect = lambda table: {'localhost': {'hwsku': 'ACS-MSN2100'}}
+            assert device_info.get_hwsku() == 'ACS-MSN2100'
+
+            # A failing pooled connection is dropped and re-created on next use
+            config_db.get_table.side_effect = Exception("connection lost")
+            assert device_info.get_hwsku() is None
+            config_db.get_table.side_effect = lambda table: {'localhost': {'hwsku': 'ACS-MSN2700'}}
+            assert device_info.get_hwsku() == 'ACS-MSN2700'
+            assert config_db_mocked.call_count == 2
+        device_info.clear_cache()
+
     @classmethod
     def teardown_class(cls):
         print("TEARDOWN")
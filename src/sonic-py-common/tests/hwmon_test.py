@@ -0,0 +1,132 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+# TODO: Remove this if/else block once we no longer support Python 2
+if sys.version_info.major == 3:
+    from unittest import mock
+else:
+    # Expect the 'mock' package for python 2
+    # https://pypi.python.org/pypi/mock
+    import mock
+
+from sonic_py_common import hwmon
+
+
+class MockSysfs(object):
+    """
+    A temporary directory laid out like the hwmon sysfs tree of a platform,
+    for exercising a vendor fan control loop without hardware
+    """
+    def __init__(self):
+        self.root = tempfile.mkdtemp()
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def set(self, name, value):
+        path = self.path(name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        # Rewrite the attribute in place like the kernel does, keeping its inode
+        with open(path, 'w') as f:
+            f.write('{}\n'.format(value))
+
+    def get(self, name):
+        with open(self.path(name)) as f:
+            return f.read().strip()
+
+    def remove(self, name):
+        os.remove(self.path(name))
+
+    def cleanup(self):
+        shutil.rmtree(self.root)
+
+
+class TestHwmon(object):
+    def setup_method(self, method):
+        self.sysfs = MockSysfs()
+
+    def teardown_method(self, method):
+        self.sysfs.cleanup()
+
+    def test_sampler_reads_all_inputs_in_one_pass(self):
+        self.sysfs.set('hwmon0/temp1_input', 35000)
+        self.sysfs.set('hwmon1/temp1_input', 42000)
+        sampler = hwmon.HwmonSampler({
+            'lm75_48': self.sysfs.path('hwmon0/temp1_input'),
+            'lm75_49': self.sysfs.path('hwmon1/temp1_input'),
+            'cpu': self.sysfs.path('hwmon2/temp1_input'),
+        })
+
+        with mock.patch.object(hwmon.os, 'open', side_effect=os.open) as mock_open:
+            assert sampler.sample() == {'lm75_48': 35000, 'lm75_49': 42000, 'cpu': None}
+            self.sysfs.set('hwmon0/temp1_input', 36000)
+            assert sampler.sample() == {'lm75_48': 36000, 'lm75_49': 42000, 'cpu': None}
+            # The open inputs are re-read through their file descriptors
+            assert mock_open.call_count == 4
+
+        sampler.close()
+        assert not sampler.reader.fds
+
+    def test_fan_curve_hysteresis(self):
+        curve = hwmon.FanCurve([(39000, 75), (0, 38), (45000, 100)], hysteresis=2000)
+        assert curve.update(30000) == 38
+        assert curve.update(39000) == 38
+        assert curve.update(39001) == 75
+        assert curve.update(46000) == 100
+        # Stay on the current step until the temperature drops by the hysteresis
+        assert curve.update(44000) == 100
+        assert curve.update(43001) == 100
+        assert curve.update(43000) == 75
+        assert curve.update(37001) == 75
+        assert curve.update(37000) == 38
+        assert curve.update(-5000) == 38
+
+    def test_fan_curve_without_hysteresis(self):
+        curve = hwmon.FanCurve([(0, 38), (39000, 75), (45000, 100)])
+        for temperature, pwm in [(45001, 100), (45000, 75), (39000, 38), (45001, 100), (0, 38)]:
+            assert curve.update(temperature) == pwm
+
+    def test_pwm_writer_skips_unchanged_values(self):
+        self.sysfs.set('hwmon3/pwm1', 38)
+        self.sysfs.set('hwmon3/pwm2', 50)
+        writer = hwmon.PwmWriter([self.sysfs.path('hwmon3/pwm1'), self.sysfs.path('hwmon3/pwm2')])
+
+        assert writer.write(38) == 1
+        assert self.sysfs.get('hwmon3/pwm2') == '38'
+        assert writer.write(38) == 0
+        assert writer.write(75) == 2
+        assert self.sysfs.get('hwmon3/pwm1') == '75'
+
+        # A failed write is retried on the next pass
+        with mock.patch.object(hwmon, 'write_sysfs', return_value=False):
+            assert writer.write(100) == 0
+        assert writer.write(100) == 2
+
+    def test_fan_controller(self):
+        self.sysfs.set('hwmon0/temp1_input', 30000)
+        self.sysfs.set('hwmon1/temp1_input', 40000)
+        self.sysfs.set('hwmon3/pwm1', 38)
+        controller = hwmon.FanController(
+            hwmon.HwmonSampler({'lm75_48': self.sysfs.path('hwmon0/temp1_input'),
+                                'lm75_49': self.sysfs.path('hwmon1/temp1_input')}),
+            hwmon.FanCurve([(0, 38), (39000, 75), (45000, 100)]),
+            hwmon.PwmWriter([self.sysfs.path('hwmon3/pwm1')]),
+            failsafe_pwm=100)
+
+        assert controller.run_once() == (40000, 75)
+        assert self.sysfs.get('hwmon3/pwm1') == '75'
+
+        self.sysfs.remove('hwmon0/temp1_input')
+        self.sysfs.remove('hwmon1/temp1_input')
+        controller.sampler.close()
+        assert controller.run_once() == (None, 100)
+        assert self.sysfs.get('hwmon3/pwm1') == '100'
+
+        stop_event = threading.Event()
+        with mock.patch.object(controller, 'run_once', side_effect=lambda: stop_event.set()) as mock_run_once:
+            controller.run(0, stop_event)
+        assert mock_run_once.call_count == 1
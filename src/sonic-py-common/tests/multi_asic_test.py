@@ -0,0 +1,162 @@
+import sys
+
+import pytest
+
+# TODO: Remove this if/else block once we no longer support Python 2
+if sys.version_info.major == 3:
+    from unittest import mock
+else:
+    # Expect the 'mock' package for python 2
+    # https://pypi.python.org/pypi/mock
+    import mock
+
+from sonic_py_common import multi_asic
+
+
+FAKE_CONFIG_DB = {
+    'asic0': {
+        'PORT': {
+            'Ethernet0': {'alias': 'Ethernet1/1'},
+            'Ethernet4': {'alias': 'Ethernet1/2', 'role': 'Ext'},
+            'Ethernet-BP0': {'alias': 'Eth4-ASIC0', 'role': 'Int'},
+        },
+        'PORTCHANNEL': {
+            'PortChannel0001': {'members': ['Ethernet0']},
+            'PortChannel4001': {'members': ['Ethernet-BP0']},
+        },
+    },
+    'asic1': {
+        'PORT': {
+            'Ethernet8': {'alias': 'Ethernet1/3'},
+            'Ethernet-BP256': {'alias': 'Eth0-ASIC1', 'role': 'Int'},
+        },
+        'PORTCHANNEL': {
+            'PortChannel4009': {'members': ['Ethernet-BP256']},
+        },
+    },
+}
+
+
+class FakeConfigDBConnector(object):
+    connections = []
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.handlers = {}
+        FakeConfigDBConnector.connections.append(self)
+
+    def subscribe(self, table, handler):
+        self.handlers[table] = handler
+
+    def listen(self):
+        pass
+
+    def fire(self, table, key, data):
+        self.handlers[table](table, key, data)
+
+
+class TestPortIndex(object):
+    def setup_method(self, method):
+        FakeConfigDBConnector.connections = []
+        self.reads = []
+
+        def get_config_db_table(table, namespace):
+            self.reads.append((namespace, table))
+            return dict(FAKE_CONFIG_DB[namespace].get(table, {}))
+
+        self.patches = [
+            mock.patch("sonic_py_common.multi_asic.connect_config_db_for_ns", side_effect=FakeConfigDBConnector),
+            mock.patch("sonic_py_common.multi_asic.get_config_db_table", side_effect=get_config_db_table),
+            mock.patch("sonic_py_common.multi_asic.is_multi_asic", return_value=True),
+            mock.patch("sonic_py_common.multi_asic.get_namespace_list",
+                       side_effect=lambda namespace=None: [namespace] if namespace else ['asic0', 'asic1']),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def teardown_method(self, method):
+        for patch in self.patches:
+            patch.stop()
+
+    def test_lookups(self):
+        index = multi_asic.PortIndex(namespaces=['asic0', 'asic1'])
+
+        # The tables of each namespace are read once
+        assert sorted(self.reads) == [('asic0', 'PORT'), ('asic0', 'PORTCHANNEL'),
+                                      ('asic1', 'PORT'), ('asic1', 'PORTCHANNEL')]
+
+        assert index.get_namespace_for_port('Ethernet0') == 'asic0'
+        assert index.get_namespace_for_port('Ethernet-BP256') == 'asic1'
+        with pytest.raises(ValueError):
+            index.get_namespace_for_port('Ethernet100')
+
+        assert index.get_port_role('Ethernet0') == multi_asic.EXTERNAL_PORT
+        assert index.get_port_role('Ethernet-BP0') == multi_asic.INTERNAL_PORT
+        assert not index.is_port_internal('Ethernet8')
+        assert index.is_port_internal('Ethernet-BP256')
+
+        assert index.get_external_ports(['Ethernet0', 'Ethernet4', 'Ethernet-BP0', 'Ethernet100']) == \
+            set(['Ethernet0', 'Ethernet4'])
+
+        assert not index.is_port_channel_internal('PortChannel0001')
+        assert index.is_port_channel_internal('PortChannel4001')
+        assert index.is_port_channel_internal('PortChannel4009')
+        assert not index.is_port_channel_internal('PortChannel9999')
+
+        assert len(self.reads) == 4
+        assert set(index.get_port_table().keys()) == \
+            set(list(FAKE_CONFIG_DB['asic0']['PORT'].keys()) + list(FAKE_CONFIG_DB['asic1']['PORT'].keys()))
+
+    def test_namespace_precedence(self):
+        duplicated = {
+            'asic0': {'PORT': {'Ethernet0': {'alias': 'Ethernet1/1', 'role': 'Ext'}}},
+            'asic1': {'PORT': {'Ethernet0': {'alias': 'Ethernet1/1', 'role': 'Int'}}},
+        }
+        with mock.patch.dict(FAKE_CONFIG_DB, duplicated):
+            index = multi_asic.PortIndex(namespaces=['asic0', 'asic1'])
+            # As get_port_table(), the attributes of the last namespace win
+            assert index.get_port_table()['Ethernet0']['role'] == 'Int'
+            assert multi_asic.get_port_table()['Ethernet0']['role'] == 'Int'
+            assert multi_asic.is_port_internal('Ethernet0')
+            # As get_namespace_for_port(), the first namespace wins
+            assert index.get_namespace_for_port('Ethernet0') == 'asic0'
+            assert multi_asic.get_namespace_for_port('Ethernet0') == 'asic0'
+
+    def test_module_lookups(self):
+        # The module functions read the tables directly, without building
+        # an index nor starting listeners
+        with mock.patch("sonic_py_common.multi_asic.PortIndex") as port_index:
+            assert multi_asic.get_namespace_for_port('Ethernet8') == 'asic1'
+            assert multi_asic.get_port_role('Ethernet-BP0', 'asic0') == multi_asic.INTERNAL_PORT
+            with pytest.raises(ValueError):
+                multi_asic.get_port_role('Ethernet-BP0', 'asic1')
+            assert multi_asic.get_external_ports(['Ethernet0', 'Ethernet-BP256']) == set(['Ethernet0'])
+            assert multi_asic.is_port_channel_internal('PortChannel4009')
+            assert not multi_asic.is_port_channel_internal('PortChannel0001', 'asic0')
+        assert not port_index.called
+        assert FakeConfigDBConnector.connections == []
+
+    def test_single_asic_port_channel(self):
+        index = multi_asic.PortIndex(namespaces=['asic0'])
+        with mock.patch("sonic_py_common.multi_asic.is_multi_asic", return_value=False):
+            assert not index.is_port_channel_internal('PortChannel4001')
+            assert not multi_asic.is_port_channel_internal('PortChannel4001')
+
+    def test_subscription_updates(self):
+        index = multi_asic.PortIndex(namespaces=['asic0', 'asic1'], subscribe=True)
+        for listener in index.listeners:
+            listener.join()
+
+        listener_dbs = dict((db.namespace, db) for db in FakeConfigDBConnector.connections)
+        assert sorted(listener_dbs.keys()) == ['asic0', 'asic1']
+
+        listener_dbs['asic1'].fire('PORT', 'Ethernet12', {'alias': 'Ethernet1/4', 'role': 'Int'})
+        assert index.get_namespace_for_port('Ethernet12') == 'asic1'
+        assert index.is_port_internal('Ethernet12')
+
+        listener_dbs['asic0'].fire('PORT', 'Ethernet0', {})
+        with pytest.raises(ValueError):
+            index.get_namespace_for_port('Ethernet0')
+
+        listener_dbs['asic0'].fire('PORTCHANNEL', 'PortChannel0002', {'members': ['Ethernet-BP0']})
+        assert index.is_port_channel_internal('PortChannel0002')
@@ -3,7 +3,8 @@ import syslog
 
 from json import dump
 from glob import glob
-from sonic_yang_ext import SonicYangExtMixin, SonicYangException
+from sonic_yang_ext import SonicYangExtMixin, SonicYangException, \
+    YANG_MODEL_CACHE_DIR
 
 """
 Yang schema and data tree python APIs based on libyang python
@@ -12,8 +13,10 @@ i.e. it is mixin not parent class.
 """
 class SonicYang(SonicYangExtMixin):
 
-    def __init__(self, yang_dir, debug=False):
+    def __init__(self, yang_dir, debug=False, cache_dir=YANG_MODEL_CACHE_DIR):
         self.yang_dir = yang_dir
+        # directory of the JSON schema cache of yang models, None disables it
+        self.cache_dir = cache_dir
         self.ctx = None
         self.module = None
         self.root = None
@@ -36,6 +39,12 @@ class SonicYang(SonicYangExtMixin):
         self.revXlateJson = dict()
         # below dict store the input config tables which have no YANG models
         self.tablesWithOutYang = dict()
+        # precompiled key regex and leafDict of each YANG list, used in xlate
+        self.xlateListIndex = dict()
+        # map from TABLE in config DB to TABLEs it refers to via leafref/must
+        self.tableDepMap = dict()
+        # xlated TABLEs of config DB reused by incremental validation
+        self.xlateTableCache = dict()
 
         try:
             self.ctx = ly.Context(yang_dir)
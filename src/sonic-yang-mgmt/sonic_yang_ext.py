@@ -3,13 +3,33 @@
 
 from __future__ import print_function
 import yang as ly
+import hashlib
+import os
 import re
 import syslog
 
-from json import dump, dumps, loads
+from collections import OrderedDict
+from json import dump, dumps, load, loads
 from xmltodict import parse
 from glob import glob
 
+"""
+The JSON schema of the YANG models is cached in a file of the cache
+directory, one per YANG models directory. The cache is keyed by a hash of
+the content of all YANG model files and by the libyang version, so any
+change in models or in libyang invalidates it. Bump the version on any
+change in the cached format.
+"""
+YANG_MODEL_CACHE_DIR = "/var/cache/sonic-yang-mgmt"
+YANG_MODEL_CACHE_SUFFIX = ".cache.json"
+YANG_MODEL_CACHE_VERSION = 2
+
+"""
+Regex to find the config DB table in an absolute schema path of a leafref or
+must condition, i.e. TABLE in /prefix:sonic-module/prefix:TABLE/...
+"""
+TABLE_REF_REGEX = re.compile(r'/[\w-]+:[\w-]+/[\w-]+:([\w-]+)(?:/[\w-]+:[\w-]+(?:\[[^\]]*\])*)*')
+
 """
 This is the Exception thrown out of all public function of this class.
 """
@@ -35,16 +55,25 @@ class SonicYangExtMixin:
                 else:
                     raise(Exception("Could not load module {}".format(file)))
 
+            # hash the content of the models, before yangFiles loses full path
+            modelsHash = self._hashYangModels(self.yangFiles)
+
             # keep only modules name in self.yangFiles
             self.yangFiles = [f.split('/')[-1] for f in self.yangFiles]
             self.yangFiles = [f.split('.')[0] for f in self.yangFiles]
             print('Loaded below Yang Models')
             print(self.yangFiles)
 
-            # load json for each yang model
-            self._loadJsonYangModel()
+            # load json for each yang model, from cache if models are unchanged
+            if self.cache_dir is None:
+                self._loadJsonYangModel()
+            elif not self._loadYangModelCache(modelsHash):
+                self._loadJsonYangModel()
+                self._saveYangModelCache(modelsHash)
             # create a map from config DB table to yang container
             self._createDBTableToModuleMap()
+            # create a map from config DB table to tables it refers to
+            self._createTableDependencyMap()
 
         except Exception as e:
             print("Yang Models Load failed")
@@ -69,6 +98,114 @@ class SonicYangExtMixin:
 
         return
 
+    """
+    Path of the YANG model cache file in the cache directory, named after
+    the YANG models directory
+    """
+    def _yangModelCacheFile(self):
+
+        yangDir = os.path.realpath(self.yang_dir)
+        name = "{}-{}{}".format(os.path.basename(yangDir),
+            hashlib.sha256(yangDir.encode('utf-8')).hexdigest()[:16],
+            YANG_MODEL_CACHE_SUFFIX)
+
+        return os.path.join(self.cache_dir, name)
+
+    """
+    Version of libyang, from the version macros of its python bindings if
+    exported, otherwise the identity of the files of the bindings
+    """
+    def _libyangVersion(self):
+
+        version = [str(getattr(ly, name)) for name in \
+            ('LY_VERSION_MAJOR', 'LY_VERSION_MINOR', 'LY_VERSION_MICRO') \
+            if hasattr(ly, name)]
+        if version:
+            return '.'.join(version)
+
+        files = list()
+        for module in (ly, getattr(ly, '_yang', None)):
+            path = getattr(module, '__file__', None)
+            if path is None:
+                continue
+            st = os.stat(path)
+            files.append("{}:{}:{}".format(os.path.realpath(path), st.st_size, \
+                int(st.st_mtime)))
+
+        return ';'.join(files)
+
+    """
+    Hash the names and content of all YANG model files
+    """
+    def _hashYangModels(self, yangFiles):
+
+        h = hashlib.sha256()
+        for f in sorted(yangFiles):
+            with open(f, 'rb') as yf:
+                content = yf.read()
+            h.update(os.path.basename(f).encode('utf-8'))
+            h.update(hashlib.sha256(content).hexdigest().encode('utf-8'))
+
+        return h.hexdigest()
+
+    """
+    Load JSON schema of yang models from cache file, if the cache was created
+    from the same yang models. Return True if loaded from cache.
+    """
+    def _loadYangModelCache(self, modelsHash):
+
+        cacheFile = self._yangModelCacheFile()
+        try:
+            with open(cacheFile) as f:
+                cache = load(f, object_pairs_hook=OrderedDict)
+        except (IOError, OSError, ValueError) as e:
+            self.sysLog(msg="Yang model cache {} not used: {}".format(cacheFile, e))
+            return False
+
+        if cache.get('version') != YANG_MODEL_CACHE_VERSION or \
+           cache.get('hash') != modelsHash or \
+           cache.get('libyang') != self._libyangVersion() or \
+           cache.get('modules') != self.yangFiles:
+            self.sysLog(msg="Yang model cache {} is stale".format(cacheFile))
+            return False
+
+        self.yJson = cache['yJson']
+        self.sysLog(msg="Loaded Json of yang models from {}".format(cacheFile))
+
+        return True
+
+    """
+    Save JSON schema of yang models in cache file. Failure to write the cache
+    is not an error, e.g. the directory may be read-only.
+    """
+    def _saveYangModelCache(self, modelsHash):
+
+        cacheFile = self._yangModelCacheFile()
+        cache = {
+            'version': YANG_MODEL_CACHE_VERSION,
+            'hash': modelsHash,
+            'libyang': self._libyangVersion(),
+            'modules': self.yangFiles,
+            'yJson': self.yJson
+        }
+        # write in a temp file and rename, so readers never see partial cache
+        tmpFile = "{}.{}".format(cacheFile, os.getpid())
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            with open(tmpFile, 'w') as f:
+                dump(cache, f)
+            os.rename(tmpFile, cacheFile)
+        except (IOError, OSError) as e:
+            self.sysLog(syslog.LOG_WARNING, "Failed to save yang model cache {}: {}".\
+                format(cacheFile, e))
+            try:
+                os.remove(tmpFile)
+            except OSError:
+                pass
+
+        return
+
     """
     Create a map from config DB tables to container in yang model
     This module name and topLevelContainer are fetched considering YANG models are
@@ -111,6 +248,42 @@ class SonicYangExtMixin:
                     }
         return
 
+    """
+    Find all config DB tables referred by leafrefs or must conditions in a
+    yang model json, the referred tables are added in set tables.
+    """
+    def _findReferredTables(self, model, tables):
+
+        if isinstance(model, dict):
+            for value in model.values():
+                self._findReferredTables(value, tables)
+        elif isinstance(model, list):
+            for value in model:
+                self._findReferredTables(value, tables)
+        elif model is not None:
+            tables.update(TABLE_REF_REGEX.findall(model))
+
+        return
+
+    """
+    Create a map from each config DB table to the config DB tables, which it
+    refers through leafrefs or must conditions. This is used to find the
+    tables to validate together with a changed table.
+    """
+    def _createTableDependencyMap(self):
+
+        self.tableDepMap = dict()
+        for table in self.confDbYangMap:
+            if 'container' not in self.confDbYangMap[table]:
+                continue
+            referred = set()
+            self._findReferredTables(self.confDbYangMap[table]['container'], referred)
+            referred.discard(table)
+            self.tableDepMap[table] = set(t for t in referred \
+                if 'container' in self.confDbYangMap.get(t, dict()))
+
+        return
+
     """
     Get module, topLevelContainer(TLC) and json container for a config DB table
     """
@@ -147,34 +320,6 @@ class SonicYangExtMixin:
 
         return
 
-    """
-    Extract keys from table entry in Config DB and return in a dict
-
-    Input:
-    tableKey: Config DB Primary Key, Example tableKey = "Vlan111|2a04:5555:45:6709::1/64"
-    keys: key string from YANG list, i.e. 'vlan_name ip-prefix'.
-    regex: A regex to extract keys from tableKeys, good to have it as accurate as possible.
-
-    Return:
-    KeyDict = {"vlan_name": "Vlan111", "ip-prefix": "2a04:5555:45:6709::1/64"}
-    """
-    def _extractKey(self, tableKey, keys, regex):
-
-        keyList = keys.split()
-        # get the value groups
-        value = re.match(regex, tableKey)
-        # create the keyDict
-        i = 1
-        keyDict = dict()
-        for k in keyList:
-            if value.group(i):
-                keyDict[k] = value.group(i)
-            else:
-                raise Exception("Value not found for {} in {}".format(k, tableKey))
-            i = i + 1
-
-        return keyDict
-
     """
     Fill the dict based on leaf as a list or dict @model yang model object
     """
@@ -260,63 +405,105 @@ class SonicYangExtMixin:
         return vValue
 
     """
-    Xlate a list
-    This function will xlate from a dict in config DB to a Yang JSON list
-    using yang model. Output will be go in self.xlateJson
+    Get precompiled xlate info of a YANG list, i.e. compiled key regex, key
+    names and leafDict. These are created once per list model and cached in
+    self.xlateListIndex, so translation of each key costs a regex match only.
     """
-    def _xlateList(self, model, yang, config, table):
+    def _getXlateListInfo(self, model):
 
-        #create a dict to map each key under primary key with a dict yang model.
-        #This is done to improve performance of mapping from values of TABLEs in
-        #config DB to leaf in YANG LIST.
-        leafDict = self._createLeafDict(model)
+        info = self.xlateListIndex.get(id(model))
+        if info is not None and info['model'] is model:
+            return info
 
         # fetch regex from YANG models.
         keyRegEx = model['ext:key-regex-configdb-to-yang']['@value']
         # seperator `|` has special meaning in regex, so change it appropriately.
         keyRegEx = re.sub('\|', '\\|', keyRegEx)
         # get keys from YANG model list itself
-        listKeys = model['key']['@value']
+        listKeys = model['key']['@value'].split()
         self.sysLog(msg="xlateList regex:{} keyList:{}".\
             format(keyRegEx, listKeys))
 
-        for pkey in config.keys():
-            try:
-                vKey = None
+        info = {
+            'model': model,
+            'name': model['@name'],
+            'regex': re.compile(keyRegEx),
+            'keys': listKeys,
+            #create a dict to map each key under primary key with a dict yang model.
+            #This is done to improve performance of mapping from values of TABLEs in
+            #config DB to leaf in YANG LIST.
+            'leafDict': self._createLeafDict(model)
+        }
+        self.xlateListIndex[id(model)] = info
+
+        return info
+
+    """
+    Xlate a single entry of config DB table to an entry of a YANG list.
+    Returns None if pkey or values of the entry do not match the list.
+    """
+    def _xlateListEntry(self, info, pkey, values):
+
+        # Find and extracts key from pkey, all key values must be non empty.
+        value = info['regex'].match(pkey)
+        if value is None or info['regex'].groups < len(info['keys']):
+            return None
+        keyDict = dict()
+        for i, k in enumerate(info['keys']):
+            if not value.group(i+1):
+                return None
+            keyDict[k] = value.group(i+1)
+
+        # fill rest of the values in keyDict
+        try:
+            for vKey in values:
+                keyDict[vKey] = self._findYangTypedValue(vKey, \
+                                    values[vKey], info['leafDict'])
+        except Exception as e:
+            # log debug, because this exception may occur with multilists
+            self.sysLog(syslog.LOG_DEBUG, "xlateList Exception {}".format(e))
+            return None
+
+        return keyDict
+
+    """
+    Xlate lists
+    This function will xlate from a dict in config DB to Yang JSON lists
+    using yang model. Each key of config is dispatched to the first list in
+    models, which matches it. Output will be go in self.xlateJson
+    """
+    def _xlateList(self, models, yang, config, table):
+
+        infos = [self._getXlateListInfo(model) for model in models]
+        entries = [list() for model in models]
+
+        for pkey in list(config.keys()):
+            if self.DEBUG:
                 self.sysLog(syslog.LOG_DEBUG, "xlateList Extract pkey:{}".\
                     format(pkey))
-                # Find and extracts key from each dict in config
-                keyDict = self._extractKey(pkey, listKeys, keyRegEx)
-                # fill rest of the values in keyDict
-                for vKey in config[pkey]:
-                    self.sysLog(syslog.LOG_DEBUG, "xlateList vkey {}".format(vKey))
-                    keyDict[vKey] = self._findYangTypedValue(vKey, \
-                                        config[pkey][vKey], leafDict)
-                yang.append(keyDict)
-                # delete pkey from config, done to match one key with one list
-                del config[pkey]
-
-            except Exception as e:
-                # log debug, because this exception may occur with multilists
-                self.sysLog(syslog.LOG_DEBUG, "xlateList Exception {}".format(e))
-                # with multilist, we continue matching other keys.
-                continue
+            for info, listEntries in zip(infos, entries):
+                keyDict = self._xlateListEntry(info, pkey, config[pkey])
+                if keyDict is not None:
+                    listEntries.append(keyDict)
+                    # delete pkey from config, done to match one key with one list
+                    del config[pkey]
+                    break
+
+        # skip empty lists
+        for info, listEntries in zip(infos, entries):
+            if len(listEntries):
+                yang[info['name']] = listEntries
 
         return
 
     """
-    Process list inside a Container.
+    Process list(s) inside a Container.
     This function will call xlateList based on list(s) present in Container.
     """
-    def _xlateListInContainer(self, model, yang, configC, table):
-        clist = model
-        #print(clist['@name'])
-        yang[clist['@name']] = list()
-        self.sysLog(msg="xlateProcessListOfContainer: {}".format(clist['@name']))
-        self._xlateList(clist, yang[clist['@name']], configC, table)
-        # clean empty lists
-        if len(yang[clist['@name']]) == 0:
-            del yang[clist['@name']]
+    def _xlateListInContainer(self, models, yang, configC, table):
+        self.sysLog(msg="xlateProcessListOfContainer: {}".\
+            format([model['@name'] for model in models]))
+        self._xlateList(models, yang, configC, table)
 
         return
 
@@ -357,11 +544,10 @@ class SonicYangExtMixin:
         # If single list exists in container,
         if clist and isinstance(clist, dict) and \
            clist['@name'] == model['@name']+"_LIST" and bool(configC):
-                self._xlateListInContainer(clist, yang, configC, table)
+                self._xlateListInContainer([clist], yang, configC, table)
         # If multi-list exists in container,
         elif clist and isinstance(clist, list) and bool(configC):
-            for modelList in clist:
-                self._xlateListInContainer(modelList, yang, configC, table)
+            self._xlateListInContainer(clist, yang, configC, table)
 
         # Handle container(s) in container
         ccontainer = model.get('container')
@@ -398,16 +584,46 @@ class SonicYangExtMixin:
 
         # find top level container for each table, and run the xlate_container.
         for table in jIn.keys():
+            self._xlateTable(table, jIn[table], yangJ)
+
+        return
+
+    """
+    xlate a ConfigDB table to Yang json, returns the xlated table
+    """
+    def _xlateTable(self, table, config, yangJ):
+
+        cmap = self.confDbYangMap[table]
+        # create top level containers
+        key = cmap['module']+":"+cmap['topLevelContainer']
+        subkey = cmap['topLevelContainer']+":"+cmap['container']['@name']
+        # Add new top level container for first table in this container
+        yangJ[key] = dict() if yangJ.get(key) is None else yangJ[key]
+        yangJ[key][subkey] = dict()
+        self.sysLog(msg="xlateConfigDBtoYang {}:{}".format(key, subkey))
+        self._xlateContainer(cmap['container'], yangJ[key][subkey], \
+                            config, table)
+
+        return yangJ[key][subkey]
+
+    """
+    xlate a ConfigDB table to Yang json, reusing the result of previous xlate
+    of the table if the table is unchanged since then.
+    """
+    def _xlateTableCached(self, table, config, yangJ):
+
+        configStr = dumps(config, sort_keys=True)
+        cached = self.xlateTableCache.get(table)
+        if cached is not None and cached[0] == configStr:
             cmap = self.confDbYangMap[table]
-            # create top level containers
             key = cmap['module']+":"+cmap['topLevelContainer']
             subkey = cmap['topLevelContainer']+":"+cmap['container']['@name']
-            # Add new top level container for first table in this container
             yangJ[key] = dict() if yangJ.get(key) is None else yangJ[key]
-            yangJ[key][subkey] = dict()
-            self.sysLog(msg="xlateConfigDBtoYang {}:{}".format(key, subkey))
-            self._xlateContainer(cmap['container'], yangJ[key][subkey], \
-                                jIn[table], table)
+            yangJ[key][subkey] = cached[1]
+            return
+
+        self.xlateTableCache[table] = (configStr, \
+            self._xlateTable(table, config, yangJ))
 
         return
 
@@ -700,6 +916,103 @@ class SonicYangExtMixin:
 
        return True
 
+    """
+    Apply diff of a table on a table of config DB json, returns new table.
+    tableDiff: {key: entry}, entry None deletes the key. If tableDiff is None,
+    whole table is deleted and None is returned.
+    """
+    def _applyTableDiff(self, table, tableDiff):
+
+        if tableDiff is None:
+            return None
+
+        newTable = dict(table) if table else dict()
+        for key, entry in tableDiff.items():
+            if entry is None:
+                newTable.pop(key, None)
+            else:
+                newTable[key] = entry
+
+        return newTable
+
+    """
+    Find tables to validate for a change in changedTables, i.e. changed tables,
+    tables which refer to them and all tables referred by these tables.
+    """
+    def _findTablesToValidate(self, changedTables):
+
+        changed = set(changedTables)
+        tables = set(changed)
+        # tables referring to a changed table may be invalid now, e.g. on delete
+        for table, referred in self.tableDepMap.items():
+            if referred & changed:
+                tables.add(table)
+
+        # add referred tables transitively, so that all leafrefs are resolved
+        pending = list(tables)
+        while len(pending):
+            table = pending.pop()
+            for referred in self.tableDepMap.get(table, set()):
+                if referred not in tables:
+                    tables.add(referred)
+                    pending.append(referred)
+
+        return tables
+
+    """
+    Validate config DB json, given as base config and a diff, by xlating and
+    validating only the tables affected by the diff. (Public)
+    Reports the same errors as loadData() and validate_data_tree() of the
+    complete config, provided that base config is valid. Xlation of unchanged
+    tables is reused across calls.
+    input:   baseConfig - config DB json, already validated.
+             diff - {table: {key: entry}}, entry None deletes the key,
+                    table diff None deletes the whole table.
+    returns: True - success   SonicYangException - failed
+    """
+    def validateIncremental(self, baseConfig, diff):
+
+        try:
+            changedConfig = dict()
+            for table in diff.keys():
+                if table not in self.confDbYangMap or \
+                   'container' not in self.confDbYangMap[table]:
+                    # table has no YANG model, nothing to validate
+                    continue
+                changedConfig[table] = self._applyTableDiff(baseConfig.get(table), \
+                    diff[table])
+
+            yangJ = dict()
+            for table in self._findTablesToValidate(changedConfig.keys()):
+                if table in changedConfig:
+                    config = changedConfig[table]
+                    # changed table is xlated from scratch
+                    if config is not None:
+                        self._xlateTable(table, config, yangJ)
+                elif table in baseConfig:
+                    self._xlateTableCached(table, baseConfig[table], yangJ)
+
+            if len(yangJ) == 0:
+                return True
+
+            self.sysLog(msg="Try to load tables {} in the tree".\
+                format(list(changedConfig.keys())))
+            root = self.ctx.parse_data_mem(dumps(yangJ), \
+                        ly.LYD_JSON, ly.LYD_OPT_CONFIG|ly.LYD_OPT_STRICT)
+        except Exception as e:
+            print("Data Loading Failed")
+            raise SonicYangException("Data Loading Failed\n{}".format(str(e)))
+
+        try:
+            if root is not None:
+                self._validate_data(root, self.ctx)
+        except Exception as e:
+            print("Failed to validate data tree")
+            raise SonicYangException("Failed to validate data tree\n{}".\
+                format(str(e)))
+
+        return True
+
     """
     Get data from Data tree, data tree will be assigned in self.xlateJson. (Public)
     """
@@ -5,6 +5,8 @@ import sonic_yang as sy
 import json
 import glob
 import logging
+import shutil
+from copy import deepcopy
 from ijson import items as ijson_itmes
 
 test_path = os.path.dirname(os.path.abspath(__file__))
@@ -28,7 +30,7 @@ class Test_SonicYang(object):
     @pytest.fixture(autouse=True, scope='class')
     def yang_s(self, data):
         yang_dir = str(data['yang_dir'])
-        yang_s = sy.SonicYang(yang_dir)
+        yang_s = sy.SonicYang(yang_dir, cache_dir=None)
         return yang_s
 
     def jsonTestParser(self, file):
@@ -271,7 +273,7 @@ class Test_SonicYang(object):
         sonic_yang_dir = "../sonic-yang-models/yang-models/"
         sonic_yang_test_file = "../sonic-yang-models/tests/yang_model_tests/yangTest.json"
 
-        syc = sy.SonicYang(sonic_yang_dir)
+        syc = sy.SonicYang(sonic_yang_dir, cache_dir=None)
         syc.loadYangModel()
 
         sonic_yang_data = dict()
@@ -304,6 +306,109 @@ class Test_SonicYang(object):
 
         return
 
+    def test_xlate_rev_xlate_large_config(self, sonic_yang_data):
+        # In this test, xlation and revXlation is tested with a large config,
+        # where keys of multi-list containers are mixed.
+        test_file = sonic_yang_data['test_file']
+        syc = sonic_yang_data['syc']
+
+        jIn = json.loads(self.readIjsonInput(test_file, 'SAMPLE_CONFIG_DB_JSON'))
+        for i in range(2000):
+            jIn['ACL_RULE']['V4-ACL-TABLE|Rule_{}'.format(1000+i)] = {
+                "PACKET_ACTION": "FORWARD",
+                "SRC_IP": "10.{}.{}.0/24".format(i // 256, i % 256),
+                "PRIORITY": str(100000+i),
+                "IP_TYPE": "IPv4ANY"
+            }
+        for port in jIn['PORT']:
+            jIn['INTERFACE'][port] = {}
+            jIn['INTERFACE']['{}|10.{}.0.1/31'.format(port, port[len('Ethernet'):])] = {}
+
+        syc.loadData(json.loads(json.dumps(jIn)))
+        xlateJson = syc.xlateJson
+        syc.getData()
+
+        assert syc.revXlateJson['ACL_RULE'] == jIn['ACL_RULE']
+        assert syc.revXlateJson['INTERFACE'] == jIn['INTERFACE']
+        assert len(xlateJson['sonic-acl:sonic-acl']['sonic-acl:ACL_RULE']['ACL_RULE_LIST']) == \
+            len(jIn['ACL_RULE'])
+
+        return
+
+    """
+    Rev xlate a test vector of yang models tests to config DB json.
+    Container names in test vectors have module prefix, remove it.
+    """
+    def configFromYangTestVector(self, syc, vector):
+        yangJ = dict()
+        for module_top in vector:
+            yangJ[module_top] = dict((c.split(':')[-1], vector[module_top][c]) \
+                for c in vector[module_top])
+        syc.xlateJson = yangJ
+        syc.revXlateJson = dict()
+        syc._revXlateConfigDB()
+        return syc.revXlateJson
+
+    def validateFull(self, syc, config):
+        try:
+            syc.loadData(deepcopy(config))
+            syc.validate_data_tree()
+        except sy.SonicYangException as e:
+            return str(e)
+        return None
+
+    def validateIncremental(self, syc, base, diff):
+        try:
+            syc.validateIncremental(base, diff)
+        except sy.SonicYangException as e:
+            return str(e)
+        return None
+
+    def test_validate_incremental(self, sonic_yang_data):
+        # In this test, incremental validation of a diff on a valid base
+        # config must report the same result as validation of whole config.
+        test_file = sonic_yang_data['test_file']
+        syc = sonic_yang_data['syc']
+
+        with open(test_file) as f:
+            vectors = json.load(f)
+        base = vectors['SAMPLE_CONFIG_DB_JSON']
+        assert self.validateFull(syc, base) is None
+
+        diffs = dict()
+        for name in vectors:
+            if name.startswith('SAMPLE_CONFIG_DB_JSON'):
+                continue
+            try:
+                diffs[name] = self.configFromYangTestVector(syc, vectors[name])
+            except Exception as e:
+                print("Skip test vector {}: {}".format(name, e))
+        # delete a port, which is a VLAN member and in ACL table
+        diffs['DELETE_REFERRED_PORT'] = {'PORT': {'Ethernet24': None}}
+        # delete a whole table, which is referred by other tables
+        diffs['DELETE_REFERRED_TABLE'] = {'VLAN': None}
+        # no change in referred entries
+        diffs['CHANGE_PORT_DESCRIPTION'] = {'PORT': {'Ethernet0': \
+            dict(base['PORT']['Ethernet0'], description='changed')}}
+
+        for name in diffs:
+            diff = diffs[name]
+            config = dict(base)
+            for table in diff:
+                config[table] = syc._applyTableDiff(base.get(table), diff[table])
+                if config[table] is None:
+                    del config[table]
+
+            full = self.validateFull(syc, config)
+            incremental = self.validateIncremental(syc, base, diff)
+            print("{}: {}".format(name, full))
+            assert full == incremental, name
+
+        assert self.validateIncremental(syc, base, diffs['DELETE_REFERRED_PORT']) is not None
+        assert self.validateIncremental(syc, base, diffs['CHANGE_PORT_DESCRIPTION']) is None
+
+        return
+
     def test_table_with_no_yang(self, sonic_yang_data):
         # in this test, tables with no YANG models must be stored seperately
         # by this library.
@@ -320,5 +425,51 @@ class Test_SonicYang(object):
 
         return
 
+    def test_yang_model_cache(self, sonic_yang_data, tmpdir):
+        # In this test, JSON of yang models must be loaded from cache when
+        # models are unchanged and regenerated when any model changes.
+        yang_dir = str(tmpdir.join("yang-models"))
+        shutil.copytree(sonic_yang_data['yang_dir'], yang_dir)
+        cache_dir = str(tmpdir.join("cache"))
+
+        cold = sy.SonicYang(yang_dir, cache_dir=cache_dir)
+        cold.loadYangModel()
+        cache_file = cold._yangModelCacheFile()
+        assert os.listdir(cache_dir) == [os.path.basename(cache_file)]
+        with open(cache_file) as f:
+            cold_hash = json.load(f)['hash']
+
+        def fail_load_json():
+            raise Exception("Json of yang models must come from cache")
+
+        warm = sy.SonicYang(yang_dir, cache_dir=cache_dir)
+        warm._loadJsonYangModel = fail_load_json
+        warm.loadYangModel()
+        assert warm.yJson == cold.yJson
+        assert warm.confDbYangMap == cold.confDbYangMap
+
+        # a new libyang version must invalidate the cache
+        upgraded = sy.SonicYang(yang_dir, cache_dir=cache_dir)
+        upgraded._libyangVersion = lambda: "upgraded"
+        upgraded.loadYangModel()
+        assert upgraded.yJson == cold.yJson
+        with open(cache_file) as f:
+            assert json.load(f)['libyang'] == "upgraded"
+
+        # any change in a model must invalidate the cache
+        yang_file = sorted(glob.glob(yang_dir + "/*.yang"))[0]
+        with open(yang_file, 'a') as f:
+            f.write("\n// modified\n")
+        changed = sy.SonicYang(yang_dir, cache_dir=cache_dir)
+        changed.loadYangModel()
+        assert changed.yJson == cold.yJson
+        with open(cache_file) as f:
+            assert json.load(f)['hash'] != cold_hash
+
+        # nothing is written next to the models
+        assert sorted(os.listdir(str(tmpdir))) == ["cache", "yang-models"]
+
+        return
+
     def teardown_class(self):
         pass
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Measure translation time of a large synthetic config DB from config DB JSON
+to YANG JSON, and check that reverse translation gives back the input.
+
+Usage: python tests/xlate_benchmark.py [num_acl_rules] [num_ports]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import time
+
+from copy import deepcopy
+from json import load
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+
+import sonic_yang as sy
+
+YANG_DIR = os.path.join(modules_path, "../sonic-yang-models/yang-models/")
+TEST_FILE = os.path.join(modules_path, "../sonic-yang-models/tests/yang_model_tests/yangTest.json")
+
+def createConfig(numRules, numPorts):
+    with open(TEST_FILE) as f:
+        config = load(f)['SAMPLE_CONFIG_DB_JSON']
+
+    for i in range(numRules):
+        config['ACL_RULE']['V4-ACL-TABLE|Rule_{}'.format(i)] = {
+            "PACKET_ACTION": "FORWARD",
+            "SRC_IP": "10.{}.{}.0/24".format((i // 256) % 256, i % 256),
+            "PRIORITY": str(i),
+            "IP_TYPE": "IPv4ANY"
+        }
+    for i in range(numPorts):
+        port = "Ethernet{}".format(i*4)
+        config['PORT'][port] = {"alias": "Eth{}".format(i), "lanes": str(i*4), \
+            "speed": "100000", "admin_status": "up"}
+        config['INTERFACE'][port] = {}
+        config['INTERFACE']["{}|10.{}.{}.0/31".format(port, i // 256, i % 256)] = {}
+
+    return config
+
+def main():
+    numRules = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    numPorts = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+
+    syc = sy.SonicYang(YANG_DIR, cache_dir=None)
+    syc.loadYangModel()
+
+    config = createConfig(numRules, numPorts)
+    syc.jIn = deepcopy(config)
+    syc.xlateJson = dict()
+    syc.tablesWithOutYang = dict()
+    syc._cropConfigDB()
+
+    start = time.time()
+    syc._xlateConfigDB()
+    xlateTime = time.time() - start
+
+    syc.revXlateJson = dict()
+    syc._revXlateConfigDB()
+    for table in syc.revXlateJson:
+        assert syc.revXlateJson[table] == config[table], "Mismatch in {}".format(table)
+
+    print("xlate of {} ACL rules and {} ports: {:.3f}s".format(numRules, numPorts, xlateTime))
+
+    return
+
+if __name__ == "__main__":
+    main()
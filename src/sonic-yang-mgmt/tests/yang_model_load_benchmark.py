@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""
+Compare cold (no cache) and warm (cached JSON schema) load time of the
+shipped SONiC YANG models.
+
+Usage: python tests/yang_model_load_benchmark.py [yang_dir] [iterations]
+"""
+
+from __future__ import print_function
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+
+import sonic_yang as sy
+
+DEFAULT_YANG_DIR = os.path.join(modules_path, "../sonic-yang-models/yang-models/")
+
+def timeLoad(yang_dir, cache_dir):
+    start = time.time()
+    syc = sy.SonicYang(yang_dir, cache_dir=cache_dir)
+    syc.loadYangModel()
+    return time.time() - start
+
+def main():
+    yang_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_YANG_DIR
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    # use a cache directory of its own, so the system cache is left untouched
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cold = list()
+        warm = list()
+        for i in range(iterations):
+            for f in os.listdir(cache_dir):
+                os.remove(os.path.join(cache_dir, f))
+            cold.append(timeLoad(yang_dir, cache_dir))
+            warm.append(timeLoad(yang_dir, cache_dir))
+
+        print("cold load: min {:.3f}s avg {:.3f}s".format(min(cold), sum(cold)/len(cold)))
+        print("warm load: min {:.3f}s avg {:.3f}s".format(min(warm), sum(warm)/len(warm)))
+    finally:
+        shutil.rmtree(cache_dir)
+
+    return
+
+if __name__ == "__main__":
+    main()